@@ -1,129 +1,448 @@
-from typing import Dict, List, Tuple, Union, Set
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    Set,
+)
+
+from project.bit_matrix import is_dense
+from project.matrix_backend import BIT, SPARSE, MatrixBackend, get_backend
 
-from project.rsm import RSM
+if TYPE_CHECKING:
+    from project.rsm import RSM
 
-from scipy import sparse
-from scipy.sparse import kron, csr_array, csr_matrix, block_diag, lil_array
+import numpy as np
+from scipy.sparse import csr_array, csr_matrix, lil_array, diags
+from scipy.sparse.csgraph import breadth_first_order, connected_components
+from networkx import MultiDiGraph
 from pyformlang.finite_automaton import (
+    DeterministicFiniteAutomaton,
+    Epsilon,
     EpsilonNFA,
+    NondeterministicFiniteAutomaton,
     State,
 )
 
+# Attribute of the edge label of networkx graphs
+LABEL = "label"
+
+# Labels of epsilon edges, as read by pyformlang
+EPSILON_LABELS = ("epsilon", "ɛ")
+
+
+class SymbolMatrices(dict):
+    """Dict of symbol matrices which counts its modifications, so caches built
+    from the matrices know when they are outdated
+    """
+
+    # Class attribute, since unpickling sets items before the attributes
+    version = 0
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.version += 1
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.version += 1
+
+    def pop(self, *args):
+        self.version += 1
+        return super().pop(*args)
+
+    def popitem(self):
+        self.version += 1
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        self.version += 1
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.version += 1
+
+    def clear(self):
+        super().clear()
+        self.version += 1
+
 
 class Automaton:
+    """Automaton represented as a boolean adjacency matrix for each symbol.
+    States are interned to contiguous integer ids: the state with id i is state_table[i],
+    start and final states are boolean masks over ids. All algorithms work with ids,
+    states themselves are produced only when results are decoded.
+
+    The union of symbol matrices is cached in adjacency. Replacing or removing symbol
+    matrices marks it outdated, add_transitions updates it in place. Symbol matrices
+    themselves must not be modified in place.
+    """
+
     def __init__(
         self,
-        start_states: set,
-        final_states: set,
-        states: set,
+        state_table: np.ndarray,
+        start_mask: np.ndarray,
+        final_mask: np.ndarray,
         symbols: set,
         symbol_matrices: Dict[any, csr_array],
-        mapping: Dict[any, int],
     ):
-        self.start_states: set = start_states
-        self.final_states: set = final_states
-        self.states = states
+        self.state_table = state_table
+        self.start_mask = start_mask
+        self.final_mask = final_mask
         self.symbols = symbols
         self.symbol_matrices = symbol_matrices
-        self.old_state_to_new = mapping
+        self._old_state_to_new = None
+
+    def __getstate__(self) -> dict:
+        # The cached adjacency is not pickled, e.g. when sent to worker processes
+        state = self.__dict__.copy()
+        state["_adjacency"] = None
+        return state
+
+    @property
+    def symbol_matrices(self) -> SymbolMatrices:
+        """Boolean adjacency matrix for each symbol"""
+        return self._symbol_matrices
+
+    @symbol_matrices.setter
+    def symbol_matrices(self, symbol_matrices: Dict[any, csr_array]):
+        if not isinstance(symbol_matrices, SymbolMatrices):
+            symbol_matrices = SymbolMatrices(symbol_matrices)
+        self._symbol_matrices = symbol_matrices
+        self._adjacency = None
+        self._adjacency_version = None
+
+    @property
+    def adjacency(self) -> csr_array:
+        """Union of the symbol matrices. It is built on the first access and rebuilt only
+        after symbol matrices are replaced or removed, must not be modified in place
+        """
+        if (
+            self._adjacency is None
+            or self._adjacency_version != self._symbol_matrices.version
+        ):
+            n = self.size
+            adjacency = csr_array((n, n), dtype=bool)
+            for matrix in self._symbol_matrices.values():
+                adjacency += matrix
+            self._adjacency = csr_array(adjacency, dtype=bool)
+            self._adjacency_version = self._symbol_matrices.version
+        return self._adjacency
+
+    def add_transitions(self, symbol: any, matrix: csr_array) -> int:
+        """Add transitions by the symbol. The cached adjacency, if it is up to date,
+        is updated by the new transitions instead of being rebuilt.
+
+        Parameters
+        ----------
+        symbol : any
+            Symbol of the transitions
+        matrix : csr_array
+            Boolean matrix of the transitions
+
+        Returns
+        -------
+        new_transitions : int
+            Returns number of transitions by the symbol which were not in the automaton
+        """
+        matrix = csr_array(matrix, dtype=bool)
+        is_cached = (
+            self._adjacency is not None
+            and self._adjacency_version == self._symbol_matrices.version
+        )
+
+        old = self._symbol_matrices.get(symbol)
+        if old is None:
+            new_matrix, old_nnz = matrix, 0
+        else:
+            new_matrix, old_nnz = csr_array(old + matrix), old.nnz
+        self.symbols.add(symbol)
+        self._symbol_matrices[symbol] = new_matrix
+
+        if is_cached:
+            self._adjacency = csr_array(self._adjacency + matrix)
+            self._adjacency_version = self._symbol_matrices.version
+        return new_matrix.nnz - old_nnz
+
+    @property
+    def size(self) -> int:
+        """Number of states"""
+        return len(self.state_table)
+
+    @property
+    def old_state_to_new(self) -> Dict[any, int]:
+        """Mapping from states to their ids, it is built on the first access"""
+        if self._old_state_to_new is None:
+            self._old_state_to_new = {
+                state: i for i, state in enumerate(self.state_table)
+            }
+        return self._old_state_to_new
+
+    @property
+    def states(self) -> set:
+        return set(self.state_table)
+
+    @property
+    def start_states(self) -> set:
+        return set(self.state_table[self.start_mask])
+
+    @start_states.setter
+    def start_states(self, states: Iterable[any]):
+        self.start_mask = self.states_mask(states)
+
+    @property
+    def final_states(self) -> set:
+        return set(self.state_table[self.final_mask])
+
+    @final_states.setter
+    def final_states(self, states: Iterable[any]):
+        self.final_mask = self.states_mask(states)
+
+    def states_mask(self, states: Iterable[any]) -> np.ndarray:
+        """Encode states to the boolean mask over state ids
+
+        Parameters
+        ----------
+        states : Iterable[any]
+            States of the automaton
+
+        Returns
+        -------
+        mask : np.ndarray
+            Returns mask where the values of the given states are set
+        """
+        return _states_mask(self.old_state_to_new, states)
 
     @classmethod
-    def from_fa(cls, fa: any) -> "Automaton":
-        """Turns the automaton into an adjacency matrix
+    def from_fa(cls, fa: any, remove_epsilon: bool = True) -> "Automaton":
+        """Turns the automaton into an adjacency matrix. Transitions of the automaton are coded
+        by integers in one pass over them and passed to from_arrays, which is the entry for
+        transitions that are already coded.
 
         Parameters
         ----------
         fa : any
             Finite automaton from pyformlang
+        remove_epsilon : bool
+            If true, epsilon transitions are removed with remove_epsilon_transitions,
+            otherwise epsilon is kept as an ordinary symbol
 
         Returns
         -------
         automaton : Automaton
         """
-        mapping = {state: i for i, state in enumerate(fa.states)}
-        symbol_to_data = {}
-
-        # Prepare data for creating scipy.sparse adjacency matrix for each symbol
-        for state1, symbol, state2 in fa:
-            map_state1 = mapping[state1]
-            map_state2 = mapping[state2]
-
-            if symbol in symbol_to_data:
-                row, col, data = symbol_to_data[symbol]
-                row.append(map_state1)
-                col.append(map_state2)
-                data.append(True)
-            else:
-                symbol_to_data[symbol] = ([map_state1], [map_state2], [True])
-
-        # Creating scipy.sparse adjacency matrix for each symbol
-        result_map = {}
-        shape = (len(mapping), len(mapping))
-        for k, v in symbol_to_data.items():
-            row, col, data = v
-            result_map[k] = csr_array((data, (row, col)), shape=shape)
-
-        return cls(
-            fa.start_states, fa.final_states, fa.states, fa.symbols, result_map, mapping
+        states = list(fa.states)
+        mapping = {state: i for i, state in enumerate(states)}
+        symbol_codes = {}
+        transitions = np.array(
+            [
+                (
+                    mapping[state1],
+                    symbol_codes.setdefault(symbol, len(symbol_codes)),
+                    mapping[state2],
+                )
+                for state1, symbol, state2 in fa
+            ],
+            dtype=np.int64,
+        ).reshape(-1, 3)
+
+        automaton = cls.from_arrays(
+            transitions[:, 0],
+            transitions[:, 2],
+            transitions[:, 1],
+            list(symbol_codes),
+            states,
+            fa.start_states,
+            fa.final_states,
+            fa.symbols,
         )
+        if remove_epsilon:
+            automaton.remove_epsilon_transitions()
+        return automaton
 
     @classmethod
-    def from_rsm(cls, rsm: RSM) -> "Automaton":
-        """Turns the RSM into an adjacency matrix
+    def from_arrays(
+        cls,
+        sources: np.ndarray,
+        targets: np.ndarray,
+        label_codes: np.ndarray,
+        labels: List[any],
+        states: List[any],
+        start_states: set,
+        final_states: set,
+        symbols: Optional[set] = None,
+    ) -> "Automaton":
+        """Builds the automaton from integer-coded transition arrays
 
         Parameters
         ----------
-        rsm : RSM
-            Finite automaton from pyformlang
+        sources : np.ndarray
+            Indexes of the source states of the transitions
+        targets : np.ndarray
+            Indexes of the target states of the transitions
+        label_codes : np.ndarray
+            Code of the label of each transition, i.e. index at the labels list
+        labels : List[any]
+            Labels of the transitions
+        states : List[any]
+            States of the automaton, state with index i is states[i]
+        start_states : set
+            Start states of the automaton
+        final_states : set
+            Final states of the automaton
+        symbols : Optional[set]
+            Symbols of the automaton. If none than labels are used
 
         Returns
         -------
         automaton : Automaton
         """
+        mapping = {state: i for i, state in enumerate(states)}
+        matrices = _build_symbol_matrices(
+            sources, targets, label_codes, labels, len(states)
+        )
+        if symbols is None:
+            symbols = set(labels)
+
+        return cls(
+            _object_array(states),
+            _states_mask(mapping, start_states),
+            _states_mask(mapping, final_states),
+            symbols,
+            matrices,
+        )
 
-        states, start_states, final_states = set(), set(), set()
+    @classmethod
+    def from_graph(
+        cls,
+        graph: MultiDiGraph,
+        start_states: Optional[Iterable[any]] = None,
+        final_states: Optional[Iterable[any]] = None,
+        remove_epsilon: bool = True,
+    ) -> "Automaton":
+        """Builds the automaton from the graph in one pass over its edges, labels of the edges
+        are symbols and nodes are states. Edges without a label are skipped.
 
-        for var, automata in rsm.productions.items():
-            for state in automata.states:
-                st = State((var, state.value))
-                states.add(st)
-                if state in automata.start_states:
-                    start_states.add(st)
-                if state in automata.final_states:
-                    final_states.add(st)
+        Parameters
+        ----------
+        graph : MultiDiGraph
+            Graph from networkx
+        start_states : Optional[Iterable[any]]
+            Start states of the automaton. If none than all nodes are start states
+        final_states : Optional[Iterable[any]]
+            Final states of the automaton. If none than all nodes are final states
+        remove_epsilon : bool
+            If true, epsilon edges are removed with remove_epsilon_transitions,
+            otherwise epsilon labels are kept as ordinary symbols
 
-        mapping = {
-            state: i for i, state in enumerate(sorted(states, key=lambda s: s.value[1]))
+        Returns
+        -------
+        automaton : Automaton
+        """
+        states = list(graph.nodes)
+        mapping = {state: i for i, state in enumerate(states)}
+        label_codes = {}
+        transitions = np.array(
+            [
+                (
+                    mapping[u],
+                    label_codes.setdefault(label, len(label_codes)),
+                    mapping[v],
+                )
+                for u, v, label in graph.edges(data=LABEL)
+                if label is not None
+            ],
+            dtype=np.int64,
+        ).reshape(-1, 3)
+
+        automaton = cls.from_arrays(
+            transitions[:, 0],
+            transitions[:, 2],
+            transitions[:, 1],
+            list(label_codes),
+            states,
+            states if start_states is None else start_states,
+            states if final_states is None else final_states,
+        )
+        if remove_epsilon:
+            automaton.remove_epsilon_transitions()
+        return automaton
+
+    def remove_epsilon_transitions(self):
+        """Fold transitions by epsilon labels into the other ones, as in
+        EpsilonNFA.remove_epsilon_transitions: the state gets transitions of all states
+        reachable from it by epsilon transitions and becomes final if one of them is final.
+        Start states are extended by the states reachable from them by epsilon transitions.
+        All of it is done with products of sparse matrices, see _epsilon_closure.
+        """
+        epsilon_labels = [label for label in self.symbol_matrices if _is_epsilon(label)]
+        if not epsilon_labels:
+            return
+
+        epsilon = csr_array((self.size, self.size), dtype=bool)
+        for label in epsilon_labels:
+            epsilon += self.symbol_matrices.pop(label)
+        self.symbols = {symbol for symbol in self.symbols if not _is_epsilon(symbol)}
+
+        eclose = _epsilon_closure(epsilon)
+        self.symbol_matrices = {
+            symbol: csr_array(eclose @ matrix)
+            for symbol, matrix in self.symbol_matrices.items()
         }
+        self.start_mask = (eclose.T @ self.start_mask.astype(np.int64)) > 0
+        self.final_mask = (eclose @ self.final_mask.astype(np.int64)) > 0
 
-        n = len(states)
-        matrices = {}
-        symbols = set()
+    @classmethod
+    def from_rsm(cls, rsm: "RSM") -> "Automaton":
+        """Turns the RSM into an adjacency matrix
 
-        for var, automata in rsm.productions.items():
-            symbols = symbols.union(automata.symbols)
-            for state_source, transition in automata.to_dict().items():
-                for symbol, states_targets in transition.items():
-                    if not isinstance(states_targets, set):
-                        states_targets = {states_targets}
+        Parameters
+        ----------
+        rsm : RSM
+            Recursive state machine
 
-                    if symbol.value not in matrices:
-                        matrices[symbol.value] = sparse.csr_array((n, n), dtype=bool)
+        Returns
+        -------
+        automaton : Automaton
+        """
 
-                    for state_target in states_targets:
-                        matrices[symbol.value][
-                            mapping[State((var, state_source.value))],
-                            mapping[State((var, state_target.value))],
-                        ] = True
+        states, sources, targets, label_codes, labels = rsm.to_arrays()
+        _, start_states, final_states = rsm.boxes_states()
 
-        return cls(start_states, final_states, states, symbols, matrices, mapping)
+        symbols = set()
+        for automata in rsm.productions.values():
+            symbols = symbols.union(automata.symbols)
 
-    def intersect(self, other: "Automaton") -> "Automaton":
+        return cls.from_arrays(
+            sources,
+            targets,
+            label_codes,
+            labels,
+            states,
+            start_states,
+            final_states,
+            symbols,
+        )
+
+    def intersect(
+        self,
+        other: "Automaton",
+        backend: Optional[Union[str, MatrixBackend]] = None,
+    ) -> "Automaton":
         """Intersects two automata
 
         Parameters
         ----------
         other : Automaton
+        backend : Optional[Union[str, MatrixBackend]]
+            Matrix backend used for Kronecker products. Result matrices are converted to scipy.sparse
 
         Returns
         -------
@@ -132,32 +451,24 @@ class Automaton:
         """
 
         # Kron product for each symbol
+        backend = get_backend(backend)
         result = {}
         symbols = self.symbols & other.symbols
         for symbol in symbols:
-            symbol_matrix1 = self.symbol_matrices[symbol]
-            symbol_matrix2 = other.symbol_matrices[symbol]
-            result[symbol] = kron(symbol_matrix1, symbol_matrix2, format="csr")
-
-        final_states = set()
-        start_states = set()
-        states = set()
-        mapping = {}
-
-        # Save start and final states for new automaton
-        for state1, i1 in self.old_state_to_new.items():
-            for state2, i2 in other.old_state_to_new.items():
-                intersection_state = i1 * len(other.old_state_to_new) + i2
-                mapping[intersection_state] = intersection_state
-                states.add(intersection_state)
-
-                if state1 in self.start_states and state2 in other.start_states:
-                    start_states.add(intersection_state)
-
-                if state1 in self.final_states and state2 in other.final_states:
-                    final_states.add(intersection_state)
+            symbol_matrix1 = backend.from_sparse(self.symbol_matrices[symbol])
+            symbol_matrix2 = backend.from_sparse(other.symbol_matrices[symbol])
+            result[symbol] = backend.to_sparse(
+                backend.kron(symbol_matrix1, symbol_matrix2)
+            )
 
-        return Automaton(start_states, final_states, states, symbols, result, mapping)
+        # State (i1, i2) of the intersection has id i1 * other.size + i2
+        return Automaton(
+            _object_array(range(self.size * other.size)),
+            np.kron(self.start_mask, other.start_mask),
+            np.kron(self.final_mask, other.final_mask),
+            symbols,
+            result,
+        )
 
     def to_automata(self) -> EpsilonNFA:
         """Turns the automaton into a finite automaton from pyformlang
@@ -172,8 +483,8 @@ class Automaton:
         # Add transition to automaton of intersection
         for symbol, adj_matrix in self.symbol_matrices.items():
             rows, cols = adj_matrix.nonzero()
-            for i, j in zip(rows, cols):
-                fa.add_transition(State(i), symbol, State(j))
+            for i, j in zip(self.state_table[rows], self.state_table[cols]):
+                fa.add_transition(i, symbol, j)
 
         # Make states final and start
         for state in self.start_states:
@@ -184,30 +495,297 @@ class Automaton:
 
         return fa
 
-    def transitive_closure(self) -> csr_matrix:
+    def to_nfa(self) -> NondeterministicFiniteAutomaton:
+        """Turns the automaton without epsilon transitions, e.g. after
+        remove_epsilon_transitions, into a nondeterministic finite automaton from pyformlang.
+        All states are kept, including the ones without transitions.
+
+        Returns
+        -------
+        nfa : NondeterministicFiniteAutomaton
+            Nondeterministic finite automaton from pyformlang
+        """
+        nfa = NondeterministicFiniteAutomaton(
+            states={State(state) for state in self.state_table}
+        )
+        for symbol, adj_matrix in self.symbol_matrices.items():
+            rows, cols = adj_matrix.nonzero()
+            for i, j in zip(self.state_table[rows], self.state_table[cols]):
+                nfa.add_transition(State(i), symbol, State(j))
+
+        for state in self.start_states:
+            nfa.add_start_state(State(state))
+
+        for state in self.final_states:
+            nfa.add_final_state(State(state))
+
+        return nfa
+
+    def to_dfa(self) -> DeterministicFiniteAutomaton:
+        """Turns the deterministic automaton, e.g. built by determinize, into a deterministic
+        finite automaton from pyformlang
+
+        Returns
+        -------
+        dfa : DeterministicFiniteAutomaton
+            Deterministic finite automaton from pyformlang
+        """
+        dfa = DeterministicFiniteAutomaton()
+        for symbol, adj_matrix in self.symbol_matrices.items():
+            rows, cols = adj_matrix.nonzero()
+            for i, j in zip(self.state_table[rows], self.state_table[cols]):
+                dfa.add_transition(State(i), symbol, State(j))
+
+        for state in self.start_states:
+            dfa.add_start_state(State(state))
+
+        for state in self.final_states:
+            dfa.add_final_state(State(state))
+
+        return dfa
+
+    def determinize(self) -> "Automaton":
+        """Subset construction. Subsets of states are rows of boolean matrices, successors
+        of all new subsets by a symbol are found by one product with the symbol matrix.
+        Epsilon transitions are removed first. The empty subset is not a state,
+        so the result may have no transitions by some symbols.
+
+        Returns
+        -------
+        automaton : Automaton
+            Returns deterministic automaton, its states are integers and 0 is the start state
+        """
+        automaton = copy(self)
+        automaton.symbol_matrices = dict(self.symbol_matrices)
+        automaton.remove_epsilon_transitions()
+
+        labels = list(automaton.symbol_matrices)
+        matrices = [
+            csr_array(automaton.symbol_matrices[label], dtype=bool) for label in labels
+        ]
+        start = np.flatnonzero(automaton.start_mask)
+        if len(start) == 0:
+            return Automaton.from_arrays(
+                [], [], [], labels, [], set(), set(), automaton.symbols
+            )
+
+        subset_ids = {start.tobytes(): 0}
+        subsets = [start]
+        transitions = []
+        front_ids = [0]
+
+        while front_ids:
+            front = SPARSE.from_coordinates(
+                np.repeat(
+                    np.arange(len(front_ids)), [len(subsets[i]) for i in front_ids]
+                ),
+                np.concatenate([subsets[i] for i in front_ids]),
+                (len(front_ids), automaton.size),
+            )
+            new_ids = []
+            for code, matrix in enumerate(matrices):
+                successors = csr_array(front @ matrix)
+                successors.sort_indices()
+                for row, source in enumerate(front_ids):
+                    subset = successors.indices[
+                        successors.indptr[row] : successors.indptr[row + 1]
+                    ].astype(np.int64)
+                    if len(subset) == 0:
+                        continue
+                    target = subset_ids.setdefault(subset.tobytes(), len(subsets))
+                    if target == len(subsets):
+                        subsets.append(subset)
+                        new_ids.append(target)
+                    transitions.append((source, code, target))
+            front_ids = new_ids
+
+        transitions = np.array(transitions, dtype=np.int64).reshape(-1, 3)
+        is_final = [automaton.final_mask[subset].any() for subset in subsets]
+        return Automaton.from_arrays(
+            transitions[:, 0],
+            transitions[:, 2],
+            transitions[:, 1],
+            labels,
+            list(range(len(subsets))),
+            {0},
+            set(np.flatnonzero(is_final).tolist()),
+            automaton.symbols,
+        )
+
+    def minimize(self) -> "Automaton":
+        """Hopcroft partition refinement for the deterministic automaton, e.g. built by determinize.
+        States unreachable from the start state and dead states are removed. Missing transitions
+        go to an implicit sink state. Preimages of splitters are gathered from the inverse
+        transition arrays of every symbol.
+
+        Returns
+        -------
+        automaton : Automaton
+            Returns minimal deterministic automaton, its states are integers and 0 is the start state
+        """
+        labels = list(self.symbol_matrices)
+        start = np.flatnonzero(self.start_mask)
+        if len(start) == 0:
+            return Automaton.from_arrays(
+                [], [], [], labels, [], set(), set(), self.symbols
+            )
+        if len(start) > 1:
+            raise ValueError("Automaton with several start states is not deterministic")
+
+        # States reachable from the start, the sink state is the last one
+        adjacency = csr_array((self.size, self.size), dtype=bool)
+        for matrix in self.symbol_matrices.values():
+            adjacency += matrix
+        reachable = np.sort(
+            breadth_first_order(adjacency, start[0], return_predecessors=False)
+        )
+        n = len(reachable) + 1
+        index = np.full(self.size + 1, n - 1, dtype=np.int64)
+        index[reachable] = np.arange(n - 1)
+
+        deltas = []
+        for matrix in self.symbol_matrices.values():
+            rows, cols = csr_array(matrix, dtype=bool).nonzero()
+            if len(np.unique(rows)) != len(rows):
+                raise ValueError(
+                    "Automaton with several transitions by a symbol is not deterministic"
+                )
+            delta = np.full(self.size + 1, self.size, dtype=np.int64)
+            delta[rows] = cols
+            deltas.append(index[np.append(delta[reachable], self.size)])
+
+        is_final = np.append(self.final_mask[reachable], False)
+
+        # Inverse transitions: predecessors of the state j by the symbol are
+        # indices[indptr[j]:indptr[j + 1]]
+        inverses = [
+            (
+                np.concatenate([[0], np.cumsum(np.bincount(delta, minlength=n))]),
+                np.argsort(delta, kind="stable"),
+            )
+            for delta in deltas
+        ]
+
+        blocks = [
+            block
+            for block in (np.flatnonzero(is_final), np.flatnonzero(~is_final))
+            if len(block) > 0
+        ]
+        block_of = np.empty(n, dtype=np.int64)
+        for i, block in enumerate(blocks):
+            block_of[block] = i
+        waiting = set(range(len(blocks)))
+
+        while waiting:
+            splitter = blocks[waiting.pop()]
+            for indptr, indices in inverses:
+                preimage = _gather_ranges(indptr, indices, splitter)
+                if len(preimage) == 0:
+                    continue
+
+                # Group the preimage by blocks and split blocks which are cut by it
+                preimage = preimage[np.argsort(block_of[preimage], kind="stable")]
+                split_blocks, starts, counts = np.unique(
+                    block_of[preimage], return_index=True, return_counts=True
+                )
+                for block, begin, count in zip(split_blocks, starts, counts):
+                    if count == len(blocks[block]):
+                        continue
+                    inside = preimage[begin : begin + count]
+                    outside = np.setdiff1d(blocks[block], inside, assume_unique=True)
+                    blocks[block] = outside
+                    block_of[inside] = len(blocks)
+                    blocks.append(inside)
+                    if block in waiting or len(inside) <= len(outside):
+                        waiting.add(len(blocks) - 1)
+                    else:
+                        waiting.add(block)
+
+        # Blocks equivalent to the sink are dead, the start block is kept anyway
+        dead = block_of[n - 1]
+        start_block = block_of[index[start[0]]]
+        is_kept = np.ones(len(blocks), dtype=bool)
+        is_kept[dead] = dead == start_block
+        ids = np.full(len(blocks), -1, dtype=np.int64)
+        kept_blocks = np.concatenate(
+            [[start_block], np.setdiff1d(np.flatnonzero(is_kept), [start_block])]
+        )
+        ids[kept_blocks] = np.arange(len(kept_blocks))
+
+        transitions = []
+        sources = np.arange(n - 1)
+        for code, delta in enumerate(deltas):
+            source_ids, target_ids = ids[block_of[sources]], ids[block_of[delta[:-1]]]
+            is_transition = (
+                (source_ids >= 0) & (target_ids >= 0) & (delta[:-1] != n - 1)
+            )
+            transitions.append(
+                np.stack(
+                    [
+                        source_ids[is_transition],
+                        np.full(is_transition.sum(), code),
+                        target_ids[is_transition],
+                    ],
+                    axis=1,
+                )
+            )
+        transitions = np.unique(
+            np.concatenate(transitions + [np.empty((0, 3), dtype=np.int64)]), axis=0
+        )
+
+        return Automaton.from_arrays(
+            transitions[:, 0],
+            transitions[:, 2],
+            transitions[:, 1],
+            labels,
+            list(range(len(kept_blocks))),
+            {0},
+            set(np.unique(ids[block_of[np.flatnonzero(is_final)]]).tolist()),
+            self.symbols,
+        )
+
+    def transitive_closure(
+        self,
+        strategy: str = "auto",
+        backend: Optional[Union[str, MatrixBackend]] = None,
+    ) -> csr_matrix:
         """Constructs a transitive closure of the automaton
 
+        Parameters
+        ----------
+        strategy : str
+            Algorithm of the closure: "squaring" (repeated squaring of the adjacency matrix),
+            "scc" (condensation of strongly connected components and closure of the obtained DAG),
+            "bfs" (bfs from every state) or "auto" (choose one by the size and the density of the matrix,
+            squaring if the backend is specified)
+        backend : Optional[Union[str, MatrixBackend]]
+            Matrix backend used by the squaring strategy. If none than sparse matrices are used
+            and they are switched to bit-packed ones once they become dense
+
         Returns
         -------
         adjacency_matrix : csr_matrix
             Returns transitive closure matrix
         """
 
-        n = len(self.old_state_to_new)
-        if len(self.symbol_matrices) == 0:
-            return csr_array((n, n), dtype="bool")
+        if strategy != "auto" and strategy not in CLOSURE_STRATEGIES:
+            raise ValueError(f"Unknown transitive closure strategy: {strategy}")
 
-        adj_matrix = sum(
-            self.symbol_matrices.values(), start=csr_array((n, n), dtype="bool")
-        )
-        prev_nnz = adj_matrix.nnz
-        curr_nnz = 0
+        n = self.size
+        adj_matrix = self.adjacency
+        if adj_matrix.nnz == 0:
+            return csr_array((n, n), dtype="bool")
 
-        while prev_nnz != curr_nnz:
-            adj_matrix += adj_matrix @ adj_matrix
-            prev_nnz, curr_nnz = curr_nnz, adj_matrix.nnz
+        if strategy == "auto":
+            strategy = (
+                "squaring"
+                if backend is not None
+                else _choose_closure_strategy(adj_matrix)
+            )
 
-        return adj_matrix
+        if strategy == "squaring":
+            return _closure_by_squaring(adj_matrix, backend)
+        return CLOSURE_STRATEGIES[strategy](adj_matrix)
 
     def _diagonal_sum(self, other: "Automaton") -> Dict[any, csr_matrix]:
         """Build a block diagonal matrix from provided matrices.
@@ -223,9 +801,8 @@ class Automaton:
         """
         matrices = {}
         for symbol in self.symbols & other.symbols:
-            matrices[symbol] = block_diag(
-                (other.symbol_matrices[symbol], self.symbol_matrices[symbol]),
-                format="csr",
+            matrices[symbol] = SPARSE.block_diag(
+                (other.symbol_matrices[symbol], self.symbol_matrices[symbol])
             )
         return matrices
 
@@ -239,28 +816,26 @@ class Automaton:
 
         Returns
         -------
-        front : Tuple[csr_matrix, List[any]]
+        front : csr_matrix
             Returns front
         """
-        self_size = len(self.old_state_to_new)
-        regex_size = len(regex.old_state_to_new)
-        front = lil_array((regex_size, regex_size + self_size), dtype=bool)
+        regex_size = regex.size
 
-        # Calculate start graph vertexes
-        graph_start = lil_array([i in self.start_states for i in self.states])
-        start_states = [regex.old_state_to_new[j] for j in regex.start_states]
-
-        # Init front matrix
-        for i in range(regex_size):
-            front[i, i] = True
-            if i in start_states:
-                front[[i], regex_size:] = graph_start
+        # Identity at the left part, start graph vertexes for the start regex states
+        regex_start = np.flatnonzero(regex.start_mask)
+        graph_start = np.flatnonzero(self.start_mask)
+        rows = np.concatenate(
+            [np.arange(regex_size), np.repeat(regex_start, len(graph_start))]
+        )
+        cols = np.concatenate(
+            [np.arange(regex_size), np.tile(graph_start + regex_size, len(regex_start))]
+        )
 
-        return front.tocsr()
+        return SPARSE.from_coordinates(rows, cols, (regex_size, regex_size + self.size))
 
     def _create_front_matrix_for_all_start_states(
         self, regex: "Automaton"
-    ) -> Tuple[csr_matrix, List[any]]:
+    ) -> Tuple[csr_matrix, np.ndarray]:
         """Create front matrix for bfs. It is used in the case of solving the problem for every vertex at the set.
 
         Parameters
@@ -270,35 +845,38 @@ class Automaton:
 
         Returns
         -------
-        front_and_mapping : Tuple[csr_matrix, List[any]]
-            Returns front
+        front_and_mapping : Tuple[csr_matrix, np.ndarray]
+            Returns front and ids of the start vertexes of its blocks
         """
-        self_size = len(self.old_state_to_new)
-        regex_size = len(regex.old_state_to_new)
-        start_states_num = len(self.start_states)
-        front = lil_array(
-            (start_states_num * regex_size, regex_size + self_size), dtype=bool
+        regex_size = regex.size
+        graph_start = np.flatnonzero(self.start_mask)
+        regex_start = np.flatnonzero(regex.start_mask)
+        blocks_start = np.arange(len(graph_start)) * regex_size
+
+        # Every block is the front for the one start vertex
+        rows = np.concatenate(
+            [
+                np.add.outer(blocks_start, np.arange(regex_size)).ravel(),
+                np.add.outer(blocks_start, regex_start).ravel(),
+            ]
         )
-        start_states = [regex.old_state_to_new[j] for j in regex.start_states]
-        start_states_mapping = []
-        for i, state in enumerate(self.start_states):
-            start_states_mapping.append(self.old_state_to_new[state])
-            start_state_matrix = lil_array(
-                (regex_size, regex_size + self_size), dtype=bool
-            )
-            for j in range(regex_size):
-                start_state_matrix[j, j] = True
-                if j in start_states:
-                    start_state_matrix[
-                        j, regex_size + self.old_state_to_new[state]
-                    ] = True
-
-            front[i * regex_size : (i + 1) * regex_size, 0:] = start_state_matrix
+        cols = np.concatenate(
+            [
+                np.tile(np.arange(regex_size), len(graph_start)),
+                np.repeat(graph_start + regex_size, len(regex_start)),
+            ]
+        )
+        shape = (len(graph_start) * regex_size, regex_size + self.size)
 
-        return front.tocsr(), start_states_mapping
+        return SPARSE.from_coordinates(rows, cols, shape), graph_start
 
     def bfs_rpq(
-        self, regex: "Automaton", is_separately: bool
+        self,
+        regex: "Automaton",
+        is_separately: bool,
+        delta: bool = True,
+        chunk_size: Optional[int] = None,
+        processes: Optional[int] = None,
     ) -> Union[Set[any], Set[Tuple[any, any]]]:
         """It allows you to solve a reachability problem on a graph represented as an adjacency matrix and a regular
         expression represented as an adjacency matrix. If the flag is set to true, it solves the reachability
@@ -310,16 +888,152 @@ class Automaton:
             Regular expression represented as an adjacency matrix
         is_separately : bool
             Flag represented type of solving problem
+        delta : bool
+            If true, only the entries discovered at the previous iteration are propagated (semi-naive bfs),
+            otherwise the whole visited matrix is propagated at every iteration
+        chunk_size : Optional[int]
+            Used only if is_separately is true. Maximum number of start states solved at once, so the front
+            has at most chunk_size * number of regex states rows. If none than all start states are solved at once
+            or they are evenly distributed between processes
+        processes : Optional[int]
+            Used only if is_separately is true. Number of worker processes solving chunks of start states
+
+        Returns
+        -------
+        States : Union[Set[int], Set[Tuple[int, int]]]
+            Depending on the type of problem being solved, it returns either a set of ids of reachable states or
+            a set of pairs of ids of states, where the first element is responsible for the starting state and
+            the second for the ending state. Use state_table to decode them.
+        """
+
+        if is_separately and (chunk_size is not None or processes is not None):
+            return self._bfs_rpq_by_chunks(regex, delta, chunk_size, processes)
+
+        result = self._bfs_rpq_ids(regex, is_separately, delta)
+        if is_separately:
+            return set(zip(result[:, 0].tolist(), result[:, 1].tolist()))
+        return set(result.tolist())
+
+    def bfs_rpq_chunks(
+        self,
+        regex: "Automaton",
+        is_separately: bool,
+        delta: bool = True,
+        chunk_size: Optional[int] = None,
+    ) -> Iterator[np.ndarray]:
+        """Solves the reachability problem as bfs_rpq does, but yields the result by chunks of
+        numpy arrays instead of collecting it into a set. If is_separately is true, start states
+        are solved by chunks one after another, so only the front of one chunk is kept in memory.
+
+        Parameters
+        ----------
+        regex : Automaton
+            Regular expression represented as an adjacency matrix
+        is_separately : bool
+            Flag represented type of solving problem
+        delta : bool
+            Flag represented type of bfs, see bfs_rpq
+        chunk_size : Optional[int]
+            Used only if is_separately is true. Maximum number of start states solved at once.
+            If none than all start states are solved at once
+
+        Returns
+        -------
+        chunks : Iterator[np.ndarray]
+            Yields nonempty arrays of ids of reachable states or arrays with shape k x 2 of pairs of ids
+            of start and reachable states. Pairs of different chunks are different.
+        """
+        if not is_separately:
+            chunks = [self]
+        else:
+            chunks = (
+                self._with_start_ids(start_ids)
+                for start_ids in self._start_ids_chunks(chunk_size, None)
+            )
+
+        for chunk in chunks:
+            result = chunk._bfs_rpq_ids(regex, is_separately, delta)
+            if len(result) > 0:
+                yield result
+
+    def bfs_rpq_count(
+        self,
+        regex: "Automaton",
+        is_separately: bool,
+        delta: bool = True,
+        chunk_size: Optional[int] = None,
+    ) -> int:
+        """Counts the result of bfs_rpq without building it, see bfs_rpq_chunks
+
+        Parameters
+        ----------
+        regex : Automaton
+            Regular expression represented as an adjacency matrix
+        is_separately : bool
+            Flag represented type of solving problem
+        delta : bool
+            Flag represented type of bfs, see bfs_rpq
+        chunk_size : Optional[int]
+            Used only if is_separately is true. Maximum number of start states solved at once
+
+        Returns
+        -------
+        count : int
+            Returns number of reachable states or pairs of states
+        """
+        return sum(
+            len(chunk)
+            for chunk in self.bfs_rpq_chunks(regex, is_separately, delta, chunk_size)
+        )
+
+    def bfs_rpq_exists(
+        self,
+        regex: "Automaton",
+        delta: bool = True,
+        chunk_size: Optional[int] = None,
+    ) -> bool:
+        """Checks whether the result of bfs_rpq is nonempty. If the chunk size is given,
+        start states are solved by chunks and the search stops at the first nonempty one.
+
+        Parameters
+        ----------
+        regex : Automaton
+            Regular expression represented as an adjacency matrix
+        delta : bool
+            Flag represented type of bfs, see bfs_rpq
+        chunk_size : Optional[int]
+            Maximum number of start states solved at once. If none than all start states are solved at once
+
+        Returns
+        -------
+        exists : bool
+            Returns true if some state is reachable from the start states
+        """
+        chunks = self.bfs_rpq_chunks(regex, chunk_size is not None, delta, chunk_size)
+        return next(chunks, None) is not None
+
+    def _bfs_rpq_ids(
+        self, regex: "Automaton", is_separately: bool, delta: bool
+    ) -> np.ndarray:
+        """Solves the reachability problem at once, see bfs_rpq
+
+        Parameters
+        ----------
+        regex : Automaton
+            Regular expression represented as an adjacency matrix
+        is_separately : bool
+            Flag represented type of solving problem
+        delta : bool
+            Flag represented type of bfs, see bfs_rpq
 
         Returns
         -------
-        States : Union[Set[any], Set[Tuple[any, any]]]
-            Depending on the type of problem being solved, it returns either a set of reachable states or a set of
-            pairs of states, where the first element is responsible for the starting state and the second for the
-            ending state.
+        result : np.ndarray
+            Returns sorted unique ids of reachable states or sorted unique pairs of ids
+            of start and reachable states as an array with shape k x 2
         """
 
-        regex_size = len(regex.states)
+        regex_size = regex.size
 
         # Intersect symbols
         symbols = self.symbols & regex.symbols
@@ -340,42 +1054,605 @@ class Automaton:
             is_visited = self._create_front_matrix(regex)
 
         # Starting bfs
-        while True:
-            old_is_visited = is_visited.nnz
+        if delta:
+            is_visited = _semi_naive_bfs(is_visited, matrices, symbols, regex_size)
+        else:
+            while True:
+                old_is_visited = is_visited.nnz
 
-            # Making bfs for each boolean matrix
-            for symbol in symbols:
-                result = is_visited @ matrices[symbol]
-                transformed = _transform_to_new_front(result, regex_n=regex_size)
-                is_visited += transformed
+                # Making bfs for each boolean matrix
+                for symbol in symbols:
+                    result = is_visited @ matrices[symbol]
+                    transformed = _transform_to_new_front(result, regex_n=regex_size)
+                    is_visited += transformed
 
-            if old_is_visited == is_visited.nnz:
-                break
+                if old_is_visited == is_visited.nnz:
+                    break
 
-        result = set()
-        regex_final = {regex.old_state_to_new[i] for i in regex.final_states}
-        graph_final = {self.old_state_to_new[i] for i in self.final_states}
         rows, cols = is_visited.nonzero()
-        for i, j in zip(rows, cols):
-            if (
-                j >= regex_size
-                and i % len(regex.states) in regex_final
-                and j - regex_size in graph_final
-            ):
-                final = j - regex_size
-                if is_separately:
-                    result.add((start_states_mapping[i // len(regex.states)], final))
-                else:
-                    result.add(final)
+        is_final = cols >= regex_size
+        rows, cols = rows[is_final], cols[is_final] - regex_size
+        is_final = regex.final_mask[rows % regex_size] & self.final_mask[cols]
+        rows, cols = rows[is_final], cols[is_final]
+
+        if not is_separately:
+            return np.unique(cols).astype(np.int64)
+
+        # Pairs are coded as block * size + state, the regex may reach a state at several rows of the block
+        pairs = np.unique(rows // regex_size * self.size + cols)
+        blocks, cols = np.divmod(pairs, self.size)
+        return np.stack([start_states_mapping[blocks], cols], axis=1).astype(np.int64)
+
+    def _bfs_rpq_by_chunks(
+        self,
+        regex: "Automaton",
+        delta: bool,
+        chunk_size: Optional[int],
+        processes: Optional[int],
+    ) -> Set[Tuple[any, any]]:
+        """Solves the reachability problem for each individual start vertex by chunks of start vertexes.
+        Chunks are solved one by one or in a pool of processes, the results are merged.
+
+        Parameters
+        ----------
+        regex : Automaton
+            Regular expression represented as an adjacency matrix
+        delta : bool
+            Flag represented type of bfs, see bfs_rpq
+        chunk_size : Optional[int]
+            Maximum number of start states at the chunk
+        processes : Optional[int]
+            Number of worker processes
+
+        Returns
+        -------
+        States : Set[Tuple[any, any]]
+            Returns a set of pairs of states, where the first element is responsible for the starting state
+            and the second for the ending state.
+        """
+        chunks = self._start_ids_chunks(chunk_size, processes)
+
+        result = set()
+        if processes is None or processes <= 1:
+            for chunk in chunks:
+                result |= self._with_start_ids(chunk).bfs_rpq(regex, True, delta)
+            return result
+
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_bfs_rpq_worker,
+            initargs=(self, regex, delta),
+        ) as executor:
+            for chunk_result in executor.map(_bfs_rpq_chunk, chunks):
+                result |= chunk_result
 
         return result
 
+    def _start_ids_chunks(
+        self, chunk_size: Optional[int], processes: Optional[int]
+    ) -> List[np.ndarray]:
+        """Split ids of start states into chunks
+
+        Parameters
+        ----------
+        chunk_size : Optional[int]
+            Maximum number of start states at the chunk. If none than start states are evenly
+            distributed between processes or form one chunk
+        processes : Optional[int]
+            Number of worker processes
+
+        Returns
+        -------
+        chunks : List[np.ndarray]
+            Returns ids of start states of every chunk
+        """
+        start_states = np.flatnonzero(self.start_mask)
+        if chunk_size is None:
+            chunk_size = -(-len(start_states) // (processes or 1))
+        chunk_size = max(chunk_size, 1)
+        return [
+            start_states[i : i + chunk_size]
+            for i in range(0, len(start_states), chunk_size)
+        ]
+
+    def _with_start_ids(self, start_ids: np.ndarray) -> "Automaton":
+        """Create an automaton that shares the transitions and differs only by start states
+
+        Parameters
+        ----------
+        start_ids : np.ndarray
+            Ids of new start states
+
+        Returns
+        -------
+        automaton : Automaton
+        """
+        automaton = copy(self)
+        automaton.start_mask = np.zeros(self.size, dtype=bool)
+        automaton.start_mask[start_ids] = True
+        return automaton
+
+
+# Automata of the reachability problem shared by the chunks solved at the worker process
+_worker_problem = None
+
+
+def _init_bfs_rpq_worker(graph: Automaton, regex: Automaton, delta: bool):
+    """Saves the reachability problem at the worker process
+
+    Parameters
+    ----------
+    graph : Automaton
+        Graph represented as an adjacency matrix
+    regex : Automaton
+        Regular expression represented as an adjacency matrix
+    delta : bool
+        Flag represented type of bfs, see Automaton.bfs_rpq
+    """
+    global _worker_problem
+    _worker_problem = (graph, regex, delta)
+
+
+def _bfs_rpq_chunk(start_ids: np.ndarray) -> Set[Tuple[int, int]]:
+    """Solves the reachability problem of the worker process for each start state of the chunk
+
+    Parameters
+    ----------
+    start_ids : np.ndarray
+        Ids of start states of the chunk
+
+    Returns
+    -------
+    States : Set[Tuple[int, int]]
+        Returns pairs of ids of reachable states
+    """
+    graph, regex, delta = _worker_problem
+    return graph._with_start_ids(start_ids).bfs_rpq(regex, True, delta)
+
+
+def _semi_naive_bfs(
+    is_visited: csr_matrix,
+    matrices: Dict[any, csr_matrix],
+    symbols: set,
+    regex_n: int,
+) -> csr_matrix:
+    """Makes bfs where only the entries discovered at the previous iteration are propagated.
+    The front keeps units of the left part on the main diagonal of every block, so its rows
+    are routed as rows of the visited matrix, while the right part contains only new vertexes.
+
+    Parameters
+    ----------
+    is_visited : csr_matrix
+        Initial front
+    matrices : Dict[any, csr_matrix]
+        Block-diagonal matrix for each symbol
+    symbols : set
+        Symbols of transitions
+    regex_n : int
+        Number of state at the regex fa
+
+    Returns
+    -------
+    is_visited : csr_matrix
+        Returns all visited entries
+    """
+    is_visited = csr_array(is_visited, dtype=bool)
+    front = is_visited
+
+    while front.nnz > 0:
+        new = csr_array(front.shape, dtype=bool)
+        for symbol in symbols:
+            new += _transform_to_new_front(front @ matrices[symbol], regex_n=regex_n)
+
+        # Keep only new vertexes of the right part
+        new = (new > is_visited).tocoo()
+        is_new = new.col >= regex_n
+        rows, cols = new.row[is_new], new.col[is_new]
+        new_rows = np.unique(rows)
+
+        front = csr_array(
+            (
+                np.ones(len(rows) + len(new_rows), dtype=bool),
+                (
+                    np.concatenate([rows, new_rows]),
+                    np.concatenate([cols, new_rows % regex_n]),
+                ),
+            ),
+            shape=is_visited.shape,
+        )
+        is_visited += front
+
+    return is_visited
+
+
+def _object_array(values: Iterable[any]) -> np.ndarray:
+    """Create one-dimensional numpy array of objects, e.g. states, which may be tuples themselves
+
+    Parameters
+    ----------
+    values : Iterable[any]
+        Values of the array
+
+    Returns
+    -------
+    array : np.ndarray
+    """
+    values = list(values)
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _gather_ranges(
+    indptr: np.ndarray, indices: np.ndarray, rows: np.ndarray
+) -> np.ndarray:
+    """Concatenate ranges indices[indptr[row]:indptr[row + 1]] for all rows without a loop
+
+    Parameters
+    ----------
+    indptr : np.ndarray
+        Bounds of the ranges, as in CSR format
+    indices : np.ndarray
+        Values of the ranges
+    rows : np.ndarray
+        Rows of the ranges
+
+    Returns
+    -------
+    values : np.ndarray
+        Returns concatenated values of the ranges
+    """
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return indices[offsets + np.arange(len(offsets))]
+
+
+def _is_epsilon(label: any) -> bool:
+    """Check that the edge label means epsilon transition"""
+    return isinstance(label, Epsilon) or (
+        isinstance(label, str) and label in EPSILON_LABELS
+    )
+
+
+def _states_mask(mapping: Dict[any, int], states: Iterable[any]) -> np.ndarray:
+    """Encode states to the boolean mask over state ids, unknown states are skipped
+
+    Parameters
+    ----------
+    mapping : Dict[any, int]
+        Mapping from states to their ids
+    states : Iterable[any]
+        States to encode
+
+    Returns
+    -------
+    mask : np.ndarray
+        Returns mask where the values of the given states are set
+    """
+    mask = np.zeros(len(mapping), dtype=bool)
+    mask[[mapping[state] for state in states if state in mapping]] = True
+    return mask
+
+
+def _closure_by_squaring(
+    adj_matrix: csr_array, backend: Optional[Union[str, MatrixBackend]] = None
+) -> csr_array:
+    """Constructs a transitive closure by repeated squaring of the adjacency matrix
+    until the number of nonzero values stops changing.
+
+    Parameters
+    ----------
+    adj_matrix : csr_array
+        Adjacency matrix
+    backend : Optional[Union[str, MatrixBackend]]
+        Matrix backend used for squaring. If none than the sparse backend is used,
+        and the matrix is switched to the bit backend once its density passes the threshold
+
+    Returns
+    -------
+    adjacency_matrix : csr_array
+        Returns transitive closure matrix
+    """
+    is_adaptive = backend is None
+    backend = get_backend(backend)
+    adj_matrix = backend.from_sparse(adj_matrix)
+    prev_nnz = backend.nnz(adj_matrix)
+    curr_nnz = 0
+
+    while prev_nnz != curr_nnz:
+        # Dense intermediate matrices are squared in the bit-packed form
+        if (
+            is_adaptive
+            and backend is not BIT
+            and is_dense(backend.nnz(adj_matrix), adj_matrix.shape)
+        ):
+            adj_matrix = BIT.from_sparse(backend.to_sparse(adj_matrix))
+            backend = BIT
+        adj_matrix = backend.add(adj_matrix, backend.multiply(adj_matrix, adj_matrix))
+        prev_nnz, curr_nnz = curr_nnz, backend.nnz(adj_matrix)
+
+    return backend.to_sparse(adj_matrix)
+
+
+def _closure_by_scc(adj_matrix: csr_array) -> csr_array:
+    """Constructs a transitive closure by condensation of strongly connected components.
+    The closure of the obtained DAG is computed in reverse topological order, then it is
+    expanded back to the states: i reaches j iff the component of i reaches the component of j
+    or they are the same component with at least one internal edge.
+
+    Parameters
+    ----------
+    adj_matrix : csr_array
+        Adjacency matrix
+
+    Returns
+    -------
+    adjacency_matrix : csr_array
+        Returns transitive closure matrix
+    """
+    n = adj_matrix.shape[0]
+    k, components = connected_components(adj_matrix, directed=True, connection="strong")
+
+    rows, cols = adj_matrix.nonzero()
+    rows, cols = components[rows], components[cols]
+    is_internal = rows == cols
+    is_cyclic = np.zeros(k, dtype=bool)
+    is_cyclic[rows[is_internal]] = True
+    dag = csr_array(
+        (
+            np.ones(np.count_nonzero(~is_internal), dtype=bool),
+            (rows[~is_internal], cols[~is_internal]),
+        ),
+        shape=(k, k),
+    )
+
+    # Kahn's algorithm, reachable components are collected from the sinks
+    in_degrees = np.bincount(dag.indices, minlength=k)
+    order = list(np.flatnonzero(in_degrees == 0))
+    for component in order:
+        for successor in dag.indices[dag.indptr[component] : dag.indptr[component + 1]]:
+            in_degrees[successor] -= 1
+            if in_degrees[successor] == 0:
+                order.append(successor)
+
+    reachable = [None] * k
+    for component in reversed(order):
+        successors = dag.indices[dag.indptr[component] : dag.indptr[component + 1]]
+        reachable[component] = np.unique(
+            np.concatenate([successors, *(reachable[s] for s in successors)])
+        ).astype(np.int64)
+
+    lengths = np.array([len(r) for r in reachable], dtype=np.int64)
+    dag_closure = csr_array(
+        (
+            np.ones(lengths.sum(), dtype=bool),
+            np.concatenate([np.empty(0, dtype=np.int64), *reachable]),
+            np.concatenate([[0], np.cumsum(lengths)]),
+        ),
+        shape=(k, k),
+    )
+    dag_closure += csr_array(diags(is_cyclic, dtype=bool))
+
+    membership = csr_array(
+        (np.ones(n, dtype=bool), (np.arange(n), components)), shape=(n, k)
+    )
+    return csr_array(membership @ dag_closure @ membership.T)
+
+
+def _closure_by_bfs(adj_matrix: csr_array) -> csr_array:
+    """Constructs a transitive closure by bfs from every state. The state itself is reachable
+    iff one of the states reachable from it has an edge to it.
+
+    Parameters
+    ----------
+    adj_matrix : csr_array
+        Adjacency matrix
+
+    Returns
+    -------
+    adjacency_matrix : csr_array
+        Returns transitive closure matrix
+    """
+    n = adj_matrix.shape[0]
+    predecessors = csr_array(adj_matrix.T)
+    rows = []
+
+    for i in range(n):
+        order = breadth_first_order(
+            adj_matrix, i, directed=True, return_predecessors=False
+        )
+        i_predecessors = predecessors.indices[
+            predecessors.indptr[i] : predecessors.indptr[i + 1]
+        ]
+        if not np.isin(i_predecessors, order).any():
+            order = order[1:]
+        rows.append(np.sort(order))
+
+    lengths = np.array([len(r) for r in rows], dtype=np.int64)
+    return csr_array(
+        (
+            np.ones(lengths.sum(), dtype=bool),
+            np.concatenate([np.empty(0, dtype=np.int64), *rows]),
+            np.concatenate([[0], np.cumsum(lengths)]),
+        ),
+        shape=(n, n),
+    )
+
+
+def _epsilon_closure(epsilon: csr_array) -> csr_array:
+    """Constructs a reflexive transitive closure of epsilon transitions. The transitive
+    closure is computed only for the states having epsilon transitions, so the cost
+    does not depend on the number of the other states.
+
+    Parameters
+    ----------
+    epsilon : csr_array
+        Adjacency matrix of epsilon transitions
+
+    Returns
+    -------
+    eclose : csr_array
+        Returns matrix where i-th row is the set of states reachable from i by epsilon
+        transitions, including i itself
+    """
+    n = epsilon.shape[0]
+    rows, cols = epsilon.nonzero()
+    states = np.unique(np.concatenate([rows, cols]))
+    k = len(states)
+
+    closure = csr_array(
+        (
+            np.ones(len(rows), dtype=bool),
+            (np.searchsorted(states, rows), np.searchsorted(states, cols)),
+        ),
+        shape=(k, k),
+    )
+    if k > 0:
+        closure = CLOSURE_STRATEGIES[_choose_closure_strategy(closure)](closure)
+    closure_rows, closure_cols = closure.nonzero()
+
+    identity = np.arange(n)
+    return SPARSE.from_coordinates(
+        np.concatenate([identity, states[closure_rows]]),
+        np.concatenate([identity, states[closure_cols]]),
+        (n, n),
+    )
+
+
+# Small or dense matrices are closed by squaring, the other ones by condensation
+SQUARING_MAX_SIZE = 256
+SQUARING_MIN_DENSITY = 0.05
+
+
+def _choose_closure_strategy(adj_matrix: csr_array) -> str:
+    """Choose the cheapest transitive closure strategy by the size and the density of the matrix
+
+    Parameters
+    ----------
+    adj_matrix : csr_array
+        Adjacency matrix
+
+    Returns
+    -------
+    strategy : str
+        Returns name of the strategy
+    """
+    n = adj_matrix.shape[0]
+    if n <= SQUARING_MAX_SIZE or adj_matrix.nnz >= SQUARING_MIN_DENSITY * n * n:
+        return "squaring"
+    return "scc"
+
+
+CLOSURE_STRATEGIES = {
+    "squaring": _closure_by_squaring,
+    "scc": _closure_by_scc,
+    "bfs": _closure_by_bfs,
+}
+
+
+def _build_symbol_matrices(
+    sources: np.ndarray,
+    targets: np.ndarray,
+    label_codes: np.ndarray,
+    labels: List[any],
+    n: int,
+) -> Dict[any, csr_array]:
+    """Builds adjacency matrix for each label in one grouped pass over the transitions.
+    Transitions are sorted by label code, so transitions of every label form a contiguous slice.
+
+    Parameters
+    ----------
+    sources : np.ndarray
+        Indexes of the source states of the transitions
+    targets : np.ndarray
+        Indexes of the target states of the transitions
+    label_codes : np.ndarray
+        Code of the label of each transition, i.e. index at the labels list
+    labels : List[any]
+        Labels of the transitions
+    n : int
+        Number of states
+
+    Returns
+    -------
+    symbol_matrices : Dict[any, csr_array]
+        Returns adjacency matrix for each label that has at least one transition
+    """
+    order = np.argsort(label_codes, kind="stable")
+    sources, targets = np.asarray(sources)[order], np.asarray(targets)[order]
+    bounds = np.searchsorted(
+        np.asarray(label_codes)[order], np.arange(len(labels) + 1), side="left"
+    )
+
+    matrices = {}
+    for code, label in enumerate(labels):
+        begin, end = bounds[code], bounds[code + 1]
+        if begin == end:
+            continue
+        matrices[label] = csr_array(
+            (
+                np.ones(end - begin, dtype=bool),
+                (sources[begin:end], targets[begin:end]),
+            ),
+            shape=(n, n),
+        )
+
+    return matrices
+
 
 def _transform_to_new_front(symbol_result: csr_matrix, regex_n: int) -> csr_matrix:
     """Transforms the front into valid on according to the following rules:
     1. The left part of the matrix may or may not have units on the main diagonal.
     2. Zero rows are not represented in the matrix
 
+    For every row i with a unit at the column j of the left part and a nonempty right part,
+    the right part is moved to the row i // regex_n * regex_n + j, which gets a unit on the
+    main diagonal. Only the right part is moved, so the row of a nondeterministic regex fa
+    with several units at the left part is split between several rows. All moves are done
+    at once as a product of a sparse selection matrix and the front.
+
+    Parameters
+    ----------
+    symbol_result : csr_matrix
+        Invalid front
+    regex_n : int
+        Number of state at the regex fa
+
+    Returns
+    -------
+    Front : csr_matrix
+        Valid new front
+    """
+
+    symbol_result = csr_array(symbol_result, dtype=bool)
+    n = symbol_result.shape[0]
+    rows, cols = symbol_result.nonzero()
+
+    is_right = cols >= regex_n
+    has_right = np.zeros(n, dtype=bool)
+    has_right[rows[is_right]] = True
+    right_part = SPARSE.from_coordinates(
+        rows[is_right], cols[is_right], symbol_result.shape
+    )
+
+    is_moved = (cols < regex_n) & has_right[rows]
+    rows, cols = rows[is_moved], cols[is_moved]
+    targets = rows // regex_n * regex_n + cols
+    selection = SPARSE.from_coordinates(targets, rows, (n, n))
+    diagonal = SPARSE.from_coordinates(targets, cols, symbol_result.shape)
+
+    return csr_array(selection @ right_part + diagonal)
+
+
+def _transform_to_new_front_by_rows(
+    symbol_result: csr_matrix, regex_n: int
+) -> csr_matrix:
+    """Reference row by row implementation of _transform_to_new_front.
+    Transforms the front into valid on according to the following rules:
+    1. The left part of the matrix may or may not have units on the main diagonal.
+    2. Zero rows are not represented in the matrix
+
     Parameters
     ----------
     symbol_result : csr_matrix
@@ -393,8 +1670,11 @@ def _transform_to_new_front(symbol_result: csr_matrix, regex_n: int) -> csr_matr
     rows, cols = symbol_result.nonzero()
     for i, j in zip(rows, cols):
         if j < regex_n:
-            row = symbol_result.getrow(i)
-            if row.nnz > 1:
-                new_front[[i // regex_n * regex_n + j], :] += row.tolil()
+            right_part = symbol_result.getrow(i).tolil()
+            right_part[:, :regex_n] = False
+            if right_part.nnz > 0:
+                target = i // regex_n * regex_n + j
+                new_front[[target], :] += right_part
+                new_front[target, j] = True
 
     return new_front.tocsr()
@@ -1,13 +1,23 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from project.Automaton import Automaton
+from project.product_automaton import ProductAutomaton
 
+import numpy as np
 from pyformlang.regular_expression import Regex
+from pyformlang.regular_expression.regex_objects import (
+    Concatenation,
+    Empty,
+    Epsilon,
+    KleeneStar,
+    Symbol as RegexSymbol,
+    Union,
+)
 from pyformlang.finite_automaton import (
     DeterministicFiniteAutomaton,
     NondeterministicFiniteAutomaton,
-    EpsilonNFA,
     State,
+    Symbol,
 )
 
 
@@ -25,7 +35,156 @@ def regex_to_minimal_dfa(regex: Regex) -> DeterministicFiniteAutomaton:
         Deterministic finite automaton obtained from the regular expression.
     """
 
-    return regex.to_epsilon_nfa().minimize()
+    return regex_to_automaton(regex).determinize().minimize().to_dfa()
+
+
+def regex_to_automaton(regex: Regex) -> Automaton:
+    """Convert regular expression directly to the automaton represented as adjacency matrices.
+    Glushkov (position) automaton is built: the state 0 is the start one, the other states are
+    positions of symbols in the regex. Then states with the same outgoing transitions to
+    equivalent states are merged (bisimulation), e.g. (a|b|c)* becomes one state.
+
+    Parameters
+    ----------
+    regex : Regex
+        Regular expression.
+
+    Returns
+    -------
+    automaton : Automaton
+        Nondeterministic automaton accepting the language of the regular expression.
+    """
+
+    labels = []  # Symbol of each position, position i is the state i + 1
+    follow = [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))]
+
+    def glushkov(sub_regex: Regex) -> Tuple[bool, np.ndarray, np.ndarray]:
+        """Returns whether the regex accepts epsilon, its first and last positions"""
+        head = sub_regex.head
+        if isinstance(head, Epsilon):
+            return True, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        if isinstance(head, Empty):
+            return False, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        if isinstance(head, RegexSymbol):
+            labels.append(Symbol(head.value))
+            position = np.array([len(labels)], dtype=np.int64)
+            return False, position, position
+
+        sons = [glushkov(son) for son in sub_regex.sons]
+        if isinstance(head, KleeneStar):
+            _, first, last = sons[0]
+            follow.append(_all_pairs(last, first))
+            return True, first, last
+        if isinstance(head, Union):
+            return (
+                any(nullable for nullable, _, _ in sons),
+                np.concatenate([first for _, first, _ in sons]),
+                np.concatenate([last for _, _, last in sons]),
+            )
+        if isinstance(head, Concatenation):
+            nullable, first, last = sons[0]
+            for son_nullable, son_first, son_last in sons[1:]:
+                follow.append(_all_pairs(last, son_first))
+                if nullable:
+                    first = np.concatenate([first, son_first])
+                if son_nullable:
+                    son_last = np.concatenate([last, son_last])
+                nullable, last = nullable and son_nullable, son_last
+            return nullable, first, last
+
+        raise ValueError(f"Unsupported regex node: {head}")
+
+    nullable, first, last = glushkov(regex)
+
+    sources = np.concatenate(
+        [np.zeros(len(first), dtype=np.int64), *(f for f, _ in follow)]
+    )
+    targets = np.concatenate([first, *(t for _, t in follow)])
+    final_mask = np.zeros(len(labels) + 1, dtype=bool)
+    final_mask[last] = True
+    final_mask[0] = nullable
+
+    # Label of the transition is the symbol of its target position
+    symbol_codes = {}
+    position_codes = np.array(
+        [-1] + [symbol_codes.setdefault(label, len(symbol_codes)) for label in labels],
+        dtype=np.int64,
+    )
+    label_codes = position_codes[targets]
+
+    # Merge bisimilar states
+    blocks = _bisimulation_blocks(sources, targets, label_codes, final_mask)
+    transitions = np.unique(
+        np.stack([blocks[sources], label_codes, blocks[targets]], axis=1), axis=0
+    ).reshape(-1, 3)
+
+    return Automaton.from_arrays(
+        transitions[:, 0],
+        transitions[:, 2],
+        transitions[:, 1],
+        list(symbol_codes),
+        list(range(blocks.max() + 1)),
+        {blocks[0]},
+        set(blocks[final_mask].tolist()),
+    )
+
+
+def _all_pairs(
+    sources: np.ndarray, targets: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Cartesian product of two arrays of states as two arrays"""
+    return np.repeat(sources, len(targets)), np.tile(targets, len(sources))
+
+
+def _bisimulation_blocks(
+    sources: np.ndarray,
+    targets: np.ndarray,
+    label_codes: np.ndarray,
+    final_mask: np.ndarray,
+) -> np.ndarray:
+    """Split states of the automaton to blocks of bisimilar states: states are in the same block
+    iff they are both final or not and have transitions by the same labels to the same blocks.
+    Blocks are refined by signatures until their number stops changing.
+
+    Parameters
+    ----------
+    sources : np.ndarray
+        Indexes of the source states of the transitions
+    targets : np.ndarray
+        Indexes of the target states of the transitions
+    label_codes : np.ndarray
+        Code of the label of each transition
+    final_mask : np.ndarray
+        Mask of final states
+
+    Returns
+    -------
+    blocks : np.ndarray
+        Returns block of each state, blocks are numbered from zero in order of states
+    """
+    n = len(final_mask)
+    blocks = final_mask.astype(np.int64)
+    blocks_num = -1
+
+    while True:
+        transitions = np.unique(
+            np.stack([sources, label_codes, blocks[targets]], axis=1), axis=0
+        ).reshape(-1, 3)
+        signatures = [[block] for block in blocks.tolist()]
+        for source, code, block in transitions.tolist():
+            signatures[source].extend((code, block))
+
+        signature_blocks = {}
+        blocks = np.array(
+            [
+                signature_blocks.setdefault(tuple(signature), len(signature_blocks))
+                for signature in signatures
+            ],
+            dtype=np.int64,
+        ).reshape(n)
+        if len(signature_blocks) == blocks_num:
+            return blocks
+        blocks_num = len(signature_blocks)
 
 
 def graph_to_nfa(
@@ -41,9 +200,9 @@ def graph_to_nfa(
     graph : any
         Graph from networkx
     start_states: Optional[List[State]]
-        Start states of nondeterministic finite automaton
+        Start states of nondeterministic finite automaton. If none than all nodes are start states
     final_states: Optional[List[State]]
-        Final states of nondeterministic finite automaton
+        Final states of nondeterministic finite automaton. If none than all nodes are final states
 
     Returns
     -------
@@ -51,27 +210,17 @@ def graph_to_nfa(
         Nondeterministic finite automaton obtained from the graph.
     """
 
-    nfa = EpsilonNFA.from_networkx(graph)
-
-    if start_states:
-        for state in start_states:
-            nfa.add_start_state(state)
-    else:
-        for state in nfa.states:
-            nfa.add_start_state(state)
-
-    if final_states:
-        for state in final_states:
-            nfa.add_final_state(state)
-    else:
-        for state in nfa.states:
-            nfa.add_final_state(state)
-    return nfa.remove_epsilon_transitions()
+    # Epsilon edges are folded on the sparse matrices of the graph
+    automaton = Automaton.from_graph(graph, start_states or None, final_states or None)
+    return automaton.to_nfa()
 
 
-def intersect_two_finite_automatons(first_fa: any, second_fa: any) -> any:
+def intersect_two_finite_automatons(
+    first_fa: any, second_fa: any, prune: bool = False
+) -> any:
 
-    """Computes the intersection of two automata
+    """Computes the intersection of two automata. Only the product states reachable
+    from the start states are built.
 
     Parameters
     ----------
@@ -79,6 +228,8 @@ def intersect_two_finite_automatons(first_fa: any, second_fa: any) -> any:
         Finite automaton from pyformlang
     second_fa: Optional[List[State]]
         Finite automaton from pyformlang
+    prune : bool
+        If true, states from which no final state is reachable are removed too
 
     Returns
     -------
@@ -88,5 +239,7 @@ def intersect_two_finite_automatons(first_fa: any, second_fa: any) -> any:
 
     first_automaton = Automaton.from_fa(first_fa)
     second_automaton = Automaton.from_fa(second_fa)
-    intersection_automaton = first_automaton.intersect(second_automaton)
+    intersection_automaton = ProductAutomaton(
+        first_automaton, second_automaton
+    ).reachable_part(prune)
     return intersection_automaton.to_automata()
@@ -0,0 +1,147 @@
+from typing import Tuple
+
+import numpy as np
+from scipy.sparse import csr_array
+
+WORD_SIZE = 64
+
+# Boolean matrices with greater density are stored as BitMatrix by closures
+DENSITY_THRESHOLD = 0.1
+
+# Number of set bits for every byte value
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+
+class BitMatrix:
+    """Dense boolean matrix, each row is packed into words of uint64.
+    The value at (i, j) is the bit j % 64 of the word words[i, j // 64].
+    """
+
+    def __init__(self, words: np.ndarray, shape: Tuple[int, int]):
+        self.words = words
+        self.shape = shape
+
+    @classmethod
+    def zeros(cls, shape: Tuple[int, int]) -> "BitMatrix":
+        """Create matrix without set values
+
+        Parameters
+        ----------
+        shape : Tuple[int, int]
+            Shape of the matrix
+
+        Returns
+        -------
+        matrix : BitMatrix
+        """
+        n, m = shape
+        return cls(np.zeros((n, -(-m // WORD_SIZE)), dtype=np.uint64), shape)
+
+    @classmethod
+    def from_sparse(cls, matrix: any) -> "BitMatrix":
+        """Pack scipy sparse matrix
+
+        Parameters
+        ----------
+        matrix : any
+            Boolean matrix from scipy.sparse
+
+        Returns
+        -------
+        matrix : BitMatrix
+        """
+        result = cls.zeros(matrix.shape)
+        rows, cols = matrix.nonzero()
+        np.bitwise_or.at(
+            result.words,
+            (rows, cols // WORD_SIZE),
+            np.left_shift(np.uint64(1), (cols % WORD_SIZE).astype(np.uint64)),
+        )
+        return result
+
+    @property
+    def nnz(self) -> int:
+        """Number of set values"""
+        return int(_BYTE_POPCOUNT[self.words.view(np.uint8)].sum())
+
+    @property
+    def density(self) -> float:
+        """Part of set values"""
+        n, m = self.shape
+        return self.nnz / (n * m) if n * m else 0.0
+
+    def _bits(self) -> np.ndarray:
+        """Unpack the matrix to numpy boolean matrix"""
+        bits = np.unpackbits(
+            self.words.view(np.uint8), axis=1, count=self.shape[1], bitorder="little"
+        )
+        return bits.astype(bool)
+
+    def nonzero(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Indexes of set values ordered by rows
+
+        Returns
+        -------
+        rows, cols : Tuple[np.ndarray, np.ndarray]
+        """
+        return np.nonzero(self._bits())
+
+    def to_sparse(self) -> csr_array:
+        """Unpack the matrix to scipy sparse matrix
+
+        Returns
+        -------
+        matrix : csr_array
+        """
+        return csr_array(self._bits())
+
+    def __add__(self, other: "BitMatrix") -> "BitMatrix":
+        """Elementwise OR"""
+        return BitMatrix(self.words | other.words, self.shape)
+
+    def __iadd__(self, other: "BitMatrix") -> "BitMatrix":
+        self.words |= other.words
+        return self
+
+    def __matmul__(self, other: "BitMatrix") -> "BitMatrix":
+        """Boolean (OR-AND) matrix product. Method of four Russians: columns of the left matrix
+        are processed by bytes, for every byte ORs of all subsets of the eight corresponding
+        rows of the right matrix are precomputed.
+        """
+        n, m = self.shape
+        result = BitMatrix.zeros((n, other.shape[1]))
+        left_bytes = self.words.view(np.uint8)
+
+        for group in range(-(-m // 8)):
+            column_bytes = left_bytes[:, group]
+            has_bits = np.flatnonzero(column_bytes)
+            if len(has_bits) == 0:
+                continue
+
+            right_rows = other.words[group * 8 : (group + 1) * 8]
+            table = np.zeros((256, other.words.shape[1]), dtype=np.uint64)
+            for bit, row in enumerate(right_rows):
+                table[1 << bit : 2 << bit] = table[: 1 << bit] | row
+
+            result.words[has_bits] |= table[column_bytes[has_bits]]
+
+        return result
+
+
+def is_dense(nnz: int, shape: Tuple[int, int]) -> bool:
+    """Check that boolean matrix should be stored as BitMatrix
+
+    Parameters
+    ----------
+    nnz : int
+        Number of set values
+    shape : Tuple[int, int]
+        Shape of the matrix
+
+    Returns
+    -------
+    is_dense : bool
+        Returns true if the density of the matrix passes DENSITY_THRESHOLD
+    """
+    n, m = shape
+    return n * m > 0 and nnz > DENSITY_THRESHOLD * n * m
@@ -1,4 +1,6 @@
-from typing import Set
+import pathlib
+from functools import partial
+from typing import Optional, Set, Union
 from collections.abc import Callable
 
 from project.cfpq_algorithms import (
@@ -6,6 +8,7 @@ from project.cfpq_algorithms import (
     matrix_closure,
     tensor_closure,
 )
+from project.matrix_backend import MatrixBackend
 
 from networkx import MultiDiGraph
 from pyformlang.cfg import CFG, Variable
@@ -43,19 +46,15 @@ def _cfpq(
         Set of pairs of graph vertices that satisfies the request
     """
 
-    if start_vertices is None:
-        start_vertices = graph.nodes
-    if final_vertices is None:
-        final_vertices = graph.nodes
-
     transitive_closure = algorithm(graph, request)
 
+    # Vertexes of the closure are nodes of the graph, so none means any of them
     res = {
         (start_node, final_node)
         for start_node, variable, final_node in transitive_closure
-        if start_node in start_vertices
+        if (start_vertices is None or start_node in start_vertices)
         and variable == start_variable
-        and final_node in final_vertices
+        and (final_vertices is None or final_node in final_vertices)
     }
 
     return res
@@ -105,6 +104,9 @@ def matrix(
     start_vertices: Set = None,
     final_vertices: Set = None,
     start_variable: Variable = Variable("S"),
+    backend: Optional[Union[str, MatrixBackend]] = None,
+    index_dir: Optional[str | pathlib.Path] = None,
+    index_key: Optional[str] = None,
 ) -> Set:
     """It allows you to solve a reachability problem for start and final vertices of your graph.
     A reachability constraint is a context-free grammar. Matrix algorithm is used for solution.
@@ -121,6 +123,13 @@ def matrix(
         Final vertices of input graph
     start_variable: Variable
         Start variable to grammar
+    backend: Optional[Union[str, MatrixBackend]]
+        Matrix backend ("sparse", "dense" or "bit"). If none than it is chosen by the density of matrices
+    index_dir: Optional[str | pathlib.Path]
+        Directory of graph indexes, see graph_index. If none than the graph matrices are built
+    index_key: Optional[str]
+        Name of the index of the graph, see graph_index.load_graph_automaton.
+        If given and the index exists, the graph may be none
 
     Returns
     -------
@@ -128,7 +137,14 @@ def matrix(
         Set of pairs of graph vertices that satisfies the request
     """
     return _cfpq(
-        graph, request, matrix_closure, start_vertices, final_vertices, start_variable
+        graph,
+        request,
+        partial(
+            matrix_closure, backend=backend, index_dir=index_dir, index_key=index_key
+        ),
+        start_vertices,
+        final_vertices,
+        start_variable,
     )
 
 
@@ -138,6 +154,9 @@ def tensor(
     start_vertices: Set = None,
     final_vertices: Set = None,
     start_variable: Variable = Variable("S"),
+    backend: Optional[Union[str, MatrixBackend]] = None,
+    index_dir: Optional[str | pathlib.Path] = None,
+    index_key: Optional[str] = None,
 ) -> Set:
     """It allows you to solve a reachability problem for start and final vertices of your graph.
     A reachability constraint is a context-free grammar. Tensor algorithm is used for solution.
@@ -154,6 +173,13 @@ def tensor(
         Final vertices of input graph
     start_variable: Variable
         Start variable to grammar
+    backend: Optional[Union[str, MatrixBackend]]
+        Matrix backend ("sparse", "dense" or "bit"). If none than it is chosen by the density of matrices
+    index_dir: Optional[str | pathlib.Path]
+        Directory of graph indexes, see graph_index. If none than the graph matrices are built
+    index_key: Optional[str]
+        Name of the index of the graph, see graph_index.load_graph_automaton.
+        If given and the index exists, the graph may be none
 
     Returns
     -------
@@ -161,5 +187,12 @@ def tensor(
         Set of pairs of graph vertices that satisfies the request
     """
     return _cfpq(
-        graph, request, tensor_closure, start_vertices, final_vertices, start_variable
+        graph,
+        request,
+        partial(
+            tensor_closure, backend=backend, index_dir=index_dir, index_key=index_key
+        ),
+        start_vertices,
+        final_vertices,
+        start_variable,
     )
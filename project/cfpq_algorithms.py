@@ -1,16 +1,19 @@
-from typing import Set
+import pathlib
+from typing import Optional, Set, Union
 
 from project.graphs_lib import LABEL
 from project.cfg import cfg_to_wcnf
 from project.ecfg import ECFG
 from project.automaton_lib import Automaton
+from project.bit_matrix import is_dense
+from project.graph_index import load_graph_automaton
+from project.matrix_backend import BIT, SPARSE, MatrixBackend, get_backend
 from project.rsm import RSM
 
+import numpy as np
 from networkx import MultiDiGraph
 from pyformlang.cfg import CFG
-from pyformlang.finite_automaton import EpsilonNFA
-from scipy.sparse import lil_matrix, csr_array
-from scipy import sparse
+from scipy.sparse import csr_array
 
 
 def _prepare_wcfg_for_algorithm(wcnf: CFG) -> (Set, Set, Set):
@@ -107,7 +110,13 @@ def constrained_transitive_closure(graph: MultiDiGraph, cfg: CFG) -> Set:
     return res
 
 
-def matrix_closure(graph: MultiDiGraph, cfg: CFG) -> Set:
+def matrix_closure(
+    graph: MultiDiGraph,
+    cfg: CFG,
+    backend: Optional[Union[str, MatrixBackend]] = None,
+    index_dir: Optional[str | pathlib.Path] = None,
+    index_key: Optional[str] = None,
+) -> Set:
     """Find transitive closure of the graph with constraints of cfg grammar
     Use matrix algorithm.
 
@@ -117,6 +126,14 @@ def matrix_closure(graph: MultiDiGraph, cfg: CFG) -> Set:
         Input graph from networkx
     cfg : CFG
         Context-Free Grammar represents constraints
+    backend : Optional[Union[str, MatrixBackend]]
+        Matrix backend. If none than sparse matrices are used
+        and they are switched to bit-packed ones once they become dense
+    index_dir : Optional[str | pathlib.Path]
+        Directory of graph indexes, see graph_index. If none than the graph matrices are built
+    index_key : Optional[str]
+        Name of the index of the graph, see graph_index.load_graph_automaton.
+        If given and the index exists, the graph may be none
 
     Returns
     -------
@@ -124,39 +141,71 @@ def matrix_closure(graph: MultiDiGraph, cfg: CFG) -> Set:
         Constrained transitive closure of graph
     """
 
+    is_adaptive = backend is None
+    backend = get_backend(backend)
     wcnf = cfg_to_wcnf(cfg)
     epsilon_prods, term_prods, var_prods = _prepare_wcfg_for_algorithm(wcnf)
 
-    nodes = list(graph.nodes)
-    indexes_nodes = {node: i for i, node in enumerate(nodes)}
-    n = graph.number_of_nodes()
+    graph_matrix = load_graph_automaton(graph, index_dir, index_key)
+    nodes = graph_matrix.state_table
+    n = graph_matrix.size
 
-    matrices = {var: lil_matrix((n, n), dtype=bool) for var in wcnf.variables}
+    coordinates = {var: [] for var in wcnf.variables}
 
-    for i in range(n):
-        for var in epsilon_prods:
-            matrices[var][i, i] = True
+    for var in epsilon_prods:
+        coordinates[var].append((np.arange(n), np.arange(n)))
 
-    for u, v, label in graph.edges(data=LABEL):
-        i, j = indexes_nodes[u], indexes_nodes[v]
-        for var in term_prods:
-            matrices[var.head][i, j] |= label == var.body[0].value
+    for var in term_prods:
+        label_matrix = graph_matrix.symbol_matrices.get(var.body[0].value)
+        if label_matrix is not None:
+            coordinates[var.head].append(label_matrix.nonzero())
+
+    matrices = {
+        var: backend.from_coordinates(
+            np.concatenate([rows for rows, _ in coords] + [np.empty(0, np.int64)]),
+            np.concatenate([cols for _, cols in coords] + [np.empty(0, np.int64)]),
+            (n, n),
+        )
+        for var, coords in coordinates.items()
+    }
 
     while True:
-        old_nnz = sum([v.nnz for v in matrices.values()])
+        old_nnz = sum([backend.nnz(v) for v in matrices.values()])
+
+        # Dense matrices are switched to the bit-packed form
+        if (
+            is_adaptive
+            and backend is not BIT
+            and is_dense(old_nnz, (len(matrices) * n, n))
+        ):
+            matrices = {
+                var: BIT.from_sparse(backend.to_sparse(m))
+                for var, m in matrices.items()
+            }
+            backend = BIT
+
         for prod in var_prods:
-            matrices[prod.head] += matrices[prod.body[0]] @ matrices[prod.body[1]]
-        if old_nnz == sum([value.nnz for value in matrices.values()]):
+            matrices[prod.head] = backend.add(
+                matrices[prod.head],
+                backend.multiply(matrices[prod.body[0]], matrices[prod.body[1]]),
+            )
+        if old_nnz == sum([backend.nnz(value) for value in matrices.values()]):
             break
 
     return set(
         (nodes[i], v, nodes[j])
         for v, matrix in matrices.items()
-        for i, j in zip(*matrix.nonzero())
+        for i, j in zip(*backend.nonzero(matrix))
     )
 
 
-def tensor_closure(graph: MultiDiGraph, cfg: CFG) -> Set:
+def tensor_closure(
+    graph: MultiDiGraph,
+    cfg: CFG,
+    backend: Optional[Union[str, MatrixBackend]] = None,
+    index_dir: Optional[str | pathlib.Path] = None,
+    index_key: Optional[str] = None,
+) -> Set:
     """Find transitive closure of the graph with constraints of cfg grammar.
     Use tensor algorithm.
 
@@ -166,6 +215,14 @@ def tensor_closure(graph: MultiDiGraph, cfg: CFG) -> Set:
         Input graph from networkx
     cfg : CFG
         Context-Free Grammar represents constraints
+    backend : Optional[Union[str, MatrixBackend]]
+        Matrix backend used for Kronecker products and transitive closures,
+        see Automaton.intersect and Automaton.transitive_closure
+    index_dir : Optional[str | pathlib.Path]
+        Directory of graph indexes, see graph_index. If none than the graph matrices are built
+    index_key : Optional[str]
+        Name of the index of the graph, see graph_index.load_graph_automaton.
+        If given and the index exists, the graph may be none
 
     Returns
     -------
@@ -175,47 +232,64 @@ def tensor_closure(graph: MultiDiGraph, cfg: CFG) -> Set:
     ecfg = ECFG.from_cfg(cfg)
     rsm = RSM.from_ecfg(ecfg).minimize()
     rsm_matrix = Automaton.from_rsm(rsm)
-    rsm_states = {i: state for state, i in rsm_matrix.old_state_to_new.items()}
-
-    graph_matrix = Automaton.from_fa(EpsilonNFA.from_networkx(graph))
-    n = len(graph_matrix.states)
-    graph_states = {i: state for state, i in graph_matrix.old_state_to_new.items()}
-
-    id_mat = sparse.eye(n, dtype=bool).todok()
+    rsm_vars = [state.value[0] for state in rsm_matrix.state_table]
+    var_codes = {var: i for i, var in enumerate(set(rsm_vars))}
+    rsm_var_codes = np.array([var_codes[var] for var in rsm_vars], dtype=np.int64)
+
+    graph_matrix = load_graph_automaton(graph, index_dir, index_key)
+    n = graph_matrix.size
+    graph_states = graph_matrix.state_table
+
+    kron_backend = get_backend(backend)
+
+    def add_transitions(var: any, matrix: csr_array):
+        """Add new transitions by the variable to the graph and to the intersection"""
+        old = graph_matrix.symbol_matrices.get(var)
+        delta = matrix if old is None else csr_array(matrix > old)
+        if delta.nnz == 0:
+            return
+        graph_matrix.add_transitions(var, delta)
+        if var in rsm_matrix.symbol_matrices:
+            intersection.add_transitions(
+                var,
+                kron_backend.to_sparse(
+                    kron_backend.kron(
+                        kron_backend.from_sparse(rsm_matrix.symbol_matrices[var]),
+                        kron_backend.from_sparse(delta),
+                    )
+                ),
+            )
+
+    # The intersection is updated by Kronecker products of new transitions only
+    intersection = rsm_matrix.intersect(graph_matrix, backend)
+    identity = SPARSE.from_coordinates(np.arange(n), np.arange(n), (n, n))
     for var in cfg.get_nullable_symbols():
-        if var.value not in graph_matrix.symbol_matrices:
-            graph_matrix.symbol_matrices[var.value] = csr_array((n, n), dtype=bool)
-            graph_matrix.symbols.add(var.value)
-        graph_matrix.symbol_matrices[var.value] += id_mat
+        add_transitions(var.value, identity)
 
     prev_nnz = 0
 
     while True:
-        tc_nnz_indexes = list(
-            zip(*rsm_matrix.intersect(graph_matrix).transitive_closure().nonzero())
-        )
-        if len(tc_nnz_indexes) == prev_nnz:
+        rows, cols = intersection.transitive_closure(backend=backend).nonzero()
+        if len(rows) == prev_nnz:
             break
 
-        prev_nnz = len(tc_nnz_indexes)
-
-        for i, j in tc_nnz_indexes:
-            cfg_i, cfg_j = i // n, j // n
-            graph_i, graph_j = i % n, j % n
+        prev_nnz = len(rows)
 
-            state_source = rsm_states[cfg_i]
-            state_target = rsm_states[cfg_j]
+        cfg_i, graph_i = np.divmod(rows, n)
+        cfg_j, graph_j = np.divmod(cols, n)
 
-            var, _ = state_source.value
+        # Paths from the start to the final state of the box of the variable
+        is_box_path = rsm_matrix.start_mask[cfg_i] & rsm_matrix.final_mask[cfg_j]
+        codes = rsm_var_codes[cfg_i[is_box_path]]
+        graph_i, graph_j = graph_i[is_box_path], graph_j[is_box_path]
 
-            if (
-                state_source in rsm_matrix.start_states
-                and state_target in rsm_matrix.final_states
-            ):
-                if var not in graph_matrix.symbol_matrices:
-                    graph_matrix.symbols.add(var)
-                    graph_matrix.symbol_matrices[var] = csr_array((n, n), dtype=bool)
-                graph_matrix.symbol_matrices[var][graph_i, graph_j] = True
+        for var, code in var_codes.items():
+            is_var = codes == code
+            if is_var.any():
+                add_transitions(
+                    var,
+                    SPARSE.from_coordinates(graph_i[is_var], graph_j[is_var], (n, n)),
+                )
 
     return {
         (graph_states[graph_i], var, graph_states[graph_j])
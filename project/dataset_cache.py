@@ -0,0 +1,131 @@
+import os
+import pathlib
+import shutil
+from typing import Optional
+
+from project import graph_storage
+from project.graph_reader import LabeledEdges
+
+import cfpq_data
+import networkx as nx
+
+# Environment variable with the directory of the default cache
+CACHE_DIR_VARIABLE = "GRAPH_DATASET_CACHE_DIR"
+DEFAULT_CACHE_DIR = pathlib.Path.home() / ".cache" / "formal-lang-course" / "graphs"
+DEFAULT_MAX_BYTES = 2**30
+
+
+class DatasetCache:
+    """Cache of the graphs of cfpq_data dataset on the disk. The graph is downloaded and parsed
+    on the first access, then it is stored in the binary format of graph_storage, so the next
+    accesses, also from other processes, only load it. When the total size of the cached graphs
+    exceeds the limit, the least recently used ones are removed.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str | pathlib.Path] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        if max_bytes < 1:
+            raise ValueError(f"Size of the cache must be positive: {max_bytes}")
+        if path is None:
+            path = os.environ.get(CACHE_DIR_VARIABLE, DEFAULT_CACHE_DIR)
+        self.path = pathlib.Path(path)
+        self.max_bytes = max_bytes
+
+    def __contains__(self, graph_name: str) -> bool:
+        return self._graph_path(graph_name).exists()
+
+    def edges(self, graph_name: str) -> LabeledEdges:
+        """Get edges of the graph, download and parse it if it is not cached
+
+        Parameters
+        ----------
+        graph_name : str
+            The name of the graph from cfpq_data dataset
+
+        Returns
+        -------
+        edges : LabeledEdges
+            Returns edges of the graph coded by integers
+        """
+        path = self._graph_path(graph_name)
+        if path.exists():
+            try:
+                edges = graph_storage.load_edges(path)
+                os.utime(path)
+                return edges
+            except ValueError:
+                # Stored by another version of the format
+                shutil.rmtree(path, ignore_errors=True)
+
+        edges = LabeledEdges.from_networkx(
+            cfpq_data.graph_from_csv(cfpq_data.download(graph_name))
+        )
+
+        graph_storage.write_directory_atomically(
+            path, lambda tmp_path: graph_storage.save_edges(edges, tmp_path)
+        )
+
+        self._evict(keep=path)
+        return edges
+
+    def graph(self, graph_name: str) -> nx.MultiDiGraph:
+        """Get the graph, download and parse it if it is not cached
+
+        Parameters
+        ----------
+        graph_name : str
+            The name of the graph from cfpq_data dataset
+
+        Returns
+        -------
+        graph : nx.MultiDiGraph
+        """
+        return self.edges(graph_name).to_networkx()
+
+    def size(self) -> int:
+        """Total size of the cached graphs in bytes"""
+        return sum(_directory_size(path) for path in self._graph_paths())
+
+    def clear(self):
+        """Remove all cached graphs"""
+        for path in self._graph_paths():
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _graph_path(self, graph_name: str) -> pathlib.Path:
+        if not graph_name or graph_name.startswith(".") or "/" in graph_name:
+            raise ValueError(f"Invalid graph name: {graph_name}")
+        return self.path / graph_name
+
+    def _graph_paths(self) -> list:
+        if not self.path.exists():
+            return []
+        return [
+            path
+            for path in self.path.iterdir()
+            if path.is_dir() and not path.name.startswith(".")
+        ]
+
+    def _evict(self, keep: pathlib.Path):
+        """Remove the least recently used graphs exceeding the size of the cache,
+        the kept graph is never removed"""
+        paths = sorted(self._graph_paths(), key=lambda path: path.stat().st_mtime)
+        sizes = {path: _directory_size(path) for path in paths}
+        total = sum(sizes.values())
+        for path in paths:
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                shutil.rmtree(path, ignore_errors=True)
+                total -= sizes[path]
+
+
+def _directory_size(path: pathlib.Path) -> int:
+    """Total size of the files at the directory in bytes"""
+    return sum(file.stat().st_size for file in path.iterdir() if file.is_file())
+
+
+# Cache used by graphs_lib by default
+DEFAULT_DATASET_CACHE = DatasetCache()
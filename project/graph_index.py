@@ -0,0 +1,228 @@
+import hashlib
+import pathlib
+import pickle
+from typing import Iterable, Optional
+
+from project.Automaton import Automaton
+from project.graph_reader import LabeledEdges
+from project.graph_storage import write_directory_atomically
+
+import numpy as np
+from networkx import MultiDiGraph
+from scipy.sparse import csr_array
+
+# Bumped when the layout of the index changes, so old indexes are rebuilt
+INDEX_VERSION = 1
+
+_META_FILE = "meta.pickle"
+# Fixed, so fingerprints do not depend on the default protocol of the python version
+_PICKLE_PROTOCOL = 4
+
+
+def edges_fingerprint(edges: LabeledEdges) -> str:
+    """Hash of the vertexes, labels and coded edges of the graph. Edge arrays are hashed
+    as raw bytes, only vertexes and labels are pickled.
+
+    Parameters
+    ----------
+    edges : LabeledEdges
+        Edges of the graph coded by integers
+
+    Returns
+    -------
+    fingerprint : str
+        Returns hex digest of the graph
+    """
+    digest = hashlib.sha256(f"v{INDEX_VERSION}".encode())
+    digest.update(pickle.dumps(edges.vertices, protocol=_PICKLE_PROTOCOL))
+    digest.update(pickle.dumps(edges.labels, protocol=_PICKLE_PROTOCOL))
+    for values in [edges.sources, edges.targets, edges.label_codes]:
+        digest.update(np.ascontiguousarray(values, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def graph_fingerprint(graph: MultiDiGraph) -> str:
+    """Hash of the nodes and labeled edges of the graph, see edges_fingerprint. Graphs with
+    the same nodes and edges in the same order have the same fingerprint.
+
+    Parameters
+    ----------
+    graph : MultiDiGraph
+        Graph from networkx
+
+    Returns
+    -------
+    fingerprint : str
+        Returns hex digest of the graph
+    """
+    return edges_fingerprint(LabeledEdges.from_networkx(graph))
+
+
+def save_graph_index(automaton: Automaton, path: str | pathlib.Path):
+    """Write states, labels and label matrices of the automaton to the directory.
+    Every matrix is stored as three .npy files of its CSR arrays, so it can be memory-mapped.
+
+    Parameters
+    ----------
+    automaton : Automaton
+        Automaton of the graph
+    path : str | pathlib.Path
+        Directory of the index, it must not exist
+    """
+    path = pathlib.Path(path)
+    path.mkdir(parents=True)
+
+    labels = list(automaton.symbol_matrices)
+    for i, label in enumerate(labels):
+        matrix = csr_array(automaton.symbol_matrices[label], dtype=bool)
+        matrix.sum_duplicates()
+        np.save(path / f"{i}.data.npy", matrix.data)
+        np.save(path / f"{i}.indices.npy", matrix.indices)
+        np.save(path / f"{i}.indptr.npy", matrix.indptr)
+
+    with open(path / _META_FILE, "wb") as file:
+        pickle.dump(
+            {
+                "version": INDEX_VERSION,
+                "states": list(automaton.state_table),
+                "labels": labels,
+                "symbols": automaton.symbols,
+            },
+            file,
+        )
+
+
+def load_graph_index(path: str | pathlib.Path, mmap: bool = True) -> Automaton:
+    """Read the automaton of the graph from the index directory.
+    All states of the automaton are start and final ones.
+
+    Parameters
+    ----------
+    path : str | pathlib.Path
+        Directory of the index
+    mmap : bool
+        If true, arrays of the matrices are memory-mapped read-only instead of being read
+
+    Returns
+    -------
+    automaton : Automaton
+    """
+    path = pathlib.Path(path)
+    with open(path / _META_FILE, "rb") as file:
+        meta = pickle.load(file)
+    if meta["version"] != INDEX_VERSION:
+        raise ValueError(f"Unsupported graph index version: {meta['version']}")
+
+    n = len(meta["states"])
+    mmap_mode = "r" if mmap else None
+    matrices = {
+        label: csr_array(
+            tuple(
+                np.load(path / f"{i}.{name}.npy", mmap_mode=mmap_mode)
+                for name in ["data", "indices", "indptr"]
+            ),
+            shape=(n, n),
+        )
+        for i, label in enumerate(meta["labels"])
+    }
+    for matrix in matrices.values():
+        matrix.has_canonical_format = True
+
+    states = np.empty(n, dtype=object)
+    states[:] = meta["states"]
+    return Automaton(
+        states,
+        np.ones(n, dtype=bool),
+        np.ones(n, dtype=bool),
+        meta["symbols"],
+        matrices,
+    )
+
+
+def load_graph_automaton(
+    graph: Optional[MultiDiGraph],
+    index_dir: Optional[str | pathlib.Path] = None,
+    index_key: Optional[str] = None,
+) -> Automaton:
+    """Get the automaton of the graph with epsilon labels kept as symbols and all nodes
+    as start and final states. If the index directory is given, the automaton is
+    memory-mapped from the index of the graph there, the index is built on the first use.
+
+    Parameters
+    ----------
+    graph : Optional[MultiDiGraph]
+        Graph from networkx. It may be none if the index with the given key exists
+    index_dir : Optional[str | pathlib.Path]
+        Directory of graph indexes. If none than the automaton is built from the graph
+    index_key : Optional[str]
+        Name of the index of the graph, e.g. the name of the dataset graph or its precomputed
+        fingerprint. The index is not checked against the graph, so the key must change
+        whenever the graph does. If none than the fingerprint of the graph is used
+
+    Returns
+    -------
+    automaton : Automaton
+    """
+    if index_dir is None:
+        return Automaton.from_graph(graph, remove_epsilon=False)
+
+    index_dir = pathlib.Path(index_dir)
+    edges = None
+    if index_key is None:
+        edges = LabeledEdges.from_networkx(graph)
+        index_key = edges_fingerprint(edges)
+    elif not index_key or index_key.startswith(".") or "/" in index_key:
+        raise ValueError(f"Invalid graph index key: {index_key}")
+
+    path = index_dir / index_key
+    if not path.exists():
+        if edges is None:
+            if graph is None:
+                raise ValueError(f"Graph index is not found: {path}")
+            edges = LabeledEdges.from_networkx(graph)
+
+        automaton = edges.to_automaton(remove_epsilon=False)
+        write_directory_atomically(
+            path, lambda tmp_path: save_graph_index(automaton, tmp_path)
+        )
+
+    return load_graph_index(path)
+
+
+def graph_automaton(
+    graph: Optional[MultiDiGraph],
+    start_states: Optional[Iterable[any]] = None,
+    final_states: Optional[Iterable[any]] = None,
+    index_dir: Optional[str | pathlib.Path] = None,
+    index_key: Optional[str] = None,
+) -> Automaton:
+    """Get the automaton of the graph as Automaton.from_graph does, using the index
+    of the graph if the index directory is given
+
+    Parameters
+    ----------
+    graph : Optional[MultiDiGraph]
+        Graph from networkx. It may be none if the index with the given key exists
+    start_states : Optional[Iterable[any]]
+        Start states of the automaton. If none than all nodes are start states
+    final_states : Optional[Iterable[any]]
+        Final states of the automaton. If none than all nodes are final states
+    index_dir : Optional[str | pathlib.Path]
+        Directory of graph indexes. If none than the automaton is built from the graph
+    index_key : Optional[str]
+        Name of the index of the graph, see load_graph_automaton
+
+    Returns
+    -------
+    automaton : Automaton
+    """
+    if index_dir is None:
+        return Automaton.from_graph(graph, start_states, final_states)
+
+    automaton = load_graph_automaton(graph, index_dir, index_key)
+    if start_states is not None:
+        automaton.start_states = start_states
+    if final_states is not None:
+        automaton.final_states = final_states
+    automaton.remove_epsilon_transitions()
+    return automaton
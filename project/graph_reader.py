@@ -0,0 +1,388 @@
+import pathlib
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from project.Automaton import LABEL, Automaton
+
+import networkx as nx
+import numpy as np
+
+# Tokens of DOT: quoted string, edge operator, punctuation, identifier or number, comment
+_DOT_TOKEN = re.compile(
+    r'\s*(?:("(?:[^"\\]|\\.)*")|(->)|([\[\]{};,=])|(-?[\w.]+)|(//.*))'
+)
+_DOT_GRAPH_KEYWORDS = {"graph", "digraph", "strict"}
+_DOT_ATTRIBUTE_KEYWORDS = {"graph", "node", "edge"}
+
+
+class LabeledEdges:
+    """Labeled edges of a graph coded by integers. Vertex with id i is vertices[i], edge k goes
+    from sources[k] to targets[k] by labels[label_codes[k]]. Edges without a label have label None.
+    """
+
+    def __init__(
+        self,
+        vertices: List[any],
+        labels: List[any],
+        sources: np.ndarray,
+        targets: np.ndarray,
+        label_codes: np.ndarray,
+    ):
+        self.vertices = vertices
+        self.labels = labels
+        self.sources = sources
+        self.targets = targets
+        self.label_codes = label_codes
+
+    @classmethod
+    def from_networkx(cls, graph: nx.MultiDiGraph) -> "LabeledEdges":
+        """Code the edges of the graph by integers in one pass over them. Only labels of
+        the edges are kept, keys and other attributes are dropped.
+
+        Parameters
+        ----------
+        graph : nx.MultiDiGraph
+            Graph from networkx
+
+        Returns
+        -------
+        edges : LabeledEdges
+        """
+        vertices = list(graph.nodes)
+        mapping = {vertex: i for i, vertex in enumerate(vertices)}
+        label_codes = {}
+        edges = np.array(
+            [
+                (
+                    mapping[u],
+                    mapping[v],
+                    label_codes.setdefault(label, len(label_codes)),
+                )
+                for u, v, label in graph.edges(data=LABEL)
+            ],
+            dtype=np.int64,
+        ).reshape(-1, 3)
+        return cls(vertices, list(label_codes), edges[:, 0], edges[:, 1], edges[:, 2])
+
+    @property
+    def vertices_num(self) -> int:
+        return len(self.vertices)
+
+    @property
+    def edges_num(self) -> int:
+        return len(self.sources)
+
+    def coordinates(self) -> Dict[any, Tuple[np.ndarray, np.ndarray]]:
+        """Group the edges by labels
+
+        Returns
+        -------
+        coordinates : Dict[any, Tuple[np.ndarray, np.ndarray]]
+            Returns ids of source and target vertexes of the edges for each label
+        """
+        order = np.argsort(self.label_codes, kind="stable")
+        bounds = np.searchsorted(
+            self.label_codes[order], np.arange(len(self.labels) + 1)
+        )
+        return {
+            label: (
+                self.sources[order[bounds[i] : bounds[i + 1]]],
+                self.targets[order[bounds[i] : bounds[i + 1]]],
+            )
+            for i, label in enumerate(self.labels)
+        }
+
+    def to_automaton(
+        self,
+        start_states: Optional[Iterable[any]] = None,
+        final_states: Optional[Iterable[any]] = None,
+        remove_epsilon: bool = True,
+    ) -> Automaton:
+        """Build the automaton of the graph as Automaton.from_graph does, without networkx.
+        Edge arrays are copied and grouped by labels, see Automaton.from_arrays, so it takes
+        O(E) time and memory even if the arrays are memory-mapped
+
+        Parameters
+        ----------
+        start_states : Optional[Iterable[any]]
+            Start states of the automaton. If none than all vertexes are start states
+        final_states : Optional[Iterable[any]]
+            Final states of the automaton. If none than all vertexes are final states
+        remove_epsilon : bool
+            If true, epsilon edges are removed with remove_epsilon_transitions
+
+        Returns
+        -------
+        automaton : Automaton
+        """
+        # Labels of replaced edges may have no edges left
+        is_used = np.zeros(len(self.labels), dtype=bool)
+        is_used[self.label_codes] = True
+        is_used &= np.array([label is not None for label in self.labels], dtype=bool)
+        is_kept = is_used[self.label_codes]
+        labels = [label for label, used in zip(self.labels, is_used) if used]
+        new_codes = np.cumsum(is_used) - 1
+
+        automaton = Automaton.from_arrays(
+            self.sources[is_kept],
+            self.targets[is_kept],
+            new_codes[self.label_codes[is_kept]],
+            labels,
+            self.vertices,
+            self.vertices if start_states is None else start_states,
+            self.vertices if final_states is None else final_states,
+        )
+        if remove_epsilon:
+            automaton.remove_epsilon_transitions()
+        return automaton
+
+    def to_networkx(self) -> nx.MultiDiGraph:
+        """Build the graph from networkx, vertexes are added in the order of their ids
+
+        Returns
+        -------
+        graph : nx.MultiDiGraph
+        """
+        graph = nx.MultiDiGraph()
+        graph.add_nodes_from(self.vertices)
+        vertices = np.empty(len(self.vertices), dtype=object)
+        vertices[:] = self.vertices
+        labels = np.empty(len(self.labels), dtype=object)
+        labels[:] = self.labels
+        graph.add_edges_from(
+            (u, v, {LABEL: label}) if label is not None else (u, v, {})
+            for u, v, label in zip(
+                vertices[self.sources].tolist(),
+                vertices[self.targets].tolist(),
+                labels[self.label_codes].tolist(),
+            )
+        )
+        return graph
+
+
+class _EdgesBuilder:
+    """Collects edges into compact integer arrays while the file is read"""
+
+    def __init__(self):
+        self.vertex_ids = {}
+        self.label_codes = {}
+        self.key_codes = {}
+        self.sources = array("q")
+        self.targets = array("q")
+        self.codes = array("q")
+        self.keys = array("q")
+
+    def add_vertex(self, vertex: any) -> int:
+        return self.vertex_ids.setdefault(vertex, len(self.vertex_ids))
+
+    def add_edge(self, source: any, target: any, label: any, key: Optional[str] = None):
+        self.sources.append(self.add_vertex(source))
+        self.targets.append(self.add_vertex(target))
+        self.codes.append(self.label_codes.setdefault(label, len(self.label_codes)))
+        self.keys.append(
+            -1 if key is None else self.key_codes.setdefault(key, len(self.key_codes))
+        )
+
+    def build(self) -> LabeledEdges:
+        sources = np.frombuffer(self.sources, dtype=np.int64)
+        targets = np.frombuffer(self.targets, dtype=np.int64)
+        codes = np.frombuffer(self.codes, dtype=np.int64)
+        keys = np.frombuffer(self.keys, dtype=np.int64)
+
+        # As in networkx, the edge with the key of the previous edge between the same vertexes
+        # replaces its label, the edge stays at the position of the first one
+        keyed = np.flatnonzero(keys >= 0)
+        if len(keyed) > 0:
+            edges = np.stack([sources[keyed], targets[keyed], keys[keyed]], axis=1)
+            _, first, inverse = np.unique(
+                edges, axis=0, return_index=True, return_inverse=True
+            )
+            if len(first) < len(keyed):
+                last = np.zeros(len(first), dtype=np.int64)
+                np.maximum.at(last, inverse.ravel(), np.arange(len(keyed)))
+                codes = codes.copy()
+                codes[keyed[first]] = codes[keyed[last]]
+                is_kept = np.ones(len(sources), dtype=bool)
+                is_kept[keyed] = False
+                is_kept[keyed[first]] = True
+                sources, targets, codes = (
+                    sources[is_kept],
+                    targets[is_kept],
+                    codes[is_kept],
+                )
+
+        return LabeledEdges(
+            list(self.vertex_ids), list(self.label_codes), sources, targets, codes
+        )
+
+
+def _unquote(value: str) -> str:
+    """Remove quotes of the quoted DOT identifier"""
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    return value
+
+
+def read_dot_edges(path: str | pathlib.Path) -> LabeledEdges:
+    """Read the graph from .dot file line by line. A line may have several statements separated
+    by ";", edge chains "a -> b -> c" are expanded into edges of consecutive vertexes. Statements
+    can not span several lines, subgraphs are not supported. Only labels and keys of the edges are
+    read, other attributes are skipped. Vertexes and labels are strings, quotes of the quoted ones
+    are removed. As in networkx, the edge with the same key as the previous edge between
+    the same vertexes replaces it.
+
+    Parameters
+    ----------
+    path : str | pathlib.Path
+        Path to file
+
+    Returns
+    -------
+    edges : LabeledEdges
+        Returns edges of the graph coded by integers
+    """
+    builder = _EdgesBuilder()
+    with open(path, encoding="utf-8") as file:
+        for line_num, line in enumerate(file, 1):
+            if line.lstrip().startswith("#"):
+                continue
+            try:
+                for statement in _dot_statements(_dot_tokens(line)):
+                    _read_dot_statement(statement, builder)
+            except ValueError as error:
+                raise ValueError(f"{error} at line {line_num}: {line.strip()}")
+
+    return builder.build()
+
+
+def _dot_tokens(line: str) -> List[str]:
+    """Split the line of DOT into tokens, comments are dropped"""
+    tokens = []
+    position = 0
+    line = line.rstrip()
+    while position < len(line):
+        match = _DOT_TOKEN.match(line, position)
+        if match is None:
+            raise ValueError("Unsupported DOT syntax")
+        position = match.end()
+        if match.group(5) is None:
+            tokens.append(match.group(0).strip())
+    return tokens
+
+
+def _dot_statements(tokens: List[str]) -> List[List[str]]:
+    """Split tokens into statements by ";" and braces outside of attribute lists"""
+    statements = [[]]
+    depth = 0
+    for token in tokens:
+        if token == "[":
+            depth += 1
+        elif token == "]":
+            depth -= 1
+            if depth < 0:
+                raise ValueError("Unbalanced brackets")
+
+        if depth == 0 and token in (";", "}"):
+            statements.append([])
+        elif depth == 0 and token == "{":
+            # Only the graph header may open a block
+            if not statements[-1] or statements[-1][0] not in _DOT_GRAPH_KEYWORDS:
+                raise ValueError("Subgraphs are not supported")
+            statements[-1] = []
+        else:
+            statements[-1].append(token)
+
+    if depth != 0:
+        raise ValueError("Unbalanced brackets")
+    return [statement for statement in statements if statement]
+
+
+def _dot_attributes(tokens: List[str]) -> dict:
+    """Parse attribute lists "[name=value, ...]" following each other"""
+    attributes = {}
+    position = 0
+    while position < len(tokens):
+        if tokens[position] != "[":
+            raise ValueError("Expected attribute list")
+        position += 1
+        while tokens[position] != "]":
+            if tokens[position] in (",", ";"):
+                position += 1
+                continue
+            if len(tokens) < position + 3:
+                raise ValueError("Invalid attribute")
+            name, equal, value = tokens[position : position + 3]
+            if equal != "=" or not _is_dot_id(name) or not _is_dot_id(value):
+                raise ValueError("Invalid attribute")
+            attributes[_unquote(name)] = _unquote(value)
+            position += 3
+        position += 1
+    return attributes
+
+
+def _is_dot_id(token: str) -> bool:
+    return token not in ("->", "[", "]", "{", "}", ";", ",", "=")
+
+
+def _read_dot_statement(tokens: List[str], builder: "_EdgesBuilder"):
+    """Add vertexes and edges of the statement to the builder, skip attribute statements"""
+    if len(tokens) == 3 and tokens[1] == "=":
+        # Attribute of the graph
+        if not (_is_dot_id(tokens[0]) and _is_dot_id(tokens[2])):
+            raise ValueError("Invalid attribute")
+        return
+    # Keywords followed by anything else are ids of vertexes, as pydot writes them
+    if tokens[0] in _DOT_ATTRIBUTE_KEYWORDS and (len(tokens) == 1 or tokens[1] == "["):
+        _dot_attributes(tokens[1:])
+        return
+
+    vertices = [tokens[0]]
+    position = 1
+    while position + 1 < len(tokens) and tokens[position] == "->":
+        vertices.append(tokens[position + 1])
+        position += 2
+    if not all(_is_dot_id(vertex) for vertex in vertices):
+        raise ValueError("Invalid vertex")
+    attributes = _dot_attributes(tokens[position:])
+
+    vertices = [_unquote(vertex) for vertex in vertices]
+    if len(vertices) == 1:
+        builder.add_vertex(vertices[0])
+    for source, target in zip(vertices, vertices[1:]):
+        builder.add_edge(source, target, attributes.get(LABEL), attributes.get("key"))
+
+
+def read_edge_list(
+    path: str | pathlib.Path, delimiter: Optional[str] = None
+) -> LabeledEdges:
+    """Read the graph from the file of lines "source target label". Lines starting with # are comments.
+
+    Parameters
+    ----------
+    path : str | pathlib.Path
+        Path to file
+    delimiter : Optional[str]
+        Delimiter of the columns. If none than columns are delimited by whitespaces
+
+    Returns
+    -------
+    edges : LabeledEdges
+        Returns edges of the graph coded by integers
+    """
+    builder = _EdgesBuilder()
+    with open(path, encoding="utf-8") as file:
+        for line_num, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            columns = line.split(delimiter)
+            if len(columns) != 3:
+                raise ValueError(
+                    f"Expected source, target and label at line {line_num}"
+                )
+            source, target, label = (column.strip() for column in columns)
+            builder.add_edge(source, target, label)
+
+    return builder.build()
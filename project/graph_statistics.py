@@ -0,0 +1,126 @@
+from typing import Dict
+
+from project.graph_reader import LabeledEdges
+
+import networkx as nx
+import numpy as np
+from scipy.sparse import csr_array
+from scipy.sparse.csgraph import connected_components
+
+
+class GraphStatistics:
+    """Statistics of a labeled graph computed with array operations over its coded edges,
+    see GraphStatistics.from_edges
+
+    Attributes
+    ----------
+    vertices_num : int
+        Number of vertexes
+    edges_num : int
+        Number of edges, parallel edges are counted separately
+    label_counts : Dict[any, int]
+        Number of edges for each label
+    out_degrees : np.ndarray
+        Number of outgoing edges of each vertex
+    in_degrees : np.ndarray
+        Number of incoming edges of each vertex
+    self_loops : int
+        Number of edges from a vertex to itself
+    parallel_edges : int
+        Number of edges repeating the source and the target of another edge, whatever their labels are
+    scc_sizes : np.ndarray
+        Sizes of the strongly connected components in descending order
+    """
+
+    def __init__(
+        self,
+        vertices_num: int,
+        edges_num: int,
+        label_counts: Dict[any, int],
+        out_degrees: np.ndarray,
+        in_degrees: np.ndarray,
+        self_loops: int,
+        parallel_edges: int,
+        scc_sizes: np.ndarray,
+    ):
+        self.vertices_num = vertices_num
+        self.edges_num = edges_num
+        self.label_counts = label_counts
+        self.out_degrees = out_degrees
+        self.in_degrees = in_degrees
+        self.self_loops = self_loops
+        self.parallel_edges = parallel_edges
+        self.scc_sizes = scc_sizes
+
+    @property
+    def labels(self) -> set:
+        return set(self.label_counts)
+
+    @property
+    def out_degree_distribution(self) -> np.ndarray:
+        """Number of vertexes with i outgoing edges at the index i"""
+        return np.bincount(self.out_degrees, minlength=1)
+
+    @property
+    def in_degree_distribution(self) -> np.ndarray:
+        """Number of vertexes with i incoming edges at the index i"""
+        return np.bincount(self.in_degrees, minlength=1)
+
+    @classmethod
+    def from_edges(cls, edges: LabeledEdges) -> "GraphStatistics":
+        """Compute statistics of the graph. Every statistic is a counting over the edge arrays,
+        the graph from networkx is never built.
+
+        Parameters
+        ----------
+        edges : LabeledEdges
+            Edges of the graph coded by integers
+
+        Returns
+        -------
+        statistics : GraphStatistics
+        """
+        n = edges.vertices_num
+        sources = np.asarray(edges.sources, dtype=np.int64)
+        targets = np.asarray(edges.targets, dtype=np.int64)
+
+        label_counts = np.bincount(edges.label_codes, minlength=len(edges.labels))
+        pairs = np.unique(sources * n + targets)
+
+        adjacency = csr_array(
+            (np.ones(len(pairs), dtype=bool), np.divmod(pairs, n)), shape=(n, n)
+        )
+        components_num, components = connected_components(
+            adjacency, directed=True, connection="strong"
+        )
+        scc_sizes = np.sort(np.bincount(components, minlength=components_num))[::-1]
+
+        return cls(
+            vertices_num=n,
+            edges_num=edges.edges_num,
+            label_counts={
+                label: int(count)
+                for label, count in zip(edges.labels, label_counts)
+                if count > 0
+            },
+            out_degrees=np.bincount(sources, minlength=n),
+            in_degrees=np.bincount(targets, minlength=n),
+            self_loops=int(np.count_nonzero(sources == targets)),
+            parallel_edges=edges.edges_num - len(pairs),
+            scc_sizes=scc_sizes,
+        )
+
+    @classmethod
+    def from_networkx(cls, graph: nx.MultiDiGraph) -> "GraphStatistics":
+        """Compute statistics of the graph from networkx, see from_edges
+
+        Parameters
+        ----------
+        graph : nx.MultiDiGraph
+            Graph from networkx
+
+        Returns
+        -------
+        statistics : GraphStatistics
+        """
+        return cls.from_edges(LabeledEdges.from_networkx(graph))
@@ -0,0 +1,114 @@
+import os
+import pathlib
+import pickle
+import shutil
+import tempfile
+from typing import Callable
+
+from project.graph_reader import LabeledEdges
+
+import numpy as np
+
+# Bumped when the layout of the stored graphs changes
+STORAGE_VERSION = 2
+
+_META_FILE = "meta.pickle"
+_ARRAYS = ["sources", "targets", "label_codes"]
+
+
+def save_edges(edges: LabeledEdges, path: str | pathlib.Path):
+    """Write the graph to the directory in the binary format. Edges are sorted by the source
+    vertexes and their sources, targets and label codes are stored each at its own .npy file,
+    so they can be memory-mapped. Vertexes and labels are pickled.
+
+    Parameters
+    ----------
+    edges : LabeledEdges
+        Edges of the graph coded by integers
+    path : str | pathlib.Path
+        Directory of the graph, it must not exist
+    """
+    path = pathlib.Path(path)
+    path.mkdir(parents=True)
+
+    n = edges.vertices_num
+    order = np.argsort(edges.sources, kind="stable")
+    arrays = {
+        "sources": edges.sources[order].astype(_index_dtype(n)),
+        "targets": edges.targets[order].astype(_index_dtype(n)),
+        "label_codes": edges.label_codes[order].astype(_index_dtype(len(edges.labels))),
+    }
+    for name, values in arrays.items():
+        np.save(path / f"{name}.npy", values)
+
+    with open(path / _META_FILE, "wb") as file:
+        pickle.dump(
+            {
+                "version": STORAGE_VERSION,
+                "vertices": edges.vertices,
+                "labels": edges.labels,
+            },
+            file,
+        )
+
+
+def load_edges(path: str | pathlib.Path, mmap: bool = True) -> LabeledEdges:
+    """Read the graph written by save_edges. Building the automaton of the loaded edges
+    copies them, see LabeledEdges.to_automaton, use graph_index to load the automaton
+    of the graph without copies.
+
+    Parameters
+    ----------
+    path : str | pathlib.Path
+        Directory of the graph
+    mmap : bool
+        If true, edge arrays are memory-mapped read-only instead of being read
+
+    Returns
+    -------
+    edges : LabeledEdges
+        Returns edges of the graph sorted by the source vertexes
+    """
+    path = pathlib.Path(path)
+    with open(path / _META_FILE, "rb") as file:
+        meta = pickle.load(file)
+    if meta["version"] != STORAGE_VERSION:
+        raise ValueError(f"Unsupported graph storage version: {meta['version']}")
+
+    mmap_mode = "r" if mmap else None
+    sources, targets, label_codes = (
+        np.load(path / f"{name}.npy", mmap_mode=mmap_mode) for name in _ARRAYS
+    )
+    return LabeledEdges(meta["vertices"], meta["labels"], sources, targets, label_codes)
+
+
+def write_directory_atomically(
+    path: str | pathlib.Path, write: Callable[[pathlib.Path], None]
+):
+    """Write the directory aside and rename it to the path, so readers never see a partial one.
+    If another process has written the directory first, its version is kept.
+
+    Parameters
+    ----------
+    path : str | pathlib.Path
+        Path of the directory
+    write : Callable[[pathlib.Path], None]
+        Function writing the directory to the given path, which does not exist
+    """
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = pathlib.Path(tempfile.mkdtemp(prefix=".", dir=path.parent)) / path.name
+    try:
+        write(tmp_path)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another process has written the directory
+            pass
+    finally:
+        shutil.rmtree(tmp_path.parent, ignore_errors=True)
+
+
+def _index_dtype(size: int) -> np.dtype:
+    """The smallest of int32 and int64 types holding indexes up to the size"""
+    return np.dtype(np.int32 if size < 2**31 else np.int64)
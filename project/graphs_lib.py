@@ -1,42 +1,58 @@
 import pathlib
 
-from project import automaton_lib as autolib
-from project.Automaton import Automaton
+from project import graph_index, graph_reader, graph_storage
+from project.Automaton import LABEL, Automaton
+from project.product_automaton import ProductAutomaton
+from project.dataset_cache import DEFAULT_DATASET_CACHE, DatasetCache
+from project.graph_statistics import GraphStatistics
+from project.regex_cache import DEFAULT_REGEX_CACHE, RegexCache
 
-from typing import Tuple, List, Set, Optional
+from typing import Iterator, Tuple, List, Set, Optional
 
 import cfpq_data
 import networkx as nx
+import numpy as np
 from pyformlang.regular_expression import Regex
-from pyformlang.finite_automaton import State
 
-LABEL = "label"
+# Share of start states among all states of the product of the graph and the regex
+# from which make_regex_request_to_graph computes the closure of the whole product
+# instead of bfs from the start states
+EAGER_CLOSURE_MIN_SHARE = 0.5
 
 
-def get_graph_by_name(graph_name: str) -> nx.MultiDiGraph:
+def get_graph_by_name(
+    graph_name: str, dataset_cache: Optional[DatasetCache] = None
+) -> nx.MultiDiGraph:
     """Get graph by its graph.
 
     Parameters
     ----------
     graph_name : str
         The name to the graph from cfpq_data dataset.
+    dataset_cache : Optional[DatasetCache]
+        Cache of parsed graphs of the dataset. If none than the default cache is used
 
     Returns
     -------
     graph : networkx.MultiDiGraph:
         The graph from cfpq_data dataset.
     """
-    p = cfpq_data.download(graph_name)
-    return cfpq_data.graph_from_csv(p)
+    if dataset_cache is None:
+        dataset_cache = DEFAULT_DATASET_CACHE
+    return dataset_cache.graph(graph_name)
 
 
-def get_graph_info(graph_name: str) -> Tuple[int, int, set]:
-    """Get general information about the graph.
+def get_graph_info(
+    graph_name: str, dataset_cache: Optional[DatasetCache] = None
+) -> Tuple[int, int, set]:
+    """Get general information about the graph. The graph from networkx is not built.
 
     Parameters
     ----------
     graph_name : str
         The name to the graph from cfpq_data dataset.
+    dataset_cache : Optional[DatasetCache]
+        Cache of parsed graphs of the dataset. If none than the default cache is used
 
     Returns
     -------
@@ -44,15 +60,35 @@ def get_graph_info(graph_name: str) -> Tuple[int, int, set]:
         Number of graph's nodes, number of graph's edges
         and labels of the graph.
     """
-
-    g = get_graph_by_name(graph_name)
+    if dataset_cache is None:
+        dataset_cache = DEFAULT_DATASET_CACHE
+    edges = dataset_cache.edges(graph_name)
 
     # It is assumed that in the whole course the information on the edges is called "label"
-    return (
-        g.number_of_nodes(),
-        g.number_of_edges(),
-        set([label for _, _, _, label in g.edges(data=LABEL, keys=True)]),
-    )
+    return edges.vertices_num, edges.edges_num, set(edges.labels)
+
+
+def get_graph_statistics(
+    graph_name: str, dataset_cache: Optional[DatasetCache] = None
+) -> GraphStatistics:
+    """Get statistics of the graph: edges per label, degrees, self-loops, parallel edges
+    and sizes of strongly connected components. The graph from networkx is not built.
+
+    Parameters
+    ----------
+    graph_name : str
+        The name to the graph from cfpq_data dataset.
+    dataset_cache : Optional[DatasetCache]
+        Cache of parsed graphs of the dataset. If none than the default cache is used
+
+    Returns
+    -------
+    statistics : GraphStatistics
+        Statistics of the graph
+    """
+    if dataset_cache is None:
+        dataset_cache = DEFAULT_DATASET_CACHE
+    return GraphStatistics.from_edges(dataset_cache.edges(graph_name))
 
 
 def labeled_two_cycles_graph_to_dot(
@@ -98,11 +134,65 @@ def write_to_dot(graph: any, path: str | pathlib.Path):
     return
 
 
+def save_graph(graph: nx.MultiDiGraph, path: str | pathlib.Path):
+    """Write graph to the directory in the binary format of graph_storage.
+    Labels of the edges are stored, keys and other attributes are not.
+
+    Parameters
+    ----------
+    graph : nx.MultiDiGraph
+        The graph from a NetworkX that will be written
+    path : str | pathlib.Path
+        Directory of the graph, it must not exist
+    """
+    graph_storage.save_edges(graph_reader.LabeledEdges.from_networkx(graph), path)
+
+
+def load_graph_edges(
+    path: str | pathlib.Path, mmap: bool = True
+) -> graph_reader.LabeledEdges:
+    """Read edges of the graph written by save_graph without building the graph from networkx.
+    The automaton of the graph for the matrix algorithms is built by LabeledEdges.to_automaton.
+
+    Parameters
+    ----------
+    path : str | pathlib.Path
+        Directory of the graph
+    mmap : bool
+        If true, edge arrays are memory-mapped instead of being read
+
+    Returns
+    -------
+    edges : LabeledEdges
+        Returns edges of the graph coded by integers
+    """
+    return graph_storage.load_edges(path, mmap)
+
+
+def load_graph(path: str | pathlib.Path) -> nx.MultiDiGraph:
+    """Read graph written by save_graph
+
+    Parameters
+    ----------
+    path : str | pathlib.Path
+        Directory of the graph
+
+    Returns
+    -------
+    graph : nx.MultiDiGraph
+        Return read graph
+    """
+    return graph_storage.load_edges(path).to_networkx()
+
+
 def make_regex_request_to_graph(
     regex: Regex,
     graph: any,
     start_vertexes: List[any],
     final_vertexes: List[any],
+    regex_cache: Optional[RegexCache] = None,
+    index_dir: Optional[str | pathlib.Path] = None,
+    index_key: Optional[str] = None,
 ) -> List[Tuple[any, any]]:
 
     """Perform regular queries on graphs
@@ -117,7 +207,13 @@ def make_regex_request_to_graph(
         Start states of finite automaton
     final_vertexes: Optional[List[State]]
         Final states of finite automaton
-
+    regex_cache : Optional[RegexCache]
+        Cache of compiled regexes. If none than the default cache is used
+    index_dir : Optional[str | pathlib.Path]
+        Directory of graph indexes, see graph_index. If none than the graph matrices are built
+    index_key : Optional[str]
+        Name of the index of the graph, see graph_index.load_graph_automaton.
+        If given and the index exists, the graph may be none
 
     Returns
     -------
@@ -126,34 +222,41 @@ def make_regex_request_to_graph(
         which are connected by a path forming by the regex.
     """
 
-    map(State, start_vertexes)
-    map(State, final_vertexes)
-    # Convert graph to automaton
-    graph_fa = autolib.graph_to_nfa(graph, start_vertexes, final_vertexes)
-
-    # Convert regex to automaton
-    regex_fa = autolib.regex_to_minimal_dfa(regex)
-
-    # Convert fa from nx to Automaton
-    first_automaton = Automaton.from_fa(graph_fa)
-    second_automaton = Automaton.from_fa(regex_fa)
-    intersection_automaton = first_automaton.intersect(second_automaton)
-    transitive_closure = intersection_automaton.transitive_closure()
-
-    result = []  # List of pairs
-    # Add pairs to list
-    regex_states_num = len(regex_fa.states)
-    new_states_to_graph_states = {
-        k: v for v, k in first_automaton.old_state_to_new.items()
-    }
-    for start in intersection_automaton.start_states:
-        for final in intersection_automaton.final_states:
-            if transitive_closure[start, final]:
-                g_start = new_states_to_graph_states[start // regex_states_num]
-                g_final = new_states_to_graph_states[final // regex_states_num]
-                result.append((g_start, g_final))
+    # Convert graph and regex to Automaton, regex is compiled once
+    if regex_cache is None:
+        regex_cache = DEFAULT_REGEX_CACHE
+    first_automaton = graph_index.graph_automaton(
+        graph, start_vertexes or None, final_vertexes or None, index_dir, index_key
+    )
+    second_automaton = regex_cache.get(regex)
+    intersection_automaton = ProductAutomaton(first_automaton, second_automaton)
+
+    # Compute rows of the transitive closure for the start states and take columns
+    # of the final states. The closure of the whole product is cheaper only if most
+    # of its rows are rows of the start states
+    start_states = intersection_automaton.start_indexes
+    final_states = intersection_automaton.final_indexes
+    if len(start_states) >= EAGER_CLOSURE_MIN_SHARE * intersection_automaton.size:
+        closure = first_automaton.intersect(second_automaton).transitive_closure()
+        reachability = closure[start_states]
+    else:
+        reachability = intersection_automaton.reachable_from(start_states)
+    starts, finals = reachability[:, final_states].nonzero()
+
+    # Pairs of graph states coded as start * size + final, the regex automaton
+    # may have several final states
+    regex_states_num = second_automaton.size
+    graph_states_num = first_automaton.size
+    graph_pairs = np.unique(
+        start_states[starts] // regex_states_num * graph_states_num
+        + final_states[finals] // regex_states_num
+    )
 
-    return result
+    # Decode ids of graph states to vertexes at once
+    graph_pairs = first_automaton.state_table[
+        np.stack(np.divmod(graph_pairs, graph_states_num), axis=1)
+    ]
+    return list(map(tuple, graph_pairs.tolist()))
 
 
 def bfs_rpq(
@@ -162,6 +265,11 @@ def bfs_rpq(
     start_vertexes: Optional[List[any]],
     final_vertexes: Optional[List[any]],
     is_separately: bool,
+    chunk_size: Optional[int] = None,
+    processes: Optional[int] = None,
+    regex_cache: Optional[RegexCache] = None,
+    index_dir: Optional[str | pathlib.Path] = None,
+    index_key: Optional[str] = None,
 ) -> Set[any]:
     """It allows you to solve a reachability problem on a graph represented as an adjacency matrix and a regular
     expression represented as an adjacency matrix. If the flag is set to true, it solves the reachability
@@ -179,6 +287,17 @@ def bfs_rpq(
         Final vertexes. If none than all graph nodes are final vertexes
     is_separately : bool
         Flag represented type of solving problem
+    chunk_size : Optional[int]
+        Used only if is_separately is true. Maximum number of start vertexes solved at once
+    processes : Optional[int]
+        Used only if is_separately is true. Number of worker processes solving chunks of start vertexes
+    regex_cache : Optional[RegexCache]
+        Cache of compiled regexes. If none than the default cache is used
+    index_dir : Optional[str | pathlib.Path]
+        Directory of graph indexes, see graph_index. If none than the graph matrices are built
+    index_key : Optional[str]
+        Name of the index of the graph, see graph_index.load_graph_automaton.
+        If given and the index exists, the graph may be none
 
     Returns
     -------
@@ -187,35 +306,143 @@ def bfs_rpq(
         pairs of states, where the first element is responsible for the starting state and the second for the
         ending state.
     """
-    if not start_vertexes:
-        start_vertexes = graph.nodes
-    if not final_vertexes:
-        final_vertexes = graph.nodes
-
-    map(State, start_vertexes)
-    map(State, final_vertexes)
-    # Convert graph to automaton
-    graph_fa = autolib.graph_to_nfa(graph, start_vertexes, final_vertexes)
-
-    # Convert regex to automaton
-    regex_fa = autolib.regex_to_minimal_dfa(regex)
-
-    # Convert fa from nx to Automaton
-    graph_automaton = Automaton.from_fa(graph_fa)
-    regex_automaton = Automaton.from_fa(regex_fa)
+    graph_automaton, regex_automaton = _rpq_automata(
+        regex, graph, start_vertexes, final_vertexes, regex_cache, index_dir, index_key
+    )
 
-    result = graph_automaton.bfs_rpq(regex_automaton, is_separately)
-    mapping = {v: k for k, v in graph_automaton.old_state_to_new.items()}
+    result = graph_automaton.bfs_rpq(
+        regex_automaton, is_separately, chunk_size=chunk_size, processes=processes
+    )
+    mapping = graph_automaton.state_table
 
     if is_separately:
-        map(lambda a, b: (mapping[a], mapping[b]), result)
-        return result
+        return {(mapping[start], mapping[final]) for start, final in result}
     else:
         return {mapping[i] for i in result}
 
 
+def bfs_rpq_chunks(
+    regex: Regex,
+    graph: any,
+    start_vertexes: Optional[List[any]],
+    final_vertexes: Optional[List[any]],
+    is_separately: bool,
+    chunk_size: Optional[int] = None,
+    regex_cache: Optional[RegexCache] = None,
+    index_dir: Optional[str | pathlib.Path] = None,
+    index_key: Optional[str] = None,
+) -> Iterator[np.ndarray]:
+    """Solves the reachability problem as bfs_rpq does, but yields the result by chunks of numpy arrays
+    instead of collecting it into a set of tuples, see Automaton.bfs_rpq_chunks
+
+    Parameters
+    ----------
+    regex : Regex
+        Regular expression
+    graph : any
+        Graph from networkx
+    start_vertexes : Optional[List[any]]
+        Start vertexes. If none than all graph nodes are start vertexes
+    final_vertexes : Optional[List[any]]
+        Final vertexes. If none than all graph nodes are final vertexes
+    is_separately : bool
+        Flag represented type of solving problem
+    chunk_size : Optional[int]
+        Used only if is_separately is true. Maximum number of start vertexes solved at once
+    regex_cache : Optional[RegexCache]
+        Cache of compiled regexes. If none than the default cache is used
+    index_dir : Optional[str | pathlib.Path]
+        Directory of graph indexes, see graph_index. If none than the graph matrices are built
+    index_key : Optional[str]
+        Name of the index of the graph, see graph_index.load_graph_automaton.
+        If given and the index exists, the graph may be none
+
+    Returns
+    -------
+    chunks : Iterator[np.ndarray]
+        Yields object arrays of reachable vertexes or object arrays with shape k x 2 of pairs
+        of start and reachable vertexes
+    """
+    graph_automaton, regex_automaton = _rpq_automata(
+        regex, graph, start_vertexes, final_vertexes, regex_cache, index_dir, index_key
+    )
+    for chunk in graph_automaton.bfs_rpq_chunks(
+        regex_automaton, is_separately, chunk_size=chunk_size
+    ):
+        yield graph_automaton.state_table[chunk]
+
+
+def bfs_rpq_count(
+    regex: Regex,
+    graph: any,
+    start_vertexes: Optional[List[any]],
+    final_vertexes: Optional[List[any]],
+    is_separately: bool,
+    chunk_size: Optional[int] = None,
+    regex_cache: Optional[RegexCache] = None,
+    index_dir: Optional[str | pathlib.Path] = None,
+    index_key: Optional[str] = None,
+) -> int:
+    """Counts the result of bfs_rpq without building it. Parameters are the same as of bfs_rpq_chunks
+
+    Returns
+    -------
+    count : int
+        Returns number of reachable vertexes or pairs of vertexes
+    """
+    graph_automaton, regex_automaton = _rpq_automata(
+        regex, graph, start_vertexes, final_vertexes, regex_cache, index_dir, index_key
+    )
+    return graph_automaton.bfs_rpq_count(
+        regex_automaton, is_separately, chunk_size=chunk_size
+    )
+
+
+def bfs_rpq_exists(
+    regex: Regex,
+    graph: any,
+    start_vertexes: Optional[List[any]],
+    final_vertexes: Optional[List[any]],
+    chunk_size: Optional[int] = None,
+    regex_cache: Optional[RegexCache] = None,
+    index_dir: Optional[str | pathlib.Path] = None,
+    index_key: Optional[str] = None,
+) -> bool:
+    """Checks whether some final vertex is reachable from the start vertexes by a path matching the regex.
+    Parameters are the same as of bfs_rpq_chunks, see Automaton.bfs_rpq_exists
+
+    Returns
+    -------
+    exists : bool
+        Returns true if the result of bfs_rpq is nonempty
+    """
+    graph_automaton, regex_automaton = _rpq_automata(
+        regex, graph, start_vertexes, final_vertexes, regex_cache, index_dir, index_key
+    )
+    return graph_automaton.bfs_rpq_exists(regex_automaton, chunk_size=chunk_size)
+
+
+def _rpq_automata(
+    regex: Regex,
+    graph: any,
+    start_vertexes: Optional[List[any]],
+    final_vertexes: Optional[List[any]],
+    regex_cache: Optional[RegexCache],
+    index_dir: Optional[str | pathlib.Path],
+    index_key: Optional[str],
+) -> Tuple[Automaton, Automaton]:
+    """Convert graph and regex to Automaton, regex is compiled once, see bfs_rpq"""
+    if regex_cache is None:
+        regex_cache = DEFAULT_REGEX_CACHE
+    graph_automaton = graph_index.graph_automaton(
+        graph, start_vertexes or None, final_vertexes or None, index_dir, index_key
+    )
+    return graph_automaton, regex_cache.get(regex)
+
+
 def read_from_dot(file_path: str | pathlib.Path) -> nx.MultiDiGraph:
-    """Read graph for .dot file
+    """Read graph for .dot file. The file is parsed by the streaming reader of graph_reader,
+    see graph_reader.read_dot_edges
 
     Parameters
     ----------
@@ -227,8 +454,4 @@ def read_from_dot(file_path: str | pathlib.Path) -> nx.MultiDiGraph:
     graph : nx.MultiDiGraph
         Return read graph from dot file.
     """
-    res: nx.MultiDiGraph = nx.drawing.nx_pydot.read_dot(file_path)
-    if "\\n" in res.nodes:
-        res.remove_node("\\n")
-
-    return res
+    return graph_reader.read_dot_edges(file_path).to_networkx()
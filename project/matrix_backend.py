@@ -0,0 +1,188 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple, Union
+
+from project.bit_matrix import BitMatrix
+
+import numpy as np
+import scipy.linalg
+from scipy import sparse
+from scipy.sparse import csr_array
+
+
+class MatrixBackend(ABC):
+    """Storage format of boolean matrices together with the operations used by the algorithms.
+    Algorithms get matrices from scipy.sparse and return them back, all the work between
+    is done with the backend operations.
+    """
+
+    name: str
+
+    @abstractmethod
+    def from_coordinates(
+        self, rows: np.ndarray, cols: np.ndarray, shape: Tuple[int, int]
+    ) -> any:
+        """Create matrix with set values at the given positions"""
+
+    @abstractmethod
+    def from_sparse(self, matrix: any) -> any:
+        """Convert boolean matrix from scipy.sparse to the backend format"""
+
+    @abstractmethod
+    def to_sparse(self, matrix: any) -> csr_array:
+        """Convert matrix of the backend format to csr_array"""
+
+    @abstractmethod
+    def kron(self, first: any, second: any) -> any:
+        """Kronecker product of two matrices"""
+
+    @abstractmethod
+    def block_diag(self, matrices: List[any]) -> any:
+        """Block diagonal matrix from the given matrices"""
+
+    @abstractmethod
+    def multiply(self, first: any, second: any) -> any:
+        """Boolean (OR-AND) matrix product"""
+
+    @abstractmethod
+    def add(self, first: any, second: any) -> any:
+        """Elementwise OR"""
+
+    @abstractmethod
+    def nnz(self, matrix: any) -> int:
+        """Number of set values"""
+
+    @abstractmethod
+    def nonzero(self, matrix: any) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and columns of set values"""
+
+
+class SparseBackend(MatrixBackend):
+    """Matrices are scipy csr_array"""
+
+    name = "sparse"
+
+    def from_coordinates(self, rows, cols, shape):
+        return csr_array((np.ones(len(rows), dtype=bool), (rows, cols)), shape=shape)
+
+    def from_sparse(self, matrix):
+        return csr_array(matrix, dtype=bool)
+
+    def to_sparse(self, matrix):
+        return matrix
+
+    def kron(self, first, second):
+        return csr_array(sparse.kron(first, second, format="csr"))
+
+    def block_diag(self, matrices):
+        return csr_array(sparse.block_diag(matrices, format="csr"))
+
+    def multiply(self, first, second):
+        return first @ second
+
+    def add(self, first, second):
+        return first + second
+
+    def nnz(self, matrix):
+        return matrix.nnz
+
+    def nonzero(self, matrix):
+        return matrix.nonzero()
+
+
+class DenseBackend(MatrixBackend):
+    """Matrices are numpy boolean arrays"""
+
+    name = "dense"
+
+    def from_coordinates(self, rows, cols, shape):
+        matrix = np.zeros(shape, dtype=bool)
+        matrix[rows, cols] = True
+        return matrix
+
+    def from_sparse(self, matrix):
+        return matrix.toarray().astype(bool)
+
+    def to_sparse(self, matrix):
+        return csr_array(matrix)
+
+    def kron(self, first, second):
+        return np.kron(first, second)
+
+    def block_diag(self, matrices):
+        return scipy.linalg.block_diag(*matrices).astype(bool)
+
+    def multiply(self, first, second):
+        return first @ second
+
+    def add(self, first, second):
+        return first | second
+
+    def nnz(self, matrix):
+        return int(np.count_nonzero(matrix))
+
+    def nonzero(self, matrix):
+        return np.nonzero(matrix)
+
+
+class BitBackend(MatrixBackend):
+    """Matrices are bit-packed BitMatrix"""
+
+    name = "bit"
+
+    def from_coordinates(self, rows, cols, shape):
+        return BitMatrix.from_sparse(SPARSE.from_coordinates(rows, cols, shape))
+
+    def from_sparse(self, matrix):
+        return BitMatrix.from_sparse(matrix)
+
+    def to_sparse(self, matrix):
+        return matrix.to_sparse()
+
+    def kron(self, first, second):
+        return BitMatrix.from_sparse(SPARSE.kron(first.to_sparse(), second.to_sparse()))
+
+    def block_diag(self, matrices):
+        return BitMatrix.from_sparse(
+            SPARSE.block_diag([matrix.to_sparse() for matrix in matrices])
+        )
+
+    def multiply(self, first, second):
+        return first @ second
+
+    def add(self, first, second):
+        return first + second
+
+    def nnz(self, matrix):
+        return matrix.nnz
+
+    def nonzero(self, matrix):
+        return matrix.nonzero()
+
+
+SPARSE = SparseBackend()
+DENSE = DenseBackend()
+BIT = BitBackend()
+
+BACKENDS = {backend.name: backend for backend in [SPARSE, DENSE, BIT]}
+
+
+def get_backend(backend: Optional[Union[str, MatrixBackend]]) -> MatrixBackend:
+    """Get backend by its name
+
+    Parameters
+    ----------
+    backend : Optional[Union[str, MatrixBackend]]
+        Name of the backend ("sparse", "dense" or "bit") or the backend itself.
+        If none than the sparse backend is returned
+
+    Returns
+    -------
+    backend : MatrixBackend
+    """
+    if backend is None:
+        return SPARSE
+    if isinstance(backend, MatrixBackend):
+        return backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown matrix backend: {backend}")
+    return BACKENDS[backend]
@@ -0,0 +1,420 @@
+from copy import copy
+from typing import Iterable, Optional, Set, Tuple
+
+from project.Automaton import Automaton, _gather_ranges, _object_array
+from project.matrix_backend import SPARSE
+
+import numpy as np
+from scipy.sparse import csr_array, eye
+from scipy.sparse.csgraph import breadth_first_order
+
+
+class ProductAutomaton:
+    """Intersection of two automata which is not materialized. Kronecker products of
+    symbol matrices are never built, product transitions are computed on demand from
+    the symbol matrices of both automata.
+
+    The state (i, j) of the product, where i is a state of the first automaton and j
+    is a state of the second one, has index i * second_size + j, as in Automaton.intersect.
+    """
+
+    def __init__(self, first: Automaton, second: Automaton):
+        self.first = first
+        self.second = second
+        self.first_size = first.size
+        self.second_size = second.size
+        self.size = self.first_size * self.second_size
+        self.symbols = first.symbols & second.symbols
+        self.symbol_matrices = {
+            symbol: (
+                csr_array(first.symbol_matrices[symbol], dtype=bool),
+                csr_array(second.symbol_matrices[symbol], dtype=bool),
+            )
+            for symbol in self.symbols
+            if symbol in first.symbol_matrices and symbol in second.symbol_matrices
+        }
+
+        self.start_indexes = self._product_indexes(first.start_mask, second.start_mask)
+        self.final_indexes = self._product_indexes(first.final_mask, second.final_mask)
+
+    @property
+    def start_states(self) -> Set[int]:
+        return set(self.start_indexes.tolist())
+
+    @property
+    def final_states(self) -> Set[int]:
+        return set(self.final_indexes.tolist())
+
+    def _product_indexes(
+        self, first_mask: np.ndarray, second_mask: np.ndarray
+    ) -> np.ndarray:
+        """Calculate indexes of all pairs of states of the first and the second automata
+
+        Parameters
+        ----------
+        first_mask : np.ndarray
+            Mask of states of the first automaton
+        second_mask : np.ndarray
+            Mask of states of the second automaton
+
+        Returns
+        -------
+        indexes : np.ndarray
+            Sorted indexes of the product states
+        """
+        first = np.flatnonzero(first_mask).astype(np.int64)
+        second = np.flatnonzero(second_mask).astype(np.int64)
+        return np.add.outer(first * self.second_size, second).ravel()
+
+    def neighbors(self, state: int) -> np.ndarray:
+        """Find states reachable from the state by one transition
+
+        Parameters
+        ----------
+        state : int
+            Index of the product state
+
+        Returns
+        -------
+        states : np.ndarray
+            Sorted indexes of the neighbors
+        """
+        i, j = divmod(state, self.second_size)
+        neighbors = [np.empty(0, dtype=np.int64)]
+        for first, second in self.symbol_matrices.values():
+            first_neighbors = first.indices[first.indptr[i] : first.indptr[i + 1]]
+            second_neighbors = second.indices[second.indptr[j] : second.indptr[j + 1]]
+            neighbors.append(
+                np.add.outer(
+                    first_neighbors.astype(np.int64) * self.second_size,
+                    second_neighbors,
+                ).ravel()
+            )
+        return np.unique(np.concatenate(neighbors))
+
+    def step(self, front: csr_array, symbol: Optional[any] = None) -> csr_array:
+        """Multiply the front by the adjacency matrix of the product, i.e. make one
+        step of bfs for every row of the front. The larger automaton makes its step by
+        the product of sparse matrices, where rows of the front are split by the states
+        of the smaller automaton. The smaller automaton makes its step by gathering its
+        transitions from the reached states, so the cost is proportional to the output.
+
+        Parameters
+        ----------
+        front : csr_array
+            Boolean matrix with size number of rows x number of product states
+        symbol : Optional[any]
+            If specified, only transitions by this symbol are used
+
+        Returns
+        -------
+        front : csr_array
+            Returns product of the front and the adjacency matrix
+        """
+        k = front.shape[0]
+        symbols = self.symbol_matrices.keys() if symbol is None else [symbol]
+        coo = front.tocoo()
+        rows = coo.row.astype(np.int64)
+        firsts, seconds = np.divmod(coo.col.astype(np.int64), self.second_size)
+        is_second_smaller = self.second_size <= self.first_size
+
+        result_rows = [np.empty(0, dtype=np.int64)]
+        result_cols = [np.empty(0, dtype=np.int64)]
+        for symbol in symbols:
+            first, second = self.symbol_matrices[symbol]
+            if is_second_smaller:
+                # Step of the first automaton, rows are pairs (row, second state)
+                step = SPARSE.from_coordinates(
+                    rows * self.second_size + seconds,
+                    firsts,
+                    (k * self.second_size, self.first_size),
+                )
+                step = (step @ first).tocoo()
+                step_rows, step_seconds = np.divmod(
+                    step.row.astype(np.int64), self.second_size
+                )
+                step_firsts = step.col.astype(np.int64)
+
+                # Step of the second automaton from the reached pairs
+                step_seconds, origins = _gather_transitions(second, step_seconds)
+                step_rows, step_firsts = step_rows[origins], step_firsts[origins]
+            else:
+                # Step of the second automaton, rows are pairs (row, first state)
+                step = SPARSE.from_coordinates(
+                    rows * self.first_size + firsts,
+                    seconds,
+                    (k * self.first_size, self.second_size),
+                )
+                step = (step @ second).tocoo()
+                step_rows, step_firsts = np.divmod(
+                    step.row.astype(np.int64), self.first_size
+                )
+                step_seconds = step.col.astype(np.int64)
+
+                # Step of the first automaton from the reached pairs
+                step_firsts, origins = _gather_transitions(first, step_firsts)
+                step_rows, step_seconds = step_rows[origins], step_seconds[origins]
+
+            result_rows.append(step_rows)
+            result_cols.append(step_firsts * self.second_size + step_seconds)
+
+        return SPARSE.from_coordinates(
+            np.concatenate(result_rows), np.concatenate(result_cols), (k, self.size)
+        )
+
+    def _reachability(self, front: csr_array) -> csr_array:
+        """Find states reachable by a nonempty path from the states of each row of the front
+
+        Parameters
+        ----------
+        front : csr_array
+            Boolean matrix with size number of rows x number of product states
+
+        Returns
+        -------
+        reachability : csr_array
+            Returns reachable states for each row of the front
+        """
+        visited = self.step(front)
+        front = visited
+
+        while front.nnz > 0:
+            front = self.step(front) > visited
+            visited += front
+
+        return visited
+
+    def reachable_from(self, sources: np.ndarray) -> csr_array:
+        """Multi-source bfs: find states reachable by a nonempty path from each of the
+        sources. Only rows of the transitive closure for the sources are computed.
+
+        Parameters
+        ----------
+        sources : np.ndarray
+            Indexes of the source product states
+
+        Returns
+        -------
+        reachability : csr_array
+            Returns boolean matrix with size number of sources x number of product states,
+            the i-th row is the row of the transitive closure for sources[i]
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        return self._reachability(
+            SPARSE.from_coordinates(
+                np.arange(len(sources)), sources, (len(sources), self.size)
+            )
+        )
+
+    def transitive_closure(self) -> csr_array:
+        """Constructs a transitive closure of the product automaton
+
+        Returns
+        -------
+        adjacency_matrix : csr_array
+            Returns transitive closure matrix
+        """
+        return self._reachability(csr_array(eye(self.size, dtype=bool)))
+
+    def reversed(self) -> "ProductAutomaton":
+        """Product of the automata with reversed transitions, start and final states are swapped.
+        Symbol matrices are transposed, automata themselves are shared.
+
+        Returns
+        -------
+        product : ProductAutomaton
+        """
+        result = copy(self)
+        result.symbol_matrices = {
+            symbol: (csr_array(first.T), csr_array(second.T))
+            for symbol, (first, second) in self.symbol_matrices.items()
+        }
+        result.start_indexes, result.final_indexes = (
+            self.final_indexes,
+            self.start_indexes,
+        )
+        return result
+
+    def reachable_states(self) -> np.ndarray:
+        """Find product states reachable from the start states, including start states
+
+        Returns
+        -------
+        states : np.ndarray
+            Sorted indexes of the reachable states
+        """
+        starts = self.start_indexes
+        front = SPARSE.from_coordinates(
+            np.zeros(len(starts), dtype=np.int64), starts, (1, self.size)
+        )
+        reachable = front + self._reachability(front)
+        return np.sort(reachable.indices.astype(np.int64))
+
+    def product_transitions(
+        self, states: np.ndarray, symbol: any
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Find all transitions by the symbol from the given product states. For each state (i, j)
+        transitions of i and of j are gathered from the CSR ranges of the symbol matrices,
+        so the cost is proportional to the number of found transitions. The smaller automaton
+        is gathered first, pairs without its transitions are dropped before the larger one.
+
+        Parameters
+        ----------
+        states : np.ndarray
+            Indexes of the source product states
+        symbol : any
+            Symbol of the transitions
+
+        Returns
+        -------
+        sources_and_targets : Tuple[np.ndarray, np.ndarray]
+            Returns indexes of the source and the target product states of each transition
+        """
+        states = np.asarray(states, dtype=np.int64)
+        first, second = self.symbol_matrices[symbol]
+        firsts, seconds = np.divmod(states, self.second_size)
+        if self.second_size <= self.first_size:
+            second_targets, origins = _gather_transitions(second, seconds)
+            first_targets, first_origins = _gather_transitions(first, firsts[origins])
+            second_targets = second_targets[first_origins]
+            origins = origins[first_origins]
+        else:
+            first_targets, origins = _gather_transitions(first, firsts)
+            second_targets, second_origins = _gather_transitions(
+                second, seconds[origins]
+            )
+            first_targets = first_targets[second_origins]
+            origins = origins[second_origins]
+        return states[origins], first_targets * self.second_size + second_targets
+
+    def reachable_part(self, prune: bool = False) -> Automaton:
+        """Materialize the part of the product reachable from the start states. Bfs goes over
+        product states and gathers transitions of the whole front at once, see product_transitions,
+        the full Kronecker product is never built.
+
+        Parameters
+        ----------
+        prune : bool
+            If true, states from which final states are not reachable are also removed
+
+        Returns
+        -------
+        automaton : Automaton
+            Returns the intersection automaton, its states are indexes of the product states
+        """
+        visited = np.zeros(self.size, dtype=bool)
+        visited[self.start_indexes] = True
+        front = self.start_indexes
+        transitions = {
+            symbol: ([np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)])
+            for symbol in self.symbol_matrices
+        }
+        while len(front) > 0:
+            reached = [np.empty(0, dtype=np.int64)]
+            for symbol, (sources, targets) in transitions.items():
+                symbol_sources, symbol_targets = self.product_transitions(front, symbol)
+                sources.append(symbol_sources)
+                targets.append(symbol_targets)
+                reached.append(symbol_targets)
+            reached = np.unique(np.concatenate(reached))
+            front = reached[~visited[reached]]
+            visited[front] = True
+
+        # Transitions from the reachable states lead to the reachable states only
+        states = np.flatnonzero(visited)
+        indexes = np.cumsum(
+            visited, dtype=np.int32 if len(states) < 2**31 else np.int64
+        )
+        indexes -= 1
+        transitions = {
+            symbol: (
+                indexes[np.concatenate(sources)],
+                indexes[np.concatenate(targets)],
+            )
+            for symbol, (sources, targets) in transitions.items()
+        }
+        if prune:
+            is_kept = _coreachable_mask(
+                len(states),
+                transitions.values(),
+                np.flatnonzero(np.isin(states, self.final_indexes)),
+            )
+            states = states[is_kept]
+            new_indexes = np.cumsum(is_kept) - 1
+            for symbol, (sources, targets) in transitions.items():
+                is_kept_transition = is_kept[sources] & is_kept[targets]
+                transitions[symbol] = (
+                    new_indexes[sources[is_kept_transition]],
+                    new_indexes[targets[is_kept_transition]],
+                )
+
+        k = len(states)
+        return Automaton(
+            _object_array(states.tolist()),
+            np.isin(states, self.start_indexes),
+            np.isin(states, self.final_indexes),
+            set(self.symbols),
+            {
+                symbol: SPARSE.from_coordinates(sources, targets, (k, k))
+                for symbol, (sources, targets) in transitions.items()
+            },
+        )
+
+
+def _coreachable_mask(
+    size: int, transitions: Iterable[Tuple[np.ndarray, np.ndarray]], finals: np.ndarray
+) -> np.ndarray:
+    """Find states from which any of the final states is reachable, including the final states.
+    Single bfs goes over reversed transitions from an extra state leading to all final states.
+
+    Parameters
+    ----------
+    size : int
+        Number of states
+    transitions : Iterable[Tuple[np.ndarray, np.ndarray]]
+        Arrays of sources and targets of transitions
+    finals : np.ndarray
+        Indexes of the final states
+
+    Returns
+    -------
+    mask : np.ndarray
+        Returns boolean mask of the states
+    """
+    sources, targets = [finals], [np.full(len(finals), size)]
+    for transition_sources, transition_targets in transitions:
+        sources.append(transition_sources)
+        targets.append(transition_targets)
+    reversed_adjacency = SPARSE.from_coordinates(
+        np.concatenate(targets), np.concatenate(sources), (size + 1, size + 1)
+    )
+    order = breadth_first_order(
+        reversed_adjacency, size, directed=True, return_predecessors=False
+    )
+    mask = np.zeros(size + 1, dtype=bool)
+    mask[order] = True
+    return mask[:size]
+
+
+def _gather_transitions(
+    matrix: csr_array, states: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Find targets of all transitions of the matrix from the given states
+
+    Parameters
+    ----------
+    matrix : csr_array
+        Adjacency matrix
+    states : np.ndarray
+        Source states, may repeat
+
+    Returns
+    -------
+    targets_and_origins : Tuple[np.ndarray, np.ndarray]
+        Returns targets of the transitions and, for each of them,
+        the index of its source at the states array
+    """
+    lengths = matrix.indptr[states + 1] - matrix.indptr[states]
+    targets = _gather_ranges(matrix.indptr, matrix.indices, states)
+    origins = np.repeat(np.arange(len(states)), lengths)
+    return targets.astype(np.int64), origins
@@ -0,0 +1,138 @@
+import os
+import pathlib
+import pickle
+from collections import OrderedDict
+from typing import Optional
+
+from project.Automaton import Automaton
+from project.automaton_lib import regex_to_automaton
+
+from pyformlang.regular_expression import Regex
+from pyformlang.regular_expression.regex_objects import (
+    Concatenation,
+    Empty,
+    Epsilon,
+    KleeneStar,
+    Symbol,
+    Union,
+)
+
+
+def canonical_regex(regex: Regex) -> str:
+    """Build the canonical form of the regular expression. Nested unions and concatenations
+    are flattened, alternatives of unions are sorted and deduplicated, so e.g. "b|a|b" and
+    "(a|b)" have the same canonical form.
+
+    Parameters
+    ----------
+    regex : Regex
+        Regular expression
+
+    Returns
+    -------
+    canonical : str
+        Returns the canonical form of the regular expression
+    """
+    head = regex.head
+    if isinstance(head, Epsilon):
+        return "$"
+    if isinstance(head, Empty):
+        return "()"
+    if isinstance(head, Symbol):
+        return repr(str(head.value))
+    if isinstance(head, KleeneStar):
+        return f"({canonical_regex(regex.sons[0])})*"
+    if isinstance(head, Union):
+        alternatives = {canonical_regex(son) for son in _flatten(regex, Union)}
+        return "(" + "|".join(sorted(alternatives)) + ")"
+    if isinstance(head, Concatenation):
+        parts = [canonical_regex(son) for son in _flatten(regex, Concatenation)]
+        return "(" + ".".join(parts) + ")"
+    raise ValueError(f"Unsupported regex node: {head}")
+
+
+def _flatten(regex: Regex, node_type: type) -> list:
+    """Sons of the nested nodes of the same type, in order"""
+    if not isinstance(regex.head, node_type):
+        return [regex]
+    return [son for sub_regex in regex.sons for son in _flatten(sub_regex, node_type)]
+
+
+class RegexCache:
+    """LRU cache of regular expressions compiled to automata. Regexes are keyed by
+    their canonical form. If the path is given, the cache is loaded from the file
+    and can be saved back to it.
+
+    Cached automata are shared between the callers and must not be modified.
+    """
+
+    def __init__(self, max_size: int = 256, path: Optional[str | pathlib.Path] = None):
+        if max_size < 1:
+            raise ValueError(f"Size of the cache must be positive: {max_size}")
+        self.max_size = max_size
+        self.path = None if path is None else pathlib.Path(path)
+        self.hits = 0
+        self.misses = 0
+        self._automata = OrderedDict()
+
+        if self.path is not None and self.path.exists():
+            with open(self.path, "rb") as file:
+                self._automata.update(pickle.load(file))
+            self._evict()
+
+    def __len__(self) -> int:
+        return len(self._automata)
+
+    def __contains__(self, regex: Regex) -> bool:
+        return canonical_regex(regex) in self._automata
+
+    def get(self, regex: Regex) -> Automaton:
+        """Get the automaton of the regular expression, compile it if it is not cached
+
+        Parameters
+        ----------
+        regex : Regex
+            Regular expression
+
+        Returns
+        -------
+        automaton : Automaton
+            Returns automaton accepting the language of the regular expression
+        """
+        key = canonical_regex(regex)
+        automaton = self._automata.get(key)
+        if automaton is not None:
+            self.hits += 1
+            self._automata.move_to_end(key)
+            return automaton
+
+        self.misses += 1
+        automaton = regex_to_automaton(regex)
+        self._automata[key] = automaton
+        self._evict()
+        return automaton
+
+    def clear(self):
+        """Remove all automata and reset counters"""
+        self._automata.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def save(self):
+        """Write the cached automata to the file of the cache"""
+        if self.path is None:
+            raise ValueError("Cache has no file to save")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "wb") as file:
+            pickle.dump(list(self._automata.items()), file)
+        os.replace(tmp_path, self.path)
+
+    def _evict(self):
+        """Remove the least recently used automata exceeding the size of the cache"""
+        while len(self._automata) > self.max_size:
+            self._automata.popitem(last=False)
+
+
+# Cache used by the queries of graphs_lib by default
+DEFAULT_REGEX_CACHE = RegexCache()
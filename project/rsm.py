@@ -1,9 +1,12 @@
+from project.Automaton import Automaton
+from project.automaton_lib import regex_to_automaton
 from project.ecfg import ECFG
 
-from typing import Dict
+from typing import Dict, List, Set, Tuple
 
+import numpy as np
 from pyformlang.cfg import Variable
-from pyformlang.finite_automaton import EpsilonNFA
+from pyformlang.finite_automaton import EpsilonNFA, State
 
 
 class RSM:
@@ -28,7 +31,7 @@ class RSM:
         return cls(
             ecfg.start,
             {
-                k: r.to_epsilon_nfa().to_deterministic()
+                k: regex_to_automaton(r).determinize().to_dfa()
                 for k, r in ecfg.productions.items()
             },
         )
@@ -43,6 +46,67 @@ class RSM:
         """
         new_productions = {}
         for var, nfa in self.productions.items():
-            new_productions[var] = nfa.minimize()
+            new_productions[var] = (
+                Automaton.from_fa(nfa).determinize().minimize().to_dfa()
+            )
 
         return RSM(self.start, new_productions)
+
+    def boxes_states(self) -> Tuple[List[State], Set[State], Set[State]]:
+        """Collect states of all boxes of rsm. State of the box is represented as State((var, state_value)).
+
+        Returns
+        -------
+        states, start_states, final_states : (List[State], Set[State], Set[State])
+            States of all boxes, start states and final states
+        """
+        states, start_states, final_states = set(), set(), set()
+
+        for var, automata in self.productions.items():
+            for state in automata.states:
+                st = State((var, state.value))
+                states.add(st)
+                if state in automata.start_states:
+                    start_states.add(st)
+                if state in automata.final_states:
+                    final_states.add(st)
+
+        return sorted(states, key=lambda s: s.value[1]), start_states, final_states
+
+    def to_arrays(
+        self,
+    ) -> Tuple[List[State], np.ndarray, np.ndarray, np.ndarray, List[any]]:
+        """Compile transitions of all boxes of rsm to integer-coded index arrays.
+
+        Returns
+        -------
+        states, sources, targets, label_codes, labels : (List[State], np.ndarray, np.ndarray, np.ndarray, List[any])
+            States of all boxes (see boxes_states), indexes of the source and target states of
+            the transitions, code of the label of each transition and the labels themselves
+        """
+        states, _, _ = self.boxes_states()
+        mapping = {state: i for i, state in enumerate(states)}
+        label_codes = {}
+        transitions = []
+
+        for var, automata in self.productions.items():
+            for state_source, transition in automata.to_dict().items():
+                source = mapping[State((var, state_source.value))]
+                for symbol, states_targets in transition.items():
+                    if not isinstance(states_targets, set):
+                        states_targets = {states_targets}
+
+                    code = label_codes.setdefault(symbol.value, len(label_codes))
+                    for state_target in states_targets:
+                        transitions.append(
+                            (source, code, mapping[State((var, state_target.value))])
+                        )
+
+        transitions = np.array(transitions, dtype=np.int64).reshape(-1, 3)
+        return (
+            states,
+            transitions[:, 0],
+            transitions[:, 2],
+            transitions[:, 1],
+            list(label_codes),
+        )
@@ -0,0 +1,258 @@
+import argparse
+import pathlib
+import random
+import sys
+import tempfile
+import time
+
+import networkx as nx
+import numpy as np
+from scipy import sparse
+
+import shared
+
+sys.path.insert(0, str(shared.ROOT))
+
+from project.Automaton import (
+    LABEL,
+    Automaton,
+    _transform_to_new_front,
+    _transform_to_new_front_by_rows,
+)
+
+from project.automaton_lib import regex_to_automaton
+from project.graph_reader import read_dot_edges
+from project import graphs_lib
+from project.graphs_lib import write_to_dot
+
+from pyformlang.finite_automaton import EpsilonNFA, State, Symbol
+from pyformlang.regular_expression import Regex
+
+
+def _measure(function, repeat: int) -> float:
+    """Returns the best time of several runs of the function in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - begin)
+    return best
+
+
+def _random_fa(states_num: int, edges_num: int, labels_num: int) -> EpsilonNFA:
+    random.seed("formal lang course")
+    states = [State(i) for i in range(states_num)]
+    symbols = [Symbol(f"l{i}") for i in range(labels_num)]
+    fa = EpsilonNFA()
+    fa.add_transitions(
+        (random.choice(states), random.choice(symbols), random.choice(states))
+        for _ in range(edges_num)
+    )
+    fa.add_start_state(states[0])
+    fa.add_final_state(states[-1])
+    return fa
+
+
+def benchmark_from_fa(size: int, repeat: int):
+    fa = _random_fa(size, 10 * size, 16)
+    from_fa = _measure(lambda: Automaton.from_fa(fa), repeat)
+
+    # Transitions that are already integer-coded, e.g. loaded from the disk
+    rng = np.random.default_rng(0)
+    sources, targets = rng.integers(0, size, (2, 10 * size))
+    label_codes = rng.integers(0, 16, 10 * size)
+    labels, states = [f"l{i}" for i in range(16)], list(range(size))
+    arrays = _measure(
+        lambda: Automaton.from_arrays(
+            sources, targets, label_codes, labels, states, {0}, {size - 1}
+        ),
+        repeat,
+    )
+
+    print(f"from_fa, {size} states, {10 * size} edges")
+    print(f"  from_fa:     {from_fa:.4f}s")
+    print(f"  from_arrays: {arrays:.4f}s")
+
+
+def benchmark_transitive_closure(size: int, repeat: int):
+    rng = np.random.default_rng(0)
+    automaton = Automaton.from_arrays(
+        rng.integers(0, size, 2 * size),
+        rng.integers(0, size, 2 * size),
+        rng.integers(0, 2, 2 * size),
+        ["a", "b"],
+        list(range(size)),
+        {0},
+        {size - 1},
+    )
+    print(f"transitive_closure, {size} states, {2 * size} edges")
+    for strategy in ["squaring", "scc", "bfs", "auto"]:
+        result = _measure(lambda: automaton.transitive_closure(strategy), repeat)
+        print(f"  {strategy}: {result:.4f}s")
+
+
+def benchmark_transform_to_new_front(size: int, repeat: int):
+    regex_n, rows_num = 8, 8 * 16
+    rng = np.random.default_rng(0)
+    front = sparse.random(
+        rows_num, regex_n + size, density=0.01, format="csr", random_state=rng
+    ).astype(bool)
+    by_rows = _measure(lambda: _transform_to_new_front_by_rows(front, regex_n), repeat)
+    vectorized = _measure(lambda: _transform_to_new_front(front, regex_n), repeat)
+    print(f"transform_to_new_front, {rows_num}x{regex_n + size} front, {front.nnz} nnz")
+    print(f"  by rows:    {by_rows:.4f}s")
+    print(f"  vectorized: {vectorized:.4f}s")
+
+
+def benchmark_regex(size: int, repeat: int):
+    # The parser of pyformlang is recursive, so the number of labels is bounded
+    labels = "|".join(f"l{i}" for i in range(min(size, 50)))
+    regex = Regex(f"({labels})*.x.({labels})")
+    # regex_to_minimal_dfa is built by the engine of the project, so pyformlang is called directly
+    pyformlang = _measure(
+        lambda: Automaton.from_fa(regex.to_epsilon_nfa().minimize()), repeat
+    )
+    direct = _measure(lambda: regex_to_automaton(regex), repeat)
+    print(f"regex, {min(size, 50)} labels")
+    print(f"  pyformlang: {pyformlang:.4f}s")
+    print(f"  direct:     {direct:.4f}s")
+
+
+def benchmark_minimize(size: int, repeat: int):
+    # Random complete dfa, half of the states are final
+    rng = np.random.default_rng(0)
+    labels_num = 4
+    fa = EpsilonNFA()
+    fa.add_transitions(
+        (State(i), Symbol(f"l{label}"), State(int(target)))
+        for i in range(size)
+        for label, target in enumerate(rng.integers(0, size, labels_num))
+    )
+    fa.add_start_state(State(0))
+    for i in range(0, size, 2):
+        fa.add_final_state(State(i))
+    automaton = Automaton.from_fa(fa)
+
+    pyformlang = _measure(lambda: fa.minimize(), repeat)
+    hopcroft = _measure(lambda: automaton.minimize(), repeat)
+    print(f"minimize, dfa with {size} states, {labels_num} labels")
+    print(f"  pyformlang: {pyformlang:.4f}s")
+    print(f"  hopcroft:   {hopcroft:.4f}s")
+
+    # The minimal dfa of (a|b)*.a.(a|b)^k has 2^(k+1) states
+    k = 9
+    regex = Regex("(a|b)*.a" + ".(a|b)" * k)
+    nfa = regex.to_epsilon_nfa()
+    automaton = regex_to_automaton(regex)
+    pyformlang = _measure(lambda: nfa.to_deterministic(), repeat)
+    subsets = _measure(lambda: automaton.determinize(), repeat)
+    print(f"determinize, (a|b)*.a.(a|b)^{k}")
+    print(f"  pyformlang: {pyformlang:.4f}s")
+    print(f"  subsets:    {subsets:.4f}s")
+
+
+def benchmark_epsilon(size: int, repeat: int):
+    # Half of the edges are epsilon ones
+    rng = np.random.default_rng(0)
+    graph = nx.MultiDiGraph()
+    graph.add_edges_from(
+        (int(u), int(v), {LABEL: label})
+        for u, v, label in zip(
+            rng.integers(0, size, 2 * size),
+            rng.integers(0, size, 2 * size),
+            rng.choice(["a", "b", "epsilon", "epsilon"], 2 * size),
+        )
+    )
+    pyformlang = _measure(
+        lambda: EpsilonNFA.from_networkx(graph).remove_epsilon_transitions(), repeat
+    )
+    matrices = _measure(lambda: Automaton.from_graph(graph), repeat)
+    print(f"remove epsilon, {size} states, {2 * size} edges")
+    print(f"  pyformlang: {pyformlang:.4f}s")
+    print(f"  matrices:   {matrices:.4f}s")
+
+
+def benchmark_read_dot(size: int, repeat: int):
+    rng = np.random.default_rng(0)
+    graph = nx.MultiDiGraph()
+    graph.add_edges_from(
+        (int(u), int(v), {LABEL: f"l{label}"})
+        for u, v, label in zip(
+            rng.integers(0, size, 4 * size),
+            rng.integers(0, size, 4 * size),
+            rng.integers(0, 16, 4 * size),
+        )
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory) / "graph.dot"
+        write_to_dot(graph, path)
+        pydot = _measure(lambda: nx.drawing.nx_pydot.read_dot(path), repeat)
+        edges = _measure(lambda: read_dot_edges(path), repeat)
+        networkx = _measure(lambda: read_dot_edges(path).to_networkx(), repeat)
+    print(f"read dot, {size} nodes, {4 * size} edges")
+    print(f"  pydot:          {pydot:.4f}s")
+    print(f"  edges:          {edges:.4f}s")
+    print(f"  edges+networkx: {networkx:.4f}s")
+
+
+def benchmark_regex_request(size: int, repeat: int):
+    rng = np.random.default_rng(0)
+    graph = nx.MultiDiGraph()
+    graph.add_nodes_from(range(size))
+    graph.add_edges_from(
+        (int(u), int(v), {LABEL: label})
+        for u, v, label in zip(
+            rng.integers(0, size, 2 * size),
+            rng.integers(0, size, 2 * size),
+            rng.choice(["a", "b"], 2 * size),
+        )
+    )
+    regex = Regex("a.b*")
+    print(f"make_regex_request_to_graph, a.b*, {size} nodes, {2 * size} edges")
+    for starts_num in [size // 100, size]:
+        starts = list(range(starts_num))
+        default = _measure(
+            lambda: graphs_lib.make_regex_request_to_graph(regex, graph, starts, []),
+            repeat,
+        )
+        share, graphs_lib.EAGER_CLOSURE_MIN_SHARE = (
+            graphs_lib.EAGER_CLOSURE_MIN_SHARE,
+            2,
+        )
+        bfs = _measure(
+            lambda: graphs_lib.make_regex_request_to_graph(regex, graph, starts, []),
+            repeat,
+        )
+        graphs_lib.EAGER_CLOSURE_MIN_SHARE = share
+        print(f"  {starts_num} start vertexes")
+        print(f"    default: {default:.4f}s")
+        print(f"    bfs:     {bfs:.4f}s")
+
+
+BENCHMARKS = {
+    "from_fa": benchmark_from_fa,
+    "transitive_closure": benchmark_transitive_closure,
+    "transform_to_new_front": benchmark_transform_to_new_front,
+    "regex": benchmark_regex,
+    "minimize": benchmark_minimize,
+    "epsilon": benchmark_epsilon,
+    "read_dot": benchmark_read_dot,
+    "regex_request": benchmark_regex_request,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the project algorithms")
+    parser.add_argument("benchmarks", nargs="*", help=", ".join(BENCHMARKS))
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for name in args.benchmarks or BENCHMARKS:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name}")
+        BENCHMARKS[name](args.size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
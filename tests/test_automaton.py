@@ -0,0 +1,399 @@
+import pickle
+
+from project.Automaton import (
+    Automaton,
+    _transform_to_new_front,
+    _transform_to_new_front_by_rows,
+)
+from project import automaton_lib
+from project.ecfg import ECFG
+from project.rsm import RSM
+
+import networkx as nx
+import numpy as np
+import pytest
+from scipy.sparse import csr_array
+from pyformlang.regular_expression import Regex
+from pyformlang.finite_automaton import EpsilonNFA, State, Symbol
+
+
+def test_from_fa_transitions():
+    fa = EpsilonNFA()
+    fa.add_transitions(
+        [
+            (0, "a", 1),
+            (1, "b", 2),
+            (2, "a", 0),
+            (2, "a", 0),
+            (1, "epsilon", 0),
+            (3, "c", 3),
+        ]
+    )
+    fa.add_start_state(State(0))
+    fa.add_final_state(State(2))
+
+    for fa in [
+        fa,
+        EpsilonNFA(),
+        automaton_lib.regex_to_minimal_dfa(Regex("a.(b|c)*.d")),
+    ]:
+        automaton = Automaton.from_fa(fa, remove_epsilon=False)
+        assert automaton.states == fa.states
+        assert automaton.start_states == fa.start_states
+        assert automaton.final_states == fa.final_states
+        assert automaton.symbols == fa.symbols
+        assert {
+            (automaton.state_table[i], symbol, automaton.state_table[j])
+            for symbol, matrix in automaton.symbol_matrices.items()
+            for i, j in zip(*matrix.nonzero())
+        } == set(fa)
+
+
+def test_from_arrays():
+    automaton = Automaton.from_arrays(
+        np.array([0, 1, 1, 0]),
+        np.array([1, 2, 2, 0]),
+        np.array([0, 1, 1, 0]),
+        [Symbol("a"), Symbol("b"), Symbol("c")],
+        ["x", "y", "z"],
+        {"x"},
+        {"z"},
+    )
+
+    assert automaton.states == {"x", "y", "z"}
+    assert automaton.symbols == {Symbol("a"), Symbol("b"), Symbol("c")}
+    assert automaton.symbol_matrices.keys() == {Symbol("a"), Symbol("b")}
+    assert automaton.symbol_matrices[Symbol("a")].nnz == 2
+    assert automaton.symbol_matrices[Symbol("b")].nnz == 1
+    assert automaton.symbol_matrices[Symbol("b")][1, 2]
+
+
+def test_from_graph():
+    graph = nx.MultiDiGraph()
+    graph.add_nodes_from([0, 1, 2, 3, "isolated"])
+    graph.add_edges_from(
+        [
+            (0, 1, {"label": "a"}),
+            (1, 2, {"label": "b"}),
+            (2, 0, {"label": "a"}),
+            (2, 3, {"label": "c"}),
+            (3, 3, {}),
+        ]
+    )
+
+    expected = EpsilonNFA.from_networkx(graph)
+    expected.add_start_state(0)
+    expected.add_start_state(1)
+    expected.add_final_state(3)
+    automaton = Automaton.from_graph(graph, [0, 1], [3])
+    assert automaton.states == {0, 1, 2, 3, "isolated"}
+    assert automaton.start_states == {0, 1}
+    assert automaton.final_states == {3}
+    assert automaton.to_automata().is_equivalent_to(expected)
+
+    automaton = Automaton.from_graph(graph)
+    assert automaton.start_states == automaton.final_states == automaton.states
+    assert automaton.symbols == {"a", "b", "c"}
+
+
+def test_from_graph_epsilon():
+    graph = nx.MultiDiGraph()
+    graph.add_edges_from(
+        [
+            (0, 1, {"label": "epsilon"}),
+            (1, 2, {"label": "a"}),
+            (2, 3, {"label": "epsilon"}),
+            (3, 4, {"label": "b"}),
+            (4, 5, {"label": "epsilon"}),
+        ]
+    )
+
+    expected = EpsilonNFA.from_networkx(graph)
+    expected.add_start_state(0)
+    expected.add_final_state(5)
+    automaton = Automaton.from_graph(graph, [0], [5])
+    assert automaton.symbols == {"a", "b"}
+    assert automaton.to_automata().is_equivalent_to(expected)
+    assert automaton.to_automata().accepts(["a", "b"])
+
+    nfa = automaton_lib.graph_to_nfa(graph, [0], [5])
+    assert nfa.states == {State(i) for i in range(6)}
+    assert nfa.is_equivalent_to(expected)
+
+
+def test_from_fa_epsilon():
+    random = np.random.default_rng(19)
+    for states_num in [1, 5, 40, 300]:
+        fa = EpsilonNFA()
+        transitions = zip(
+            random.integers(states_num, size=3 * states_num),
+            random.choice(["a", "b", "epsilon", "epsilon"], 3 * states_num),
+            random.integers(states_num, size=3 * states_num),
+        )
+        fa.add_transitions([(int(u), label, int(v)) for u, label, v in transitions])
+        fa.add_start_state(State(0))
+        fa.add_final_state(State(states_num - 1))
+
+        automaton = Automaton.from_fa(fa)
+        assert automaton.symbols == {"a", "b"} & fa.symbols
+        assert set(automaton.symbol_matrices) <= {"a", "b"}
+        expected = fa.remove_epsilon_transitions()
+        assert automaton.start_states == {
+            state.value for state in expected.start_states
+        }
+        assert automaton.final_states == {
+            state.value for state in expected.final_states
+        }
+        assert automaton.to_nfa().is_equivalent_to(expected)
+
+        raw = Automaton.from_fa(fa, remove_epsilon=False)
+        assert raw.to_automata().is_equivalent_to(fa)
+
+
+def test_from_rsm():
+    rsm = RSM.from_ecfg(ECFG.from_text("S -> a S b | $\nB -> (b | S)*")).minimize()
+    automaton = Automaton.from_rsm(rsm)
+    states = {i: state for state, i in automaton.old_state_to_new.items()}
+
+    expected = {
+        (State((var, source.value)), symbol.value, State((var, target.value)))
+        for var, fa in rsm.productions.items()
+        for source, symbol, target in fa
+    }
+    real = {
+        (states[i], symbol, states[j])
+        for symbol, matrix in automaton.symbol_matrices.items()
+        for i, j in zip(*matrix.nonzero())
+    }
+    assert real == expected
+    assert automaton.start_states == {
+        State((var, state.value))
+        for var, fa in rsm.productions.items()
+        for state in fa.start_states
+    }
+    assert automaton.final_states == {
+        State((var, state.value))
+        for var, fa in rsm.productions.items()
+        for state in fa.final_states
+    }
+
+
+def random_automaton(states_num: int, edges_num: int, seed: int) -> Automaton:
+    rng = np.random.default_rng(seed)
+    return Automaton.from_arrays(
+        rng.integers(0, states_num, edges_num),
+        rng.integers(0, states_num, edges_num),
+        rng.integers(0, 2, edges_num),
+        ["a", "b"],
+        list(range(states_num)),
+        {0},
+        {states_num - 1},
+    )
+
+
+def test_transitive_closure_strategies():
+    automatons = [
+        random_automaton(n, m, n + m)
+        for n, m in [(1, 1), (30, 20), (30, 60), (300, 400)]
+    ]
+    automatons.append(Automaton.from_fa(EpsilonNFA()))
+    automatons.append(
+        Automaton.from_fa(automaton_lib.regex_to_minimal_dfa(Regex("a.b*.(c|d)")))
+    )
+
+    for automaton in automatons:
+        expected = automaton.transitive_closure("squaring")
+        for strategy in ["scc", "bfs", "auto"]:
+            closure = automaton.transitive_closure(strategy)
+            assert closure.shape == expected.shape
+            assert (closure != expected).nnz == 0
+
+    with pytest.raises(ValueError):
+        automatons[0].transitive_closure("unknown")
+
+
+def test_determinize_and_minimize():
+    for seed, (n, m) in enumerate([(1, 0), (4, 6), (8, 16), (20, 30), (30, 90)]):
+        automaton = random_automaton(n, m, seed)
+        automaton.start_states = set(range(0, n, 4))
+        automaton.final_states = set(range(n // 2, n))
+        fa = automaton.to_automata()
+
+        dfa = automaton.determinize()
+        assert dfa.start_states == {0}
+        assert all(
+            matrix.sum(axis=1).max(initial=0) <= 1
+            for matrix in dfa.symbol_matrices.values()
+        )
+        assert dfa.to_dfa().is_equivalent_to(fa)
+
+        minimal = dfa.minimize()
+        assert minimal.to_dfa().is_equivalent_to(fa)
+        assert minimal.size == len(fa.minimize().states)
+        for word in [[], ["a"], ["a", "b"], ["b", "b", "a"], ["a", "a", "b", "a"]]:
+            assert minimal.to_dfa().accepts(word) == fa.accepts(word)
+
+    with pytest.raises(ValueError):
+        random_automaton(4, 12, 0).minimize()
+
+
+def test_adjacency():
+    automaton = random_automaton(20, 40, 0)
+
+    def expected_adjacency():
+        return sum(automaton.symbol_matrices.values()).astype(bool)
+
+    adjacency = automaton.adjacency
+    assert (adjacency != expected_adjacency()).nnz == 0
+    assert automaton.adjacency is adjacency
+
+    # New transitions update the cached matrix
+    new = csr_array(([True, True], ([0, 1], [19, 19])), shape=(20, 20))
+    assert automaton.add_transitions("c", new) == 2
+    assert automaton.add_transitions("c", new) == 0
+    assert "c" in automaton.symbols
+    assert automaton.adjacency is not adjacency
+    assert (automaton.adjacency != expected_adjacency()).nnz == 0
+
+    # Replaced and removed matrices outdate the cached one
+    automaton.symbol_matrices["a"] = csr_array((20, 20), dtype=bool)
+    assert (automaton.adjacency != expected_adjacency()).nnz == 0
+    automaton.symbol_matrices.pop("b")
+    assert (automaton.adjacency != expected_adjacency()).nnz == 0
+    automaton.symbol_matrices = {"a": new}
+    assert (automaton.adjacency != new).nnz == 0
+
+    copied = pickle.loads(pickle.dumps(automaton))
+    assert (copied.adjacency != new).nnz == 0
+    assert copied.add_transitions("a", new.T) == 2
+
+
+def test_transform_to_new_front():
+    rng = np.random.default_rng(0)
+    for regex_n, graph_n, rows_num, density in [
+        (1, 5, 3, 0.5),
+        (3, 10, 6, 0.3),
+        (4, 20, 12, 0.1),
+        (5, 50, 30, 0.05),
+        (5, 50, 30, 0.0),
+    ]:
+        front = csr_array(rng.random((rows_num, regex_n + graph_n)) < density)
+        expected = _transform_to_new_front_by_rows(front, regex_n)
+        real = _transform_to_new_front(front, regex_n)
+        assert real.shape == expected.shape
+        assert (real != expected).nnz == 0
+
+
+def test_bfs_rpq_delta():
+    regexes = ["a*", "a.b*", "(a|b)*.b", "b.b.(a|b)", "c*"]
+    for seed, (n, m) in enumerate([(5, 8), (30, 60), (100, 150)]):
+        graph = random_automaton(n, m, seed)
+        graph.start_states = set(range(0, n, 3))
+        graph.final_states = set(range(1, n, 2))
+        for regex in regexes:
+            regex = Automaton.from_fa(automaton_lib.regex_to_minimal_dfa(Regex(regex)))
+            for is_separately in [False, True]:
+                assert graph.bfs_rpq(regex, is_separately, delta=True) == graph.bfs_rpq(
+                    regex, is_separately, delta=False
+                )
+
+
+def test_bfs_rpq_nondeterministic_regex():
+    regexes = ["a*.a.b", "(a.b|a.c)*", "(a|b)*.b.(a|b)", "a.b*|a.c*"]
+    for seed, (n, m) in enumerate([(10, 20), (50, 100)]):
+        graph = random_automaton(n, m, seed)
+        graph.start_states = set(range(0, n, 3))
+        graph.final_states = set(range(1, n, 2))
+        for regex in regexes:
+            dfa = Automaton.from_fa(automaton_lib.regex_to_minimal_dfa(Regex(regex)))
+            nfa = automaton_lib.regex_to_automaton(Regex(regex))
+            for is_separately in [False, True]:
+                expected = graph.bfs_rpq(dfa, is_separately)
+                assert graph.bfs_rpq(nfa, is_separately) == expected
+                assert graph.bfs_rpq(nfa, is_separately, delta=False) == expected
+
+
+def test_bfs_rpq_by_chunks():
+    graph = random_automaton(60, 120, 0)
+    graph.start_states = set(range(0, 60, 2))
+    graph.final_states = set(range(60))
+    regex = Automaton.from_fa(automaton_lib.regex_to_minimal_dfa(Regex("a.(a|b)*")))
+
+    expected = graph.bfs_rpq(regex, True)
+    assert expected
+    assert graph.bfs_rpq(regex, True, chunk_size=7) == expected
+    assert graph.bfs_rpq(regex, True, chunk_size=1, delta=False) == expected
+    assert graph.bfs_rpq(regex, True, processes=2) == expected
+    assert graph.bfs_rpq(regex, True, chunk_size=4, processes=3) == expected
+    # Chunks are used only for the separate problem
+    assert graph.bfs_rpq(regex, False, chunk_size=4) == graph.bfs_rpq(regex, False)
+
+
+def test_bfs_rpq_chunks():
+    graph = random_automaton(60, 120, 0)
+    graph.start_states = set(range(0, 60, 2))
+    regex = Automaton.from_fa(automaton_lib.regex_to_minimal_dfa(Regex("a.(a|b)*")))
+
+    for is_separately in [True, False]:
+        expected = graph.bfs_rpq(regex, is_separately)
+        for chunk_size in [None, 1, 7]:
+            chunks = list(graph.bfs_rpq_chunks(regex, is_separately, True, chunk_size))
+            assert all(isinstance(chunk, np.ndarray) and len(chunk) for chunk in chunks)
+            if is_separately:
+                result = [tuple(pair) for chunk in chunks for pair in chunk.tolist()]
+            else:
+                result = [i for chunk in chunks for i in chunk.tolist()]
+            assert len(result) == len(expected) and set(result) == expected
+            assert graph.bfs_rpq_count(regex, is_separately, True, chunk_size) == len(
+                expected
+            )
+
+    assert graph.bfs_rpq_exists(regex)
+    assert graph.bfs_rpq_exists(regex, chunk_size=3)
+    graph.final_states = set()
+    assert not graph.bfs_rpq_exists(regex)
+    assert not graph.bfs_rpq_exists(regex, delta=False, chunk_size=3)
+    assert graph.bfs_rpq_count(regex, True, chunk_size=3) == 0
+
+
+@pytest.mark.parametrize("backend", ["sparse", "dense", "bit"])
+def test_backends(backend):
+    graph = random_automaton(40, 60, 0)
+    regex = random_automaton(5, 8, 1)
+
+    expected = graph.intersect(regex)
+    intersection = graph.intersect(regex, backend)
+    for symbol, matrix in expected.symbol_matrices.items():
+        assert (intersection.symbol_matrices[symbol] != matrix).nnz == 0
+
+    expected = graph.transitive_closure("squaring")
+    closure = graph.transitive_closure(backend=backend)
+    assert (closure != expected).nnz == 0
+
+
+def test_integer_states():
+    fa = EpsilonNFA()
+    fa.add_transitions([("x", "a", "y"), ("y", "b", ("z", 1)), (("z", 1), "a", "x")])
+    fa.add_start_state(State("x"))
+    fa.add_final_state(State(("z", 1)))
+    automaton = Automaton.from_fa(fa)
+
+    assert automaton.size == 3
+    assert automaton.state_table.shape == (3,)
+    assert automaton.start_mask.dtype == bool and automaton.start_mask.sum() == 1
+    assert automaton.start_states == {State("x")}
+    assert automaton.final_states == {State(("z", 1))}
+    for state, i in automaton.old_state_to_new.items():
+        assert automaton.state_table[i] == state
+
+    automaton.start_states = {State("y"), State(("z", 1))}
+    assert automaton.start_states == {State("y"), State(("z", 1))}
+    assert automaton.start_mask.sum() == 2
+
+    intersection = automaton.intersect(automaton)
+    assert intersection.size == 9
+    assert intersection.start_states == {
+        i * 3 + j
+        for i in np.flatnonzero(automaton.start_mask)
+        for j in np.flatnonzero(automaton.start_mask)
+    }
@@ -85,6 +85,32 @@ def test_regex_to_minimal_dfa():
             assert minimal_dfa.accepts(test) == result
 
 
+def test_regex_to_automaton():
+    regexes = [
+        "$",
+        "",
+        "a",
+        "a*|b*",
+        "(a*)|(b*)|(c*)",
+        "(0|1)*1.1.1",
+        "a.(b|c)*",
+        "(a.b)*|c.$",
+        "x.y*.z|x.z",
+        "29.(1|2|3|4|5|6|7|8|9|10|11|12).2003",
+    ]
+    for regex in regexes:
+        automaton = automaton_lib.regex_to_automaton(Regex(regex))
+        minimal_dfa = automaton_lib.regex_to_minimal_dfa(Regex(regex))
+        assert automaton.to_automata().is_equivalent_to(minimal_dfa)
+
+    # Positions with the same continuations are merged
+    labels = "|".join(f"l{i}" for i in range(30))
+    automaton = automaton_lib.regex_to_automaton(Regex(f"({labels})*"))
+    assert automaton.size == 1
+    assert automaton.to_automata().accepts(["l0", "l29", "l7"])
+    assert not automaton.to_automata().accepts(["l30"])
+
+
 def test_graph_to_nfa_from_cpfq_data():
 
     # https://formallanguageconstrainedpathquerying.github.io/CFPQ_Data/graphs/data/skos.html#skos
@@ -301,3 +327,9 @@ def test_intersect_two_finite_automatons():
     for case in test_cases:
         res = automaton_lib.intersect_two_finite_automatons(case.fa1, case.fa2)
         assert res.is_equivalent_to(case.result_fa)
+
+    for case in test_cases:
+        res = automaton_lib.intersect_two_finite_automatons(
+            case.fa1, case.fa2, prune=True
+        )
+        assert res.is_equivalent_to(case.result_fa)
@@ -0,0 +1,46 @@
+from project.bit_matrix import BitMatrix, is_dense
+from tests.test_utils.generators import random_matrix
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "shape, density",
+    [((1, 1), 1.0), ((3, 5), 0.5), ((64, 64), 0.1), ((70, 130), 0.3), ((0, 4), 0.5)],
+)
+def test_pack(shape, density):
+    matrix = random_matrix(shape, density, 0)
+    packed = BitMatrix.from_sparse(matrix)
+
+    assert packed.shape == shape
+    assert packed.nnz == matrix.nnz
+    assert (packed.to_sparse() != matrix).nnz == 0
+    rows, cols = matrix.nonzero()
+    assert set(zip(*packed.nonzero())) == set(zip(rows, cols))
+
+
+@pytest.mark.parametrize(
+    "n, m, k, density",
+    [(1, 1, 1, 1.0), (5, 3, 4, 0.5), (65, 70, 129, 0.05), (100, 200, 50, 0.3)],
+)
+def test_operations(n, m, k, density):
+    left = random_matrix((n, m), density, 1)
+    right = random_matrix((m, k), density, 2)
+    other = random_matrix((n, m), density, 3)
+
+    product = BitMatrix.from_sparse(left) @ BitMatrix.from_sparse(right)
+    assert product.shape == (n, k)
+    assert (product.to_sparse() != (left @ right)).nnz == 0
+
+    union = BitMatrix.from_sparse(left) + BitMatrix.from_sparse(other)
+    assert (union.to_sparse() != (left + other)).nnz == 0
+
+    packed = BitMatrix.from_sparse(left)
+    packed += BitMatrix.from_sparse(other)
+    assert packed.nnz == (left + other).nnz
+
+
+def test_is_dense():
+    assert not is_dense(0, (0, 0))
+    assert not is_dense(1, (10, 10))
+    assert is_dense(50, (10, 10))
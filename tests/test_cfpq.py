@@ -118,3 +118,13 @@ import pytest
 def test_cfpq(graph, cfg, start, final, expected):
     for algorithm in [hellings, matrix, tensor]:
         assert algorithm(graph, cfg, start, final) == expected
+
+
+@pytest.mark.parametrize("backend", ["sparse", "dense", "bit"])
+def test_cfpq_backends(backend):
+    graph = read_from_dot(gen_path("graph1.dot"))
+    cfg = read_grammar_from_file(gen_path("a_or_b.cfg"))
+    expected = hellings(graph, cfg)
+
+    for algorithm in [matrix, tensor]:
+        assert algorithm(graph, cfg, backend=backend) == expected
@@ -0,0 +1,78 @@
+from project import graphs_lib
+from project.dataset_cache import DatasetCache
+
+import cfpq_data
+import pytest
+
+
+@pytest.fixture
+def downloads(tmp_path, monkeypatch):
+    """Replace downloads of cfpq_data with CSV files of small graphs"""
+    downloaded = []
+
+    def download(graph_name: str):
+        downloaded.append(graph_name)
+        path = tmp_path / "csv" / f"{graph_name}.csv"
+        path.parent.mkdir(exist_ok=True)
+        size = int(graph_name.split("_")[-1])
+        path.write_text(
+            "".join(f"{i} {(i + 1) % size} {'ab'[i % 2]}\n" for i in range(size))
+            + f"0 0 loop\n0 {size - 1} b\n"
+        )
+        return path
+
+    monkeypatch.setattr(cfpq_data, "download", download)
+    return downloaded
+
+
+def test_dataset_cache(tmp_path, downloads):
+    cache = DatasetCache(tmp_path / "cache")
+    expected = cfpq_data.graph_from_csv(cfpq_data.download("cycle_10"))
+
+    for _ in range(3):
+        graph = graphs_lib.get_graph_by_name("cycle_10", cache)
+        assert list(graph.nodes) == list(expected.nodes)
+        assert list(graph.edges(data=graphs_lib.LABEL)) == list(
+            expected.edges(data=graphs_lib.LABEL)
+        )
+        assert graphs_lib.get_graph_info("cycle_10", cache) == (
+            10,
+            12,
+            {"a", "b", "loop"},
+        )
+    assert downloads == ["cycle_10", "cycle_10"]
+    assert "cycle_10" in cache
+
+    # Graphs are loaded from the directory by other instances too
+    assert DatasetCache(tmp_path / "cache").edges("cycle_10").edges_num == 12
+    assert len(downloads) == 2
+
+    cache.clear()
+    assert "cycle_10" not in cache and cache.size() == 0
+
+    with pytest.raises(ValueError):
+        cache.edges("../cycle_10")
+    with pytest.raises(ValueError):
+        DatasetCache(tmp_path, max_bytes=0)
+
+
+def test_dataset_cache_eviction(tmp_path, downloads):
+    cache = DatasetCache(tmp_path / "cache")
+    cache.edges("cycle_100")
+    graph_bytes = cache.size()
+    cache.clear()
+
+    # Only two graphs of the same size fit
+    cache = DatasetCache(tmp_path / "cache", max_bytes=2 * graph_bytes)
+    cache.edges("first_100")
+    cache.edges("second_100")
+    cache.edges("first_100")
+    cache.edges("third_100")
+    assert "first_100" in cache and "third_100" in cache
+    assert "second_100" not in cache
+    assert cache.size() <= 2 * graph_bytes
+
+    # The graph exceeding the size is kept until the next one is added
+    cache = DatasetCache(tmp_path / "cache", max_bytes=1)
+    cache.edges("fourth_100")
+    assert "fourth_100" in cache and "first_100" not in cache
@@ -0,0 +1,90 @@
+from project import graph_index, graphs_lib
+from project.Automaton import Automaton
+from project.cfpq import hellings, matrix, tensor
+from project.cfg import read_grammar_from_file
+from tests.test_utils.generators import random_graph
+from tests.test_utils.manage_path import generate_right_path_to_test_file as gen_path
+
+import pytest
+from pyformlang.regular_expression import Regex
+
+
+def test_save_and_load_graph_index(tmp_path):
+    graph = random_graph(20, 50, 0)
+    expected = Automaton.from_graph(graph, remove_epsilon=False)
+    graph_index.save_graph_index(expected, tmp_path / "index")
+
+    for mmap in [True, False]:
+        automaton = graph_index.load_graph_index(tmp_path / "index", mmap)
+        assert list(automaton.state_table) == list(expected.state_table)
+        assert automaton.symbols == expected.symbols
+        assert automaton.start_mask.all() and automaton.final_mask.all()
+        for label, matrix in expected.symbol_matrices.items():
+            assert (automaton.symbol_matrices[label] != matrix).nnz == 0
+            assert automaton.symbol_matrices[label].indices.flags.writeable != mmap
+
+
+def test_load_graph_automaton(tmp_path):
+    graph = random_graph(30, 60, 1)
+    assert graph_index.graph_fingerprint(graph) == graph_index.graph_fingerprint(
+        graph.copy()
+    )
+
+    for _ in range(2):
+        automaton = graph_index.load_graph_automaton(graph, tmp_path)
+        assert automaton.symbols == {"a", "b", "epsilon"}
+    assert [path.name for path in tmp_path.iterdir()] == [
+        graph_index.graph_fingerprint(graph)
+    ]
+
+    graph.add_edge(0, 1, label="b")
+    graph_index.load_graph_automaton(graph, tmp_path)
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_load_graph_automaton_by_key(tmp_path):
+    graph = random_graph(30, 60, 3)
+    with pytest.raises(ValueError):
+        graph_index.load_graph_automaton(None, tmp_path, "graph")
+    for key in ["", ".graph", "a/b"]:
+        with pytest.raises(ValueError):
+            graph_index.load_graph_automaton(graph, tmp_path, key)
+
+    expected = graph_index.load_graph_automaton(graph, tmp_path, "graph")
+    assert [path.name for path in tmp_path.iterdir()] == ["graph"]
+    automaton = graph_index.load_graph_automaton(None, tmp_path, "graph")
+    assert list(automaton.state_table) == list(expected.state_table)
+    for label, label_matrix in expected.symbol_matrices.items():
+        assert (automaton.symbol_matrices[label] != label_matrix).nnz == 0
+
+    # Queries load the graph by the key only
+    regex = Regex("a.b*")
+    assert graphs_lib.bfs_rpq(
+        regex, None, [0, 1], None, True, index_dir=tmp_path, index_key="graph"
+    ) == graphs_lib.bfs_rpq(regex, graph, [0, 1], None, True)
+    assert graphs_lib.make_regex_request_to_graph(
+        regex, None, [0, 1], [], index_dir=tmp_path, index_key="graph"
+    ) == graphs_lib.make_regex_request_to_graph(regex, graph, [0, 1], [])
+    cfg = read_grammar_from_file(gen_path("a_or_b.cfg"))
+    assert matrix(None, cfg, index_dir=tmp_path, index_key="graph") == hellings(
+        graph, cfg
+    )
+
+
+def test_queries_with_graph_index(tmp_path):
+    graph = random_graph(30, 60, 2)
+    for regex in ["a.b*", "(a|b)*.b"]:
+        for is_separately in [False, True]:
+            assert graphs_lib.bfs_rpq(
+                Regex(regex), graph, [0, 1, 2], None, is_separately, index_dir=tmp_path
+            ) == graphs_lib.bfs_rpq(Regex(regex), graph, [0, 1, 2], None, is_separately)
+        assert graphs_lib.make_regex_request_to_graph(
+            Regex(regex), graph, [0, 1], [2, 3, 4], index_dir=tmp_path
+        ) == graphs_lib.make_regex_request_to_graph(
+            Regex(regex), graph, [0, 1], [2, 3, 4]
+        )
+
+    cfg = read_grammar_from_file(gen_path("a_or_b.cfg"))
+    expected = hellings(graph, cfg)
+    for algorithm in [matrix, tensor]:
+        assert algorithm(graph, cfg, index_dir=tmp_path) == expected
@@ -0,0 +1,153 @@
+import glob
+
+from project import graphs_lib
+from project.Automaton import Automaton
+from project.graph_reader import read_dot_edges, read_edge_list
+from tests.test_utils.manage_path import generate_right_path_to_test_file as gen_path
+
+import networkx as nx
+import numpy as np
+import pytest
+
+
+def assert_graphs_are_equal(first: nx.MultiDiGraph, second: nx.MultiDiGraph):
+    assert sorted(first.nodes) == sorted(second.nodes)
+    assert sorted(first.edges(data=graphs_lib.LABEL)) == sorted(
+        second.edges(data=graphs_lib.LABEL)
+    )
+
+
+def test_read_dot_edges_as_pydot():
+    for path in glob.glob(str(gen_path("*.dot"))):
+        expected = nx.drawing.nx_pydot.read_dot(path)
+        if "\\n" in expected.nodes:
+            expected.remove_node("\\n")
+        assert_graphs_are_equal(read_dot_edges(path).to_networkx(), expected)
+        assert_graphs_are_equal(graphs_lib.read_from_dot(path), expected)
+
+
+def test_read_dot_edges(tmp_path):
+    path = tmp_path / "graph.dot"
+    path.write_text(
+        "\n".join(
+            [
+                "digraph G {",
+                'rankdir="LR";',
+                "node [shape=circle];",
+                '"a b";',
+                '"a b" -> "http://x/y#z"  [key=0, label="rdf:type"];',
+                "x -> y  [key=0, label=a];",
+                "x -> y  [key=1, label=b];",
+                "// The edge with the same key replaces the label",
+                "x -> y  [key=0, label=c];",
+                "y -> x;",
+                "}",
+            ]
+        )
+    )
+    edges = read_dot_edges(path)
+    assert edges.vertices == ["a b", "http://x/y#z", "x", "y"]
+    assert edges.edges_num == 4
+    assert [edges.labels[code] for code in edges.label_codes] == [
+        "rdf:type",
+        "c",
+        "b",
+        None,
+    ]
+
+    coordinates = edges.coordinates()
+    assert set(coordinates) == {"rdf:type", "a", "b", "c", None}
+    assert coordinates["a"][0].size == 0
+    assert coordinates["c"][0].tolist() == [2] and coordinates["c"][1].tolist() == [3]
+
+    automaton = edges.to_automaton(["x"], ["y"])
+    assert automaton.symbols == {"rdf:type", "c", "b"}
+    assert automaton.to_automata().accepts(["c"])
+    assert not automaton.to_automata().accepts(["a"])
+
+
+def test_read_dot_edges_statements(tmp_path):
+    path = tmp_path / "graph.dot"
+    path.write_text(
+        "\n".join(
+            [
+                "digraph G {",
+                'rankdir="LR"; node [shape=circle];',
+                "a -> b -> c [label=x];",
+                "d -> e [label=y]; e -> f [label=z];",
+                '"q r" -> s [key=0, label="k l"] [color=red]  // comment',
+                "g; h [label=n]",
+                "}",
+            ]
+        )
+    )
+    expected = nx.drawing.nx_pydot.read_dot(path)
+    graph = read_dot_edges(path).to_networkx()
+    assert sorted(graph.nodes) == sorted(expected.nodes)
+    assert sorted(graph.edges(data=graphs_lib.LABEL)) == [
+        ("a", "b", "x"),
+        ("b", "c", "x"),
+        ("d", "e", "y"),
+        ("e", "f", "z"),
+        ("q r", "s", "k l"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "a -> b label=x;",
+        "a -> { b c };",
+        "a -- b;",
+        "a -> b [label];",
+        "a -> b [label=x;",
+        "x = ;",
+        "a b;",
+        "a -> ;",
+        "node x;",
+    ],
+)
+def test_read_dot_edges_invalid(tmp_path, statement):
+    path = tmp_path / "graph.dot"
+    path.write_text(f"digraph {{\n{statement}\n}}\n")
+    with pytest.raises(ValueError):
+        read_dot_edges(path)
+
+
+def test_read_dot_edges_keyword_vertexes(tmp_path):
+    graph = nx.MultiDiGraph()
+    graph.add_edge("node", "edge", label="graph")
+    graph.add_edge("graph", "strict", label="digraph")
+    graph.add_edge("edge", "node", label="node")
+    graph.add_nodes_from(["digraph", "x"])
+
+    path = tmp_path / "graph.dot"
+    graphs_lib.write_to_dot(graph, path)
+    assert_graphs_are_equal(read_dot_edges(path).to_networkx(), graph)
+
+    # Keywords followed by attributes or alone are attribute statements
+    path.write_text("digraph {\nnode;\nedge [color=red];\ngraph -> x;\n}\n")
+    assert sorted(read_dot_edges(path).vertices) == ["graph", "x"]
+
+
+def test_read_edge_list(tmp_path):
+    graph = nx.MultiDiGraph()
+    rng = np.random.default_rng(0)
+    for u, v, label in zip(
+        rng.integers(0, 30, 100),
+        rng.integers(0, 30, 100),
+        rng.choice(["a", "b", "epsilon"], 100),
+    ):
+        graph.add_edge(str(u), str(v), label=label)
+
+    path = tmp_path / "graph.txt"
+    path.write_text(
+        "# source target label\n"
+        + "".join(f"{u} {v} {label}\n" for u, v, label in graph.edges(data="label"))
+    )
+    edges = read_edge_list(path)
+    assert_graphs_are_equal(edges.to_networkx(), graph)
+
+    expected = Automaton.from_graph(graph, ["0", "1"], ["2"])
+    automaton = edges.to_automaton(["0", "1"], ["2"])
+    assert automaton.to_automata().is_equivalent_to(expected.to_automata())
@@ -0,0 +1,70 @@
+from project import graphs_lib
+from project.dataset_cache import DatasetCache
+from project.graph_statistics import GraphStatistics
+
+import cfpq_data
+import networkx as nx
+import numpy as np
+
+
+def test_graph_statistics():
+    rng = np.random.default_rng(0)
+    graph = nx.MultiDiGraph()
+    graph.add_nodes_from(range(60))
+    graph.add_edges_from(
+        (int(u), int(v), {graphs_lib.LABEL: label})
+        for u, v, label in zip(
+            rng.integers(0, 60, 150),
+            rng.integers(0, 60, 150),
+            rng.choice(["a", "b", "c"], 150),
+        )
+    )
+    graph.add_edge(0, 0, label="a")
+    graph.add_edge(0, 0, label="b")
+
+    statistics = GraphStatistics.from_networkx(graph)
+    assert statistics.vertices_num == 60
+    assert statistics.edges_num == graph.number_of_edges()
+    assert statistics.labels == {"a", "b", "c"}
+    for label, count in statistics.label_counts.items():
+        assert count == sum(1 for *_, l in graph.edges(data="label") if l == label)
+
+    out_degrees = [d for _, d in graph.out_degree]
+    assert statistics.out_degrees.tolist() == out_degrees
+    assert statistics.in_degrees.tolist() == [d for _, d in graph.in_degree]
+    assert statistics.out_degree_distribution.tolist() == [
+        out_degrees.count(k) for k in range(max(out_degrees) + 1)
+    ]
+    assert (
+        statistics.in_degree_distribution
+        @ np.arange(len(statistics.in_degree_distribution))
+        == statistics.edges_num
+    )
+
+    assert statistics.self_loops == nx.number_of_selfloops(graph)
+    assert statistics.parallel_edges == graph.number_of_edges() - len(
+        set(graph.edges())
+    )
+    assert statistics.scc_sizes.tolist() == sorted(
+        (len(c) for c in nx.strongly_connected_components(graph)), reverse=True
+    )
+
+
+def test_empty_graph_statistics():
+    statistics = GraphStatistics.from_networkx(nx.MultiDiGraph())
+    assert statistics.vertices_num == statistics.edges_num == 0
+    assert statistics.labels == set()
+    assert statistics.scc_sizes.size == 0
+    assert statistics.out_degree_distribution.tolist() == [0]
+
+
+def test_get_graph_statistics(tmp_path, monkeypatch):
+    path = tmp_path / "graph.csv"
+    path.write_text("0 1 a\n1 2 b\n2 0 a\n0 1 b\n3 3 c\n")
+    monkeypatch.setattr(cfpq_data, "download", lambda graph_name: path)
+
+    statistics = graphs_lib.get_graph_statistics("graph", DatasetCache(tmp_path))
+    assert statistics.label_counts == {"a": 2, "b": 2, "c": 1}
+    assert statistics.self_loops == 1 and statistics.parallel_edges == 1
+    assert statistics.scc_sizes.tolist() == [3, 1]
+    assert statistics.out_degree_distribution.tolist() == [0, 3, 1]
@@ -0,0 +1,71 @@
+from project import graphs_lib
+from project.Automaton import Automaton
+from project.graph_reader import LabeledEdges
+from project.graph_storage import load_edges, save_edges, write_directory_atomically
+from tests.test_utils.generators import random_graph
+
+import numpy as np
+import pytest
+
+
+def test_save_and_load_graph(tmp_path):
+    graph = random_graph(50, 200, 0, "v")
+    # Parallel edges, loops, edges without labels and isolated nodes are kept
+    graph.add_edge("v0", "v0", label="a")
+    graph.add_edge("v0", "v0", label="a")
+    graph.add_edge("v1", "v2")
+    graph.add_node(("isolated", 1))
+
+    graphs_lib.save_graph(graph, tmp_path / "graph")
+    loaded = graphs_lib.load_graph(tmp_path / "graph")
+    assert list(loaded.nodes) == list(graph.nodes)
+    assert list(loaded.edges(data=graphs_lib.LABEL)) == list(
+        graph.edges(data=graphs_lib.LABEL)
+    )
+
+    with pytest.raises(FileExistsError):
+        graphs_lib.save_graph(graph, tmp_path / "graph")
+
+
+def test_load_graph_edges(tmp_path):
+    graph = random_graph(40, 150, 1, "v")
+    save_edges(LabeledEdges.from_networkx(graph), tmp_path / "graph")
+
+    edges = graphs_lib.load_graph_edges(tmp_path / "graph")
+    assert isinstance(edges.sources, np.memmap)
+    assert isinstance(edges.targets, np.memmap)
+    assert edges.targets.dtype == np.int32
+    assert edges.edges_num == graph.number_of_edges()
+    assert np.all(np.diff(edges.sources) >= 0)
+
+    expected = Automaton.from_graph(graph, ["v0", "v1"], ["v2"])
+    automaton = edges.to_automaton(["v0", "v1"], ["v2"])
+    assert automaton.symbols == expected.symbols
+    assert automaton.to_automata().is_equivalent_to(expected.to_automata())
+
+    copied = load_edges(tmp_path / "graph", mmap=False)
+    assert not isinstance(copied.targets, np.memmap)
+    assert np.array_equal(copied.targets, edges.targets)
+
+
+def test_write_directory_atomically(tmp_path):
+    def write(text):
+        def write_file(path):
+            path.mkdir()
+            (path / "file.txt").write_text(text)
+
+        return write_file
+
+    path = tmp_path / "cache" / "dir"
+    write_directory_atomically(path, write("first"))
+    # The directory written first is kept
+    write_directory_atomically(path, write("second"))
+    assert (path / "file.txt").read_text() == "first"
+
+    def fail(path):
+        path.mkdir()
+        raise OSError("Disk is full")
+
+    with pytest.raises(OSError):
+        write_directory_atomically(tmp_path / "cache" / "other", fail)
+    assert [path.name for path in (tmp_path / "cache").iterdir()] == ["dir"]
@@ -1,10 +1,11 @@
 import filecmp
 import os
 
-from project import graphs_lib
+from project import automaton_lib, graphs_lib
 from tests.test_utils.manage_path import generate_right_path_to_test_file as gen_path
 
 import networkx as nx
+import numpy as np
 from pyformlang.regular_expression import Regex
 
 
@@ -193,3 +194,180 @@ def test_bfs_rpq_for_every_vertex():
         (nodes[2], nodes[2]),
         (nodes[3], nodes[3]),
     }
+
+
+def test_bfs_rpq_chunks():
+    regex = Regex("a.(c*).(a*).(d*)")
+    g = nx.MultiDiGraph()
+    g.add_edges_from(
+        [
+            ("x", "y", {graphs_lib.LABEL: "a"}),
+            ("y", "z", {graphs_lib.LABEL: "a"}),
+            ("z", "z", {graphs_lib.LABEL: "d"}),
+            ("y", "y", {graphs_lib.LABEL: "c"}),
+        ]
+    )
+    g.add_node("w")
+
+    chunks = list(graphs_lib.bfs_rpq_chunks(regex, g, None, None, True, chunk_size=1))
+    assert len(chunks) == 2
+    assert {tuple(pair) for chunk in chunks for pair in chunk} == {
+        ("x", "y"),
+        ("x", "z"),
+        ("y", "z"),
+    }
+    chunks = list(graphs_lib.bfs_rpq_chunks(regex, g, ["x"], None, False))
+    assert [set(chunk) for chunk in chunks] == [{"y", "z"}]
+
+    assert graphs_lib.bfs_rpq_count(regex, g, None, None, True) == 3
+    assert graphs_lib.bfs_rpq_count(regex, g, None, ["z"], False) == 1
+    assert graphs_lib.bfs_rpq_exists(regex, g, ["x"], ["z"])
+    assert not graphs_lib.bfs_rpq_exists(regex, g, ["z", "w"], None, chunk_size=1)
+
+
+def test_make_regex_request_to_graph_for_vertex_sets():
+    regex = Regex("a.(b|c)*")
+    g = nx.MultiDiGraph()
+    nodes = [0, 1, 2, 3]
+    edges = [
+        (nodes[0], nodes[1], {graphs_lib.LABEL: "a"}),
+        (nodes[1], nodes[2], {graphs_lib.LABEL: "b"}),
+        (nodes[2], nodes[3], {graphs_lib.LABEL: "c"}),
+        (nodes[3], nodes[1], {graphs_lib.LABEL: "a"}),
+        (nodes[2], nodes[0], {graphs_lib.LABEL: "d"}),
+    ]
+    g.add_nodes_from(nodes)
+    g.add_edges_from(edges)
+
+    answer = graphs_lib.make_regex_request_to_graph(regex, g, nodes, nodes)
+    assert set(answer) == {
+        (nodes[0], nodes[1]),
+        (nodes[0], nodes[2]),
+        (nodes[0], nodes[3]),
+        (nodes[3], nodes[1]),
+        (nodes[3], nodes[2]),
+        (nodes[3], nodes[3]),
+    }
+
+    answer = graphs_lib.make_regex_request_to_graph(regex, g, nodes[2:3], nodes)
+    assert answer == []
+
+
+def test_queries_skip_unknown_vertexes(tmp_path):
+    g = nx.MultiDiGraph()
+    g.add_edges_from(
+        [
+            (0, 2, {graphs_lib.LABEL: "a"}),
+            (1, 2, {graphs_lib.LABEL: "a"}),
+            (2, 0, {graphs_lib.LABEL: "b"}),
+        ]
+    )
+    regex = Regex("a")
+    for index_dir in [None, tmp_path]:
+        assert graphs_lib.make_regex_request_to_graph(
+            regex, g, [0, 99], [2, 100], index_dir=index_dir
+        ) == [(0, 2)]
+        assert graphs_lib.bfs_rpq(
+            regex, g, [0, 1, 99], [2], True, index_dir=index_dir
+        ) == {(0, 2), (1, 2)}
+    assert automaton_lib.graph_to_nfa(g, [0, 99], [2]).accepts("a")
+
+
+def test_make_regex_request_to_graph_for_large_vertex_sets():
+    # The regex does not accept the empty word, so both queries give the same pairs
+    regex = Regex("a.(a|b)*.b")
+    rng = np.random.default_rng(25)
+    g = nx.MultiDiGraph()
+    g.add_edges_from(
+        (f"v{u}", f"v{v}", {graphs_lib.LABEL: label})
+        for u, v, label in zip(
+            rng.integers(0, 80, 160),
+            rng.integers(0, 80, 160),
+            rng.choice(["a", "b", "c"], 160),
+        )
+    )
+    nodes = list(g.nodes)
+    starts, finals = nodes[::2], nodes[::3]
+
+    answer = graphs_lib.make_regex_request_to_graph(regex, g, starts, finals)
+    assert answer
+    assert len(answer) == len(set(answer))
+    assert all(isinstance(pair, tuple) for pair in answer)
+    assert set(answer) == graphs_lib.bfs_rpq(regex, g, starts, finals, True)
+
+
+def test_make_regex_request_to_graph_eager_closure(monkeypatch):
+    regex = Regex("a.b*")
+    rng = np.random.default_rng(4)
+    g = nx.MultiDiGraph()
+    g.add_nodes_from(range(100))
+    g.add_edges_from(
+        (int(u), int(v), {graphs_lib.LABEL: label})
+        for u, v, label in zip(
+            rng.integers(0, 100, 200),
+            rng.integers(0, 100, 200),
+            rng.choice(["a", "b"], 200),
+        )
+    )
+
+    results = []
+    # Bfs from the start states and the closure of the whole product
+    for share in [2, 0]:
+        monkeypatch.setattr(graphs_lib, "EAGER_CLOSURE_MIN_SHARE", share)
+        for starts in [[], list(range(0, 100, 7))]:
+            results.append(graphs_lib.make_regex_request_to_graph(regex, g, starts, []))
+    assert results[0] and results[1]
+    assert results[:2] == results[2:]
+
+    # All vertexes are start ones, but most product states are not,
+    # so the whole product is not built
+    def intersect(*args, **kwargs):
+        raise AssertionError("The product is built")
+
+    monkeypatch.undo()
+    monkeypatch.setattr(graphs_lib.Automaton, "intersect", intersect)
+    assert set(
+        graphs_lib.make_regex_request_to_graph(Regex("a.b.a.b.a"), g, [], [])
+    ) == graphs_lib.bfs_rpq(Regex("a.b.a.b.a"), g, None, None, True)
+
+
+def test_bfs_rpq_by_chunks():
+    regex = Regex("a.(c*).(a*).(d*)")
+    g = nx.MultiDiGraph()
+    nodes = [0, 1, 2, 3]
+    edges = [
+        (nodes[0], nodes[1], {graphs_lib.LABEL: "a"}),
+        (nodes[1], nodes[2], {graphs_lib.LABEL: "a"}),
+        (nodes[2], nodes[2], {graphs_lib.LABEL: "d"}),
+        (nodes[1], nodes[1], {graphs_lib.LABEL: "c"}),
+    ]
+    g.add_nodes_from(nodes)
+    g.add_edges_from(edges)
+    expected = {(nodes[0], nodes[1]), (nodes[0], nodes[2]), (nodes[1], nodes[2])}
+
+    res = graphs_lib.bfs_rpq(regex, g, None, None, True, chunk_size=1)
+    assert res == expected
+    res = graphs_lib.bfs_rpq(regex, g, None, None, True, chunk_size=2, processes=2)
+    assert res == expected
+
+
+def test_bfs_rpq_decodes_vertexes():
+    regex = Regex("a.b*")
+    g = nx.MultiDiGraph()
+    nodes = ["u", "v", "w"]
+    edges = [
+        (nodes[0], nodes[1], {graphs_lib.LABEL: "a"}),
+        (nodes[1], nodes[2], {graphs_lib.LABEL: "b"}),
+        (nodes[2], nodes[0], {graphs_lib.LABEL: "a"}),
+    ]
+    g.add_nodes_from(nodes)
+    g.add_edges_from(edges)
+
+    res = graphs_lib.bfs_rpq(regex, g, None, None, True)
+    assert res == {
+        (nodes[0], nodes[1]),
+        (nodes[0], nodes[2]),
+        (nodes[2], nodes[0]),
+    }
+    res = graphs_lib.bfs_rpq(regex, g, [nodes[2]], None, False)
+    assert res == {nodes[0]}
@@ -0,0 +1,36 @@
+from project.matrix_backend import BACKENDS, get_backend, SPARSE
+from tests.test_utils.generators import random_matrix
+
+import pytest
+from scipy.sparse import kron, block_diag
+
+
+def assert_equal(backend, matrix, expected):
+    assert (backend.to_sparse(matrix) != expected).nnz == 0
+
+
+@pytest.mark.parametrize("name", list(BACKENDS))
+def test_backend_operations(name):
+    backend = get_backend(name)
+    first = random_matrix((7, 9), 0.3, 0)
+    second = random_matrix((9, 70), 0.2, 1)
+    third = random_matrix((7, 9), 0.3, 2)
+    b_first, b_second, b_third = map(backend.from_sparse, [first, second, third])
+
+    rows, cols = first.nonzero()
+    assert_equal(backend, backend.from_coordinates(rows, cols, first.shape), first)
+    assert_equal(backend, backend.multiply(b_first, b_second), first @ second)
+    assert_equal(backend, backend.add(b_first, b_third), first + third)
+    assert_equal(backend, backend.kron(b_first, b_third), kron(first, third))
+    assert_equal(
+        backend, backend.block_diag([b_first, b_second]), block_diag((first, second))
+    )
+    assert backend.nnz(b_second) == second.nnz
+    assert set(zip(*backend.nonzero(b_second))) == set(zip(*second.nonzero()))
+
+
+def test_get_backend():
+    assert get_backend(None) is SPARSE
+    assert get_backend(SPARSE) is SPARSE
+    with pytest.raises(ValueError):
+        get_backend("unknown")
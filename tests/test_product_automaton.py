@@ -0,0 +1,120 @@
+from project.Automaton import Automaton
+from project.product_automaton import ProductAutomaton
+from project import automaton_lib
+
+import numpy as np
+from scipy.sparse import csr_array, kron
+from pyformlang.regular_expression import Regex
+from pyformlang.finite_automaton import EpsilonNFA
+
+
+def product_automatons():
+    graph = EpsilonNFA()
+    graph.add_transitions(
+        [
+            (0, "a", 1),
+            (1, "b", 2),
+            (2, "a", 0),
+            (2, "c", 3),
+            (3, "c", 3),
+            (3, "b", 1),
+            (1, "a", 1),
+        ]
+    )
+    graph.add_start_state(0)
+    graph.add_start_state(2)
+    graph.add_final_state(3)
+    regexes = ["a.b*.c*", "(a|b)*", "a.(b|c)*.a", "c"]
+
+    for regex in regexes:
+        regex_dfa = automaton_lib.regex_to_minimal_dfa(Regex(regex))
+        # Steps differ by which automaton is the smaller one
+        yield Automaton.from_fa(graph), Automaton.from_fa(regex_dfa)
+        yield Automaton.from_fa(regex_dfa), Automaton.from_fa(graph)
+
+
+def test_product_states():
+    for first, second in product_automatons():
+        lazy = ProductAutomaton(first, second)
+        eager = first.intersect(second)
+
+        assert lazy.size == len(eager.old_state_to_new)
+        assert lazy.start_states == eager.start_states
+        assert lazy.final_states == eager.final_states
+
+
+def test_step():
+    for first, second in product_automatons():
+        lazy = ProductAutomaton(first, second)
+        eager = first.intersect(second)
+        adjacency = sum(
+            eager.symbol_matrices.values(),
+            start=csr_array((lazy.size, lazy.size), dtype=bool),
+        )
+
+        front = csr_array(np.random.default_rng(0).random((5, lazy.size)) > 0.7)
+        assert (lazy.step(front) != front @ adjacency).nnz == 0
+
+        for symbol in lazy.symbols:
+            expected = front @ kron(
+                first.symbol_matrices[symbol], second.symbol_matrices[symbol]
+            )
+            assert (lazy.step(front, symbol) != expected).nnz == 0
+
+        for state in range(lazy.size):
+            assert list(lazy.neighbors(state)) == list(adjacency[[state], :].indices)
+
+
+def test_transitive_closure():
+    for first, second in product_automatons():
+        lazy = ProductAutomaton(first, second).transitive_closure()
+        eager = first.intersect(second).transitive_closure()
+        assert (lazy != eager).nnz == 0
+
+
+def test_reachable_from():
+    for first, second in product_automatons():
+        lazy = ProductAutomaton(first, second)
+        closure = lazy.transitive_closure()
+
+        for sources in [lazy.start_indexes, np.array([], dtype=int), [3, 0, 3]]:
+            reachability = lazy.reachable_from(sources)
+            assert reachability.shape == (len(sources), lazy.size)
+            for i, source in enumerate(sources):
+                assert (reachability[[i], :] != closure[[source], :]).nnz == 0
+
+
+def test_reachable_part():
+    for first, second in product_automatons():
+        product = ProductAutomaton(first, second)
+        eager = first.intersect(second)
+        closure = eager.transitive_closure()
+
+        reachable = product.reachable_part()
+        expected = set(product.start_indexes.tolist()) | set(
+            closure[product.start_indexes].nonzero()[1].tolist()
+        )
+        assert reachable.states == expected
+        assert reachable.to_automata().is_equivalent_to(eager.to_automata())
+
+        pruned = product.reachable_part(prune=True)
+        assert pruned.states == {
+            state
+            for state in reachable.states
+            if state in product.final_states
+            or any(closure[state, final] for final in product.final_indexes)
+        }
+        assert pruned.to_automata().is_equivalent_to(eager.to_automata())
+
+
+def test_product_transitions():
+    for first, second in product_automatons():
+        product = ProductAutomaton(first, second)
+        eager = first.intersect(second)
+        states = np.arange(product.size)
+        for symbol in product.symbol_matrices:
+            sources, targets = product.product_transitions(states, symbol)
+            expected = eager.symbol_matrices[symbol].nonzero()
+            assert sorted(zip(sources.tolist(), targets.tolist())) == sorted(
+                zip(expected[0].tolist(), expected[1].tolist())
+            )
@@ -0,0 +1,68 @@
+from project import graphs_lib
+from project.regex_cache import RegexCache, canonical_regex
+
+import networkx as nx
+import pytest
+from pyformlang.regular_expression import Regex
+
+
+def test_canonical_regex():
+    assert canonical_regex(Regex("a|b")) == canonical_regex(Regex("b|a"))
+    assert canonical_regex(Regex("(a|b)|c")) == canonical_regex(Regex("c|(b|a)|a"))
+    assert canonical_regex(Regex("(a.b).c")) == canonical_regex(Regex("a.(b.c)"))
+    assert canonical_regex(Regex("a.b")) != canonical_regex(Regex("b.a"))
+    assert canonical_regex(Regex("a*")) != canonical_regex(Regex("a"))
+    assert canonical_regex(Regex("$")) != canonical_regex(Regex(""))
+
+
+def test_regex_cache():
+    cache = RegexCache(max_size=2)
+    automaton = cache.get(Regex("a.(b|c)*"))
+    assert cache.get(Regex("a.(c|b)*")) is automaton
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.get(Regex("b*"))
+    cache.get(Regex("a.(b|c)*"))
+    # The least recently used regex is evicted
+    cache.get(Regex("c"))
+    assert len(cache) == 2
+    assert Regex("a.(b|c)*") in cache
+    assert Regex("b*") not in cache
+    assert (cache.hits, cache.misses) == (2, 3)
+
+    cache.clear()
+    assert len(cache) == 0 and cache.hits == 0 and cache.misses == 0
+
+    with pytest.raises(ValueError):
+        RegexCache(max_size=0)
+    with pytest.raises(ValueError):
+        cache.save()
+
+
+def test_regex_cache_persistence(tmp_path):
+    path = tmp_path / "regexes.pickle"
+    cache = RegexCache(path=path)
+    expected = cache.get(Regex("a.b*|c")).to_automata()
+    cache.save()
+
+    loaded = RegexCache(max_size=8, path=path)
+    assert len(loaded) == 1
+    assert loaded.get(Regex("c|a.b*")).to_automata().is_equivalent_to(expected)
+    assert (loaded.hits, loaded.misses) == (1, 0)
+
+
+def test_graphs_lib_uses_cache():
+    graph = nx.MultiDiGraph()
+    graph.add_edges_from(
+        [(0, 1, {graphs_lib.LABEL: "a"}), (1, 2, {graphs_lib.LABEL: "b"})]
+    )
+    cache = RegexCache()
+
+    for _ in range(3):
+        assert graphs_lib.bfs_rpq(
+            Regex("a.b"), graph, [0], None, False, regex_cache=cache
+        ) == {2}
+        assert graphs_lib.make_regex_request_to_graph(
+            Regex("a.b"), graph, [0], [2], regex_cache=cache
+        ) == [(0, 2)]
+    assert (cache.hits, cache.misses) == (5, 1)
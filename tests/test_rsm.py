@@ -4,7 +4,7 @@ from project.ecfg import ECFG
 from typing import Dict
 
 from pyformlang.cfg import Variable
-from pyformlang.finite_automaton import EpsilonNFA
+from pyformlang.finite_automaton import EpsilonNFA, State
 from pyformlang.regular_expression import Regex
 
 
@@ -57,3 +57,25 @@ def test_minimize():
     rsm = RSM.from_ecfg(ecfg).minimize()
     assert rsm.start == Variable("S")
     assert_prods_are_equal(rsm.productions, expected_prods)
+
+
+def test_to_arrays():
+    ecfg = ECFG.from_text("S -> a S b | c\nB -> b*")
+    rsm = RSM.from_ecfg(ecfg)
+    states, sources, targets, label_codes, labels = rsm.to_arrays()
+    boxes_states, start_states, final_states = rsm.boxes_states()
+
+    assert set(states) == set(boxes_states)
+    assert start_states <= set(states) and final_states <= set(states)
+    assert len(sources) == len(targets) == len(label_codes)
+
+    expected = {
+        (State((var, source.value)), symbol.value, State((var, target.value)))
+        for var, dfa in rsm.productions.items()
+        for source, symbol, target in dfa
+    }
+    real = {
+        (states[i], labels[code], states[j])
+        for i, j, code in zip(sources, targets, label_codes)
+    }
+    assert real == expected
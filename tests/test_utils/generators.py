@@ -0,0 +1,50 @@
+from typing import Optional
+
+from project.Automaton import LABEL
+
+import networkx as nx
+import numpy as np
+from scipy.sparse import csr_array
+
+
+def random_graph(
+    nodes_num: int, edges_num: int, seed: int, vertex_prefix: Optional[str] = None
+) -> nx.MultiDiGraph:
+    """Random graph with edges labeled by "a", "b" and "epsilon"
+
+    Parameters
+    ----------
+    nodes_num : int
+        Number of nodes
+    edges_num : int
+        Number of edges
+    seed : int
+        Seed of the random generator
+    vertex_prefix : Optional[str]
+        If given, nodes are strings of the prefix and the number of the node,
+        otherwise they are numbers
+
+    Returns
+    -------
+    graph : nx.MultiDiGraph
+    """
+    rng = np.random.default_rng(seed)
+    vertices = [
+        i if vertex_prefix is None else f"{vertex_prefix}{i}" for i in range(nodes_num)
+    ]
+    graph = nx.MultiDiGraph()
+    graph.add_nodes_from(vertices)
+    graph.add_edges_from(
+        (vertices[u], vertices[v], {LABEL: label})
+        for u, v, label in zip(
+            rng.integers(0, nodes_num, edges_num),
+            rng.integers(0, nodes_num, edges_num),
+            rng.choice(["a", "b", "epsilon"], edges_num),
+        )
+    )
+    return graph
+
+
+def random_matrix(shape: (int, int), density: float, seed: int) -> csr_array:
+    """Random boolean matrix, each value is true with the given probability"""
+    return csr_array(np.random.default_rng(seed).random(shape) < density)